@@ -1,4 +1,4 @@
-from pymongo import MongoClient
+from pymongo import MongoClient, AsyncMongoClient
 from pymongo.server_api import ServerApi
 import os
 from dotenv import load_dotenv
@@ -6,53 +6,158 @@ from dotenv import load_dotenv
 # Load environment variables from .env file
 load_dotenv()
 
-def get_database():
+class MongoConnectionManager:
     """
-    Function to get a database connection to MongoDB Atlas
-    Returns a database connection object
+    Process-wide owner of the MongoDB connection pool.
+
+    The client is created lazily on first use and shared by every repository,
+    so the whole process runs on a single tuned pool instead of opening a new
+    client (and ping round trip) per call. FastAPI opens and closes it through
+    the lifespan hooks in app/main.py.
+
+    The API serves requests from the asyncio client; the blocking client is
+    kept for scripts and maintenance tools that run outside the event loop.
     """
-    mongodb_uri = os.getenv("MONGODB_URI")
 
-    if not mongodb_uri:
-        raise Exception("MONGODB_URI is not set in the environment variables")
+    def __init__(self):
+        self._client = None
+        self._database = None
+        self._async_client = None
+        self._async_database = None
+
+    @staticmethod
+    def _pool_options() -> dict:
+        """Pool tuning read from the environment, with sane defaults"""
+        return {
+            "maxPoolSize": int(os.getenv("MONGODB_MAX_POOL_SIZE", "100")),
+            "minPoolSize": int(os.getenv("MONGODB_MIN_POOL_SIZE", "0")),
+            "maxIdleTimeMS": int(os.getenv("MONGODB_MAX_IDLE_TIME_MS", "300000")),
+            "waitQueueTimeoutMS": int(os.getenv("MONGODB_WAIT_QUEUE_TIMEOUT_MS", "5000")),
+        }
+
+    @staticmethod
+    def _uri() -> str:
+        mongodb_uri = os.getenv("MONGODB_URI")
+
+        if not mongodb_uri:
+            raise Exception("MONGODB_URI is not set in the environment variables")
+
+        return mongodb_uri
+
+    @staticmethod
+    def _db_name() -> str:
+        return os.getenv("MONGODB_DB_NAME", "datacenter_designer")
+
+    @property
+    def client(self) -> MongoClient:
+        """Get the shared client, creating it on first access"""
+        if self._client is None:
+            self._client = MongoClient(self._uri(), server_api=ServerApi('1'), **self._pool_options())
+        return self._client
+
+    @property
+    def database(self):
+        """Get the shared database handle"""
+        if self._database is None:
+            self._database = self.client[self._db_name()]
+        return self._database
+
+    @property
+    def async_client(self) -> AsyncMongoClient:
+        """Get the shared asyncio client, creating it on first access"""
+        if self._async_client is None:
+            self._async_client = AsyncMongoClient(self._uri(), server_api=ServerApi('1'), **self._pool_options())
+        return self._async_client
+
+    @property
+    def async_database(self):
+        """Get the shared asyncio database handle"""
+        if self._async_database is None:
+            self._async_database = self.async_client[self._db_name()]
+        return self._async_database
+
+    @property
+    def async_supports_transactions(self) -> bool:
+        """Whether the connected deployment can run multi-document transactions"""
+        topology = self.async_client.topology_description.topology_type_name
+        return topology in ("ReplicaSetWithPrimary", "Sharded", "LoadBalanced")
 
-    client = MongoClient(mongodb_uri, server_api=ServerApi('1'))
+    def connect(self):
+        """Open the pool and verify the deployment is reachable"""
+        try:
+            self.client.admin.command('ping')
+            print("Successfully connected to MongoDB!")
+        except Exception as e:
+            print(f"Failed to connect to MongoDB: {e}")
+            raise e
 
-    try:
-        client.admin.command('ping')
-        print("Successfully connected to MongoDB!")
-    except Exception as e:
-        print(f"Failed to connect to MongoDB: {e}")
-        raise e
+        return self.database
 
-    db_name = os.getenv("MONGODB_DB_NAME", "datacenter_designer")
-    db = client[db_name]
+    async def connect_async(self):
+        """Open the asyncio pool and verify the deployment is reachable"""
+        try:
+            await self.async_client.admin.command('ping')
+            print("Successfully connected to MongoDB!")
+        except Exception as e:
+            print(f"Failed to connect to MongoDB: {e}")
+            raise e
 
-    return db
+        return self.async_database
+
+    def close(self):
+        """Close the pool and drop the cached handles"""
+        if self._client is not None:
+            self._client.close()
+
+        self._client = None
+        self._database = None
+
+    async def close_async(self):
+        """Close the asyncio pool and drop the cached handles"""
+        if self._async_client is not None:
+            await self._async_client.close()
+
+        self._async_client = None
+        self._async_database = None
+
+mongo_manager = MongoConnectionManager()
+
+def get_database():
+    """
+    Function to get a database connection to MongoDB Atlas
+    Returns the process-wide database handle backed by the shared pool
+    """
+    return mongo_manager.database
+
+def get_async_database():
+    """
+    Returns the process-wide asyncio database handle backed by the shared pool
+    """
+    return mongo_manager.async_database
 
-db = get_database()
-cliente_modulos = db
+def __getattr__(name):
+    # Resolve the legacy module-level handles lazily so importing this
+    # module never opens a connection
+    if name in ("db", "cliente_modulos"):
+        return get_database()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def insert_document(collection_name, document):
     """Insert a document into a collection"""
-    db = get_database()
-    collection = db[collection_name]
+    collection = get_database()[collection_name]
     return collection.insert_one(document)
 
 def find_documents(collection_name, query={}):
     """Find documents in a collection"""
-    db = get_database()
-    collection = db[collection_name]
+    collection = get_database()[collection_name]
     return list(collection.find(query))
 
 def update_document(collection_name, query, update_data):
     """Update a document in a collection"""
-    db = get_database()
-    collection = db[collection_name]
+    collection = get_database()[collection_name]
     return collection.update_one(query, {"$set": update_data})
 
 def delete_document(collection_name, query):
     """Delete a document from a collection"""
-    db = get_database()
-    collection = db[collection_name]
+    collection = get_database()[collection_name]
     return collection.delete_one(query)
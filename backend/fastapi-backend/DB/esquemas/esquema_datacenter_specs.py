@@ -1,3 +1,19 @@
+from typing import Optional
+
+# Spec rows stamped with this schema_version carry the field they contribute
+# to the complete spec in unit_field, so merging skips deriving it
+DATACENTER_SPEC_SCHEMA_VERSION = 1
+
+def unit_field_name(unit: Optional[str]) -> Optional[str]:
+    """snake_case field a unit row contributes to the complete spec"""
+    return unit.lower().replace(" ", "_") if unit else None
+
+def upgrade_datacenter_spec(spec: dict) -> dict:
+    """Upgrade step from schema version 0 (unstamped) to 1"""
+    spec = dict(spec)
+    spec["unit_field"] = unit_field_name(spec.get("Unit"))
+    return spec
+
 def datacenter_spec_esquema(datacenter_spec) -> dict:
     if datacenter_spec is None:
         return None
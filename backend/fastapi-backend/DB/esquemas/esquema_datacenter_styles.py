@@ -1,5 +1,67 @@
 from bson import ObjectId
 
+# Documents stamped with this schema_version are stored in the modern shape
+# (see upgrade_datacenter_style) and skip the legacy fallbacks when read
+DATACENTER_STYLE_SCHEMA_VERSION = 1
+
+# (field, legacy field, default) resolved with `or`, as the reader does
+STYLE_FIELD_SOURCES = (
+    ("name", "Name", ""),
+    ("description", "Description", ""),
+    ("grid_connection", "Grid_Connection", 0),
+    ("water_connection", "Water_Connection", 0),
+    ("focus", "Focus", "server"),
+)
+
+NULLABLE_FIELDS = ("processing", "price", "data_storage")
+
+def upgrade_datacenter_style(style: dict) -> dict:
+    """
+    Upgrade step from schema version 0 (unstamped) to 1
+
+    Every field the reader resolves from a legacy spelling or a default is
+    stored under its modern name and the legacy fields are dropped.
+    """
+    style = dict(style)
+
+    for field, legacy_field, default in STYLE_FIELD_SOURCES:
+        style[field] = style.get(field, default) or style.pop(legacy_field, default)
+        style.pop(legacy_field, None)
+
+    style["dim"] = style.get("dim") or [style.get("Space_X", 0), style.get("Space_Y", 0)]
+    style.pop("Space_X", None)
+    style.pop("Space_Y", None)
+
+    for field in NULLABLE_FIELDS:
+        legacy_value = style.pop(field.capitalize(), None)
+        if style.get(field) is None:
+            style[field] = legacy_value
+
+    if "Recommended_Modules" in style:
+        recommended_modules = style.pop("Recommended_Modules")
+        style.setdefault("recommended_modules", recommended_modules)
+
+    return style
+
+def _current_datacenter_style_esquema(style: dict) -> dict:
+    result = {
+        "id": str(style["_id"]) if "_id" in style else style.get("id", ""),
+        "name": style.get("name", ""),
+        "description": style.get("description", ""),
+        "grid_connection": style.get("grid_connection", 0),
+        "water_connection": style.get("water_connection", 0),
+        "dim": style.get("dim"),
+        "focus": style.get("focus", "server"),
+        "processing": style.get("processing"),
+        "price": style.get("price"),
+        "data_storage": style.get("data_storage")
+    }
+
+    if "recommended_modules" in style:
+        result["recommended_modules"] = style["recommended_modules"]
+
+    return result
+
 def datacenter_style_esquema(style) -> dict:
     """
     Convert MongoDB datacenter style object to dictionary matching the TypeScript interface
@@ -7,6 +69,10 @@ def datacenter_style_esquema(style) -> dict:
     if style is None:
         return None
 
+    # Migrated documents need none of the legacy fallbacks below
+    if style.get("schema_version", 0) >= DATACENTER_STYLE_SCHEMA_VERSION:
+        return _current_datacenter_style_esquema(style)
+
     result = {
         "id": str(style["_id"]) if "_id" in style else style.get("id", ""),
         "name": style.get("name", "") or style.get("Name", ""),
@@ -17,7 +17,8 @@ def datacenter_esquema(datacenter) -> dict:
         "style_id": datacenter.get("style_id", None),
         "dim": datacenter.get("dim", [1000, 1000]),
         "grid_connection": datacenter.get("grid_connection", 0),
-        "water_connection": datacenter.get("water_connection", 0)
+        "water_connection": datacenter.get("water_connection", 0),
+        "layout_version": datacenter.get("layout_version", 0)
     }
 
     # Convert modules if they exist
@@ -1,3 +1,65 @@
+# Conversion tables, built once at import instead of on every call
+LEGACY_FIELDS = ("Name", "Is_Input", "Is_Output", "Unit", "Amount")
+
+MODERN_FIELDS = (
+    "price", "description",
+    "supplied_water", "water_usage", "chilled_water", "distilled_water", "fresh_water",
+    "usable_power", "processing", "storage_capacity", "network_capacity",
+    "internal_network", "external_network", "data_storage",
+    "grid_connection", "water_connection"
+)
+
+# (api field, legacy-style field) pairs; the capitalized legacy field
+# (e.g. Usable_Power) wins over the modern one when both are present
+MODERN_FIELD_SOURCES = tuple((field, field.title()) for field in MODERN_FIELDS)
+
+# Documents stamped with this schema_version are stored in the modern shape
+# (see upgrade_module) and skip the legacy fallbacks when read
+MODULE_SCHEMA_VERSION = 1
+
+CURRENT_FIELDS = LEGACY_FIELDS + ("dim",) + MODERN_FIELDS
+
+def upgrade_module(module: dict) -> dict:
+    """
+    Upgrade step from schema version 0 (unstamped) to 1
+
+    Dimensions move from Space_X/Space_Y into dim and capitalized modern
+    fields take their snake_case name, with the same precedence module_esquema
+    applies when reading. Name and type are left as stored, since the type is
+    still derived from Name at read time.
+    """
+    module = dict(module)
+
+    if "dim" not in module and "Space_X" in module and "Space_Y" in module:
+        module["dim"] = [module["Space_X"], module["Space_Y"]]
+    module.pop("Space_X", None)
+    module.pop("Space_Y", None)
+
+    for field, legacy_field in MODERN_FIELD_SOURCES:
+        if legacy_field in module:
+            module[field] = module.pop(legacy_field)
+
+    return module
+
+def _current_module_esquema(module: dict) -> dict:
+    if "_id" in module:
+        result = {"id": str(module["_id"])}
+        result["ID"] = module["ID"] if "ID" in module else result["id"]
+    else:
+        result = {"id": module.get("id", "")}
+        if "ID" in module:
+            result["ID"] = module["ID"]
+
+    for field in CURRENT_FIELDS:
+        if field in module:
+            result[field] = module[field]
+
+    # Same keys as the legacy path: a stored type is not part of the output
+    if "type" not in module and "Name" in module:
+        result["type"] = module["Name"].split("_")[0].lower()
+
+    return result
+
 def module_esquema(module) -> dict:
     """
     Convert MongoDB module object to dictionary with all fields
@@ -6,28 +68,28 @@ def module_esquema(module) -> dict:
     if module is None:
         return None
 
-    # Start with basic required fields
-    result = {
-        "id": str(module["_id"]) if "_id" in module else module.get("id", "")
-    }
+    # Migrated documents need none of the legacy fallbacks below
+    if module.get("schema_version", 0) >= MODULE_SCHEMA_VERSION:
+        return _current_module_esquema(module)
 
-    # Add ID as legacy field if needed
-    if "_id" in module and "ID" not in module:
-        result["ID"] = str(module["_id"])
-    elif "ID" in module:
-        result["ID"] = module["ID"]
+    # Start with basic required fields
+    if "_id" in module:
+        result = {"id": str(module["_id"])}
+        # Add ID as legacy field if needed
+        result["ID"] = module["ID"] if "ID" in module else result["id"]
+    else:
+        result = {"id": module.get("id", "")}
+        if "ID" in module:
+            result["ID"] = module["ID"]
 
     # Add legacy fields if they exist
-    legacy_fields = ["Name", "Is_Input", "Is_Output", "Unit", "Amount"]
-    for field in legacy_fields:
+    for field in LEGACY_FIELDS:
         if field in module:
             result[field] = module[field]
 
     # Try to derive module type from Name if not present
     if "type" not in module and "Name" in module:
-        name_parts = module["Name"].split("_")
-        if name_parts:
-            result["type"] = name_parts[0].lower()
+        result["type"] = module["Name"].split("_")[0].lower()
 
     # Add dimensions if present in various formats
     if "dim" in module:
@@ -35,45 +97,13 @@ def module_esquema(module) -> dict:
     elif "Space_X" in module and "Space_Y" in module:
         result["dim"] = [module["Space_X"], module["Space_Y"]]
 
-    # Process all modern fields that might exist
-    modern_fields = [
-        "price", "description",
-        "supplied_water", "water_usage", "chilled_water", "distilled_water", "fresh_water",
-        "usable_power", "processing", "storage_capacity", "network_capacity",
-        "internal_network", "external_network", "data_storage",
-        "grid_connection", "water_connection"
-    ]
-
-    for field in modern_fields:
-        # Check direct field match
-        if field in module:
+    # Process all modern fields, preferring the legacy-style spelling
+    for field, legacy_field in MODERN_FIELD_SOURCES:
+        if legacy_field in module:
+            result[field] = module[legacy_field]
+        elif field in module:
             result[field] = module[field]
 
-        # Check for legacy-style field (capitalized with underscores)
-        legacy_style = field.title().replace("_", " ").replace(" ", "_")
-        if legacy_style in module:
-            result[field] = module[legacy_style]
-
-    # Handle specific fields that have different naming conventions
-    field_mappings = {
-        "Usable_Power": "usable_power",
-        "Grid_Connection": "grid_connection",
-        "Water_Connection": "water_connection",
-        "Fresh_Water": "fresh_water",
-        "Distilled_Water": "distilled_water",
-        "Chilled_Water": "chilled_water",
-        "Internal_Network": "internal_network",
-        "External_Network": "external_network",
-        "Data_Storage": "data_storage",
-        "Processing": "processing",
-        "Price": "price",
-        "Description": "description"
-    }
-
-    for db_field, api_field in field_mappings.items():
-        if db_field in module and api_field not in result:
-            result[api_field] = module[db_field]
-
     return result
 
 def modules_esquema(modules) -> list:
@@ -87,6 +117,10 @@ def modules_esquema(modules) -> list:
         # Create a copy of the module to avoid modifying the original
         module_dict = dict(module)
 
+        # Lookup keys and the schema version are internal fields, not module data
+        module_dict.pop("lookup_keys", None)
+        module_dict.pop("schema_version", None)
+
         # Convert ObjectId to string for JSON serialization
         if "_id" in module_dict:
             module_dict["_id"] = str(module_dict["_id"])
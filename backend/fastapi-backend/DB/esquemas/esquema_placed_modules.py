@@ -1,18 +1,22 @@
 from bson import ObjectId
 from DB.esquemas.esquema_modules import module_esquema
 
-def placed_module_esquema(placed_module) -> dict:
+def placed_module_esquema(placed_module, converted_modules: dict = None) -> dict:
     """
     Convert MongoDB placed module object to dictionary
+
+    converted_modules optionally caches module conversions by object identity,
+    so a layout that places the same catalog module many times converts it once.
     """
     if placed_module is None:
         return None
 
+    position = placed_module.get("position", {})
     result = {
         "id": str(placed_module["_id"]) if "_id" in placed_module else placed_module.get("id", ""),
         "position": {
-            "x": placed_module.get("position", {}).get("x", 0),
-            "y": placed_module.get("position", {}).get("y", 0)
+            "x": position.get("x", 0),
+            "y": position.get("y", 0)
         },
         "rotation": placed_module.get("rotation", 0),
         "datacenter_id": placed_module.get("datacenter_id", None)
@@ -20,12 +24,19 @@ def placed_module_esquema(placed_module) -> dict:
 
     # Handle module data - could be embedded or referenced
     if "module" in placed_module:
-        if isinstance(placed_module["module"], dict):
+        module = placed_module["module"]
+        if isinstance(module, dict):
             # Embedded module
-            result["module"] = module_esquema(placed_module["module"])
+            if converted_modules is None:
+                result["module"] = module_esquema(module)
+            else:
+                key = id(module)
+                if key not in converted_modules:
+                    converted_modules[key] = module_esquema(module)
+                result["module"] = converted_modules[key]
         else:
             # Just the ID was stored
-            result["module_id"] = str(placed_module["module"])
+            result["module_id"] = str(module)
             result["module"] = None
     elif "module_id" in placed_module:
         # Store the module ID separately
@@ -38,4 +49,7 @@ def placed_modules_esquema(placed_modules) -> list:
     """
     Convert a list of MongoDB placed module objects to a list of dictionaries
     """
-    return [placed_module_esquema(pm) for pm in placed_modules]
+    # Hydrated placed modules share catalog documents; convert each one once.
+    # The converted dicts are shared between rows and must not be mutated.
+    converted_modules = {}
+    return [placed_module_esquema(pm, converted_modules) for pm in placed_modules]
@@ -0,0 +1,193 @@
+"""
+Declarative index registry for every collection.
+
+INDEXES declares the indexes each collection needs; ensure_indexes() creates
+them at startup. HOT_PATH_QUERIES lists the filters the repositories run on
+their hot paths so check_query_plans() can fail if any of them would fall back
+to a collection scan.
+
+Run as a script to verify a deployment:
+    python -m DB.indexes --create --report --check-plans
+"""
+import argparse
+import sys
+from pymongo import IndexModel, ASCENDING
+from pymongo.errors import OperationFailure
+
+INDEXES = {
+    "placed_modules": [
+        IndexModel([("datacenter_id", ASCENDING)], name="datacenter_id_1"),
+    ],
+    "modules": [
+        IndexModel([("id", ASCENDING)], name="id_1", unique=True,
+                   partialFilterExpression={"id": {"$exists": True}}),
+        IndexModel([("ID", ASCENDING)], name="ID_1"),
+        IndexModel([("lookup_keys", ASCENDING)], name="lookup_keys_1"),
+    ],
+    "datacenter_specs": [
+        IndexModel([("ID", ASCENDING), ("Unit", ASCENDING)], name="ID_1_Unit_1"),
+    ],
+    "datacenters": [
+        IndexModel([("style_id", ASCENDING)], name="style_id_1"),
+        IndexModel([("id", ASCENDING)], name="id_1", unique=True,
+                   partialFilterExpression={"id": {"$exists": True}}),
+    ],
+    "datacenter_styles": [
+        IndexModel([("focus", ASCENDING)], name="focus_1"),
+        IndexModel([("id", ASCENDING)], name="id_1", unique=True,
+                   partialFilterExpression={"id": {"$exists": True}}),
+    ],
+    "positions": [
+        IndexModel([("datacenter_id", ASCENDING), ("x", ASCENDING), ("y", ASCENDING)], name="datacenter_id_1_x_1_y_1"),
+        IndexModel([("module_id", ASCENDING)], name="module_id_1"),
+    ],
+}
+
+# Filters issued by the repositories on their hot paths; values are placeholders
+HOT_PATH_QUERIES = [
+    ("placed_modules", {"datacenter_id": "datacenter"}),
+    ("modules", {"id": "module"}),
+    ("modules", {"ID": "module"}),
+    ("modules", {"lookup_keys": "module"}),
+    ("datacenter_specs", {"ID": "spec"}),
+    ("datacenter_specs", {"ID": "spec", "Unit": "Processing"}),
+    ("datacenters", {"style_id": "style"}),
+    ("datacenters", {"id": "datacenter"}),
+    ("datacenter_styles", {"focus": "server"}),
+    ("datacenter_styles", {"id": "style"}),
+    ("positions", {"datacenter_id": "datacenter"}),
+    ("positions", {"datacenter_id": "datacenter", "x": {"$gte": 0, "$lte": 100}, "y": {"$gte": 0, "$lte": 100}}),
+    ("positions", {"module_id": "module"}),
+]
+
+def index_names(collection_name: str) -> list:
+    """Names of the indexes declared for a collection"""
+    return [index.document["name"] for index in INDEXES.get(collection_name, [])]
+
+def plan_stages(plan: dict):
+    """Yield every stage name in an explain plan tree"""
+    if not isinstance(plan, dict):
+        return
+
+    if "stage" in plan:
+        yield plan["stage"]
+
+    # Slot-based engine plans nest the classic tree under queryPlan
+    for key in ("queryPlan", "inputStage"):
+        if key in plan:
+            yield from plan_stages(plan[key])
+
+    for child in plan.get("inputStages", []):
+        yield from plan_stages(child)
+
+def uses_collection_scan(explain: dict) -> bool:
+    """Whether the winning plan of an explain result contains a COLLSCAN stage"""
+    winning_plan = explain.get("queryPlanner", {}).get("winningPlan", {})
+    return "COLLSCAN" in plan_stages(winning_plan)
+
+async def ensure_indexes(db) -> dict:
+    """
+    Create every declared index on an asyncio database handle
+
+    Failures (e.g. duplicate keys blocking a unique index) are reported per
+    collection instead of aborting startup.
+    """
+    failures = {}
+    for collection_name, indexes in INDEXES.items():
+        try:
+            await db[collection_name].create_indexes(indexes)
+        except OperationFailure as e:
+            print(f"Failed to create indexes on {collection_name}: {e}")
+            failures[collection_name] = str(e)
+    return failures
+
+def create_indexes(db) -> dict:
+    """Blocking counterpart of ensure_indexes for scripts"""
+    failures = {}
+    for collection_name, indexes in INDEXES.items():
+        try:
+            db[collection_name].create_indexes(indexes)
+        except OperationFailure as e:
+            print(f"Failed to create indexes on {collection_name}: {e}")
+            failures[collection_name] = str(e)
+    return failures
+
+def find_missing_indexes(db) -> dict:
+    """Declared indexes that do not exist in the database, by collection"""
+    missing = {}
+    for collection_name in INDEXES:
+        existing = {index["name"] for index in db[collection_name].list_indexes()}
+        absent = [name for name in index_names(collection_name) if name not in existing]
+        if absent:
+            missing[collection_name] = absent
+    return missing
+
+def find_unused_indexes(db) -> dict:
+    """
+    Indexes with no recorded accesses or not declared in the registry
+
+    Access counters come from $indexStats and reset when the server restarts,
+    so treat "unused" as a hint rather than proof.
+    """
+    report = {}
+    for collection_name in INDEXES:
+        declared = set(index_names(collection_name))
+        for stats in db[collection_name].aggregate([{"$indexStats": {}}]):
+            name = stats["name"]
+            if name == "_id_":
+                continue
+
+            if name not in declared:
+                report.setdefault(collection_name, []).append({"name": name, "reason": "undeclared"})
+            elif stats.get("accesses", {}).get("ops", 0) == 0:
+                report.setdefault(collection_name, []).append({"name": name, "reason": "no accesses"})
+    return report
+
+def check_query_plans(db) -> list:
+    """Hot-path queries whose winning plan is a collection scan"""
+    collection_scans = []
+    for collection_name, query in HOT_PATH_QUERIES:
+        explain = db[collection_name].find(query).explain()
+        if uses_collection_scan(explain):
+            collection_scans.append({"collection": collection_name, "query": query})
+    return collection_scans
+
+def main(argv=None) -> int:
+    from DB.cliente import mongo_manager
+
+    parser = argparse.ArgumentParser(description="Create and verify the declared MongoDB indexes")
+    parser.add_argument("--create", action="store_true", help="create any missing declared indexes")
+    parser.add_argument("--report", action="store_true", help="report unused or undeclared indexes")
+    parser.add_argument("--check-plans", action="store_true", help="fail if a hot-path query uses a COLLSCAN")
+    args = parser.parse_args(argv)
+
+    db = mongo_manager.connect()
+    failed = False
+
+    try:
+        if args.create and create_indexes(db):
+            failed = True
+
+        missing = find_missing_indexes(db)
+        for collection_name, names in missing.items():
+            print(f"Missing indexes on {collection_name}: {', '.join(names)}")
+        failed = failed or bool(missing)
+
+        if args.report:
+            for collection_name, entries in find_unused_indexes(db).items():
+                for entry in entries:
+                    print(f"Unused index on {collection_name}: {entry['name']} ({entry['reason']})")
+
+        if args.check_plans:
+            for scan in check_query_plans(db):
+                print(f"COLLSCAN on {scan['collection']} for query {scan['query']}")
+                failed = True
+    finally:
+        mongo_manager.close()
+
+    if not failed:
+        print("Index verification passed")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""
+Rewrite placed modules into the compact stored form.
+
+Placed modules used to embed a full copy of their module; they now store only
+the module reference, integer position and rotation, and are hydrated from the
+module catalog at read time. This rewrites older documents and reports the
+storage saved:
+    python -m DB.migrations.compact_placed_modules [--dry-run]
+"""
+import argparse
+import bson
+from pymongo import ReplaceOne
+from app.repositories.placed_module_repository import compact_placed_module
+
+BATCH_SIZE = 1000
+
+def compact(db, batch_size: int = BATCH_SIZE, dry_run: bool = False) -> dict:
+    """
+    Replace every non-compact placed module with its compact form
+
+    Returns the number of documents scanned and rewritten together with their
+    BSON size before and after.
+    """
+    collection = db["placed_modules"]
+    report = {"scanned": 0, "rewritten": 0, "bytes_before": 0, "bytes_after": 0}
+    operations = []
+
+    for placed_module in collection.find():
+        compacted = compact_placed_module(placed_module)
+        size_before = len(bson.encode(placed_module))
+        size_after = len(bson.encode(compacted))
+
+        report["scanned"] += 1
+        report["bytes_before"] += size_before
+        report["bytes_after"] += size_after
+
+        if compacted == placed_module:
+            continue
+
+        report["rewritten"] += 1
+        if dry_run:
+            continue
+
+        operations.append(ReplaceOne({"_id": placed_module["_id"]}, compacted))
+        if len(operations) >= batch_size:
+            collection.bulk_write(operations, ordered=False)
+            operations = []
+
+    if operations:
+        collection.bulk_write(operations, ordered=False)
+
+    return report
+
+def main(argv=None):
+    from DB.cliente import mongo_manager
+
+    parser = argparse.ArgumentParser(description="Rewrite placed modules into the compact stored form")
+    parser.add_argument("--dry-run", action="store_true", help="report the size reduction without writing")
+    args = parser.parse_args(argv)
+
+    try:
+        report = compact(mongo_manager.connect(), dry_run=args.dry_run)
+    finally:
+        mongo_manager.close()
+
+    saved = report["bytes_before"] - report["bytes_after"]
+    percent = 100 * saved / report["bytes_before"] if report["bytes_before"] else 0
+    action = "Would rewrite" if args.dry_run else "Rewrote"
+    print(f"{action} {report['rewritten']} of {report['scanned']} placed modules")
+    print(f"Size: {report['bytes_before']} -> {report['bytes_after']} bytes ({saved} bytes, {percent:.1f}% smaller)")
+
+if __name__ == "__main__":
+    main()
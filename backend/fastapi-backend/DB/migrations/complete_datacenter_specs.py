@@ -0,0 +1,37 @@
+"""
+Rebuild the materialized complete datacenter specs from the spec rows.
+
+The repositories keep complete_datacenter_specs up to date on every write;
+this backfills it for rows written before it existed (or written directly to
+the database) and drops entries whose component has no rows left:
+    python -m DB.migrations.complete_datacenter_specs
+"""
+from app.repositories.datacenter_spec_repository import SPEC_ROW_ORDER, complete_spec_operations, revision_claims
+
+def rebuild(db) -> int:
+    """Rebuild every materialized complete spec, returning how many exist"""
+    specs = db["datacenter_specs"]
+    complete_specs = db["complete_datacenter_specs"]
+
+    component_ids = [id for id in specs.distinct("ID") if id is not None]
+    complete_specs.delete_many({"_id": {"$nin": component_ids}})
+
+    if component_ids:
+        # Claim revisions first, like the write path, so writes made during the rebuild are not overwritten
+        complete_specs.bulk_write(revision_claims(component_ids), ordered=False)
+        revisions = {document["_id"]: document["revision"]
+                     for document in complete_specs.find({"_id": {"$in": component_ids}}, {"revision": 1})}
+        # Same query the write path uses, so rows merge in the same order
+        rows = list(specs.find({"ID": {"$in": component_ids}}).sort(SPEC_ROW_ORDER))
+        complete_specs.bulk_write(complete_spec_operations(component_ids, rows, revisions), ordered=False)
+
+    return len(component_ids)
+
+if __name__ == "__main__":
+    from DB.cliente import mongo_manager
+
+    try:
+        count = rebuild(mongo_manager.connect())
+        print(f"Rebuilt {count} complete datacenter specs")
+    finally:
+        mongo_manager.close()
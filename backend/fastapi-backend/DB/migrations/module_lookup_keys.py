@@ -0,0 +1,41 @@
+"""
+Backfill the normalized lookup_keys field on every module document.
+
+Module resolution goes through a single indexed query on lookup_keys, so
+documents written before the field existed must be backfilled once:
+    python -m DB.migrations.module_lookup_keys
+"""
+from pymongo import UpdateOne
+from app.repositories.module_repository import module_lookup_keys
+
+BATCH_SIZE = 1000
+
+def backfill(db, batch_size: int = BATCH_SIZE) -> int:
+    """Set lookup_keys on every module that is missing or has stale keys"""
+    collection = db["modules"]
+    updated = 0
+    operations = []
+
+    for module in collection.find({}, {"id": 1, "ID": 1, "lookup_keys": 1}):
+        keys = module_lookup_keys(module)
+        if module.get("lookup_keys") == keys:
+            continue
+
+        operations.append(UpdateOne({"_id": module["_id"]}, {"$set": {"lookup_keys": keys}}))
+        if len(operations) >= batch_size:
+            updated += collection.bulk_write(operations, ordered=False).modified_count
+            operations = []
+
+    if operations:
+        updated += collection.bulk_write(operations, ordered=False).modified_count
+
+    return updated
+
+if __name__ == "__main__":
+    from DB.cliente import mongo_manager
+
+    try:
+        count = backfill(mongo_manager.connect())
+        print(f"Backfilled lookup keys on {count} modules")
+    finally:
+        mongo_manager.close()
@@ -0,0 +1,109 @@
+"""
+Upgrade stored documents to the current schema version of their collection.
+
+Every migrated document carries a schema_version. MIGRATIONS lists, per
+collection, the ordered upgrade steps: step N rewrites a version N document
+(unstamped documents are version 0) into the version N + 1 shape. The
+repositories run new documents through upgrade_document before inserting
+them, and readers take a fast path for documents at the current version,
+keeping the legacy fallbacks only for documents this has not reached yet:
+    python -m DB.migrations.schema_versions [--dry-run] [--collection modules]
+"""
+import argparse
+from typing import Dict, Iterable, Optional
+from pymongo import ReplaceOne
+from DB.esquemas.esquema_modules import MODULE_SCHEMA_VERSION, upgrade_module
+from DB.esquemas.esquema_datacenter_styles import DATACENTER_STYLE_SCHEMA_VERSION, upgrade_datacenter_style
+from DB.esquemas.esquema_datacenter_specs import DATACENTER_SPEC_SCHEMA_VERSION, upgrade_datacenter_spec
+
+BATCH_SIZE = 1000
+
+MIGRATIONS = {
+    "modules": [upgrade_module],
+    "datacenter_styles": [upgrade_datacenter_style],
+    "datacenter_specs": [upgrade_datacenter_spec],
+}
+
+# Current version per collection, owned by the esquema that reads it
+SCHEMA_VERSIONS = {
+    "modules": MODULE_SCHEMA_VERSION,
+    "datacenter_styles": DATACENTER_STYLE_SCHEMA_VERSION,
+    "datacenter_specs": DATACENTER_SPEC_SCHEMA_VERSION,
+}
+
+def schema_version(document: dict) -> int:
+    """Stored schema version of a document; unstamped documents are version 0"""
+    return document.get("schema_version", 0)
+
+def outdated_filter(collection_name: str) -> dict:
+    """Query matching the documents below the current version (including unstamped ones)"""
+    return {"schema_version": {"$not": {"$gte": SCHEMA_VERSIONS[collection_name]}}}
+
+def upgrade_document(collection_name: str, document: dict) -> dict:
+    """Apply every pending upgrade step to a document, returning a stamped copy"""
+    steps = MIGRATIONS[collection_name]
+    version = schema_version(document)
+    document = dict(document)
+
+    for step in steps[version:]:
+        document = step(document)
+    document["schema_version"] = max(version, len(steps))
+    return document
+
+def migrate_collection(db, collection_name: str, batch_size: int = BATCH_SIZE, dry_run: bool = False) -> dict:
+    """
+    Rewrite the outdated documents of one collection
+
+    Returns the number of outdated documents found and rewritten. Already
+    current documents are never read.
+    """
+    collection = db[collection_name]
+    report = {"outdated": 0, "rewritten": 0}
+    operations = []
+
+    for document in collection.find(outdated_filter(collection_name)):
+        report["outdated"] += 1
+        if dry_run:
+            continue
+
+        operations.append(ReplaceOne({"_id": document["_id"]}, upgrade_document(collection_name, document)))
+        if len(operations) >= batch_size:
+            report["rewritten"] += collection.bulk_write(operations, ordered=False).modified_count
+            operations = []
+
+    if operations:
+        report["rewritten"] += collection.bulk_write(operations, ordered=False).modified_count
+
+    return report
+
+def migrate(db, collection_names: Optional[Iterable[str]] = None, batch_size: int = BATCH_SIZE,
+            dry_run: bool = False) -> Dict[str, dict]:
+    """Migrate every registered collection (or the given ones), by collection name"""
+    return {
+        collection_name: migrate_collection(db, collection_name, batch_size, dry_run)
+        for collection_name in (collection_names or MIGRATIONS)
+    }
+
+def main(argv=None):
+    from DB.cliente import mongo_manager
+
+    parser = argparse.ArgumentParser(description="Upgrade stored documents to the current schema version")
+    parser.add_argument("--collection", action="append", choices=sorted(MIGRATIONS),
+                        help="collection to migrate (repeatable; default: all)")
+    parser.add_argument("--dry-run", action="store_true", help="count outdated documents without writing")
+    args = parser.parse_args(argv)
+
+    try:
+        reports = migrate(mongo_manager.connect(), args.collection, dry_run=args.dry_run)
+    finally:
+        mongo_manager.close()
+
+    for collection_name, report in reports.items():
+        version = SCHEMA_VERSIONS[collection_name]
+        if args.dry_run:
+            print(f"{collection_name}: {report['outdated']} documents below schema version {version}")
+        else:
+            print(f"{collection_name}: upgraded {report['rewritten']} of {report['outdated']} documents to schema version {version}")
+
+if __name__ == "__main__":
+    main()
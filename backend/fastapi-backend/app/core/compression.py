@@ -0,0 +1,187 @@
+"""
+Response compression negotiated from Accept-Encoding.
+
+A plain ASGI middleware compressing with gzip, or with brotli when the
+optional `brotli` package is installed and the client prefers or accepts it.
+Bodies smaller than the minimum size are sent uncompressed. Only public
+Starlette APIs are used.
+"""
+import os
+import zlib
+import anyio.to_thread
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; fall back to gzip only
+    brotli = None
+
+# Bodies at least this large are compressed off the event loop
+THREAD_MINIMUM_SIZE = 128 * 1024
+
+def parse_accept_encoding(header: str) -> dict:
+    """Map each encoding in an Accept-Encoding header to its quality value"""
+    encodings = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        encodings[name] = quality
+    return encodings
+
+def choose_encoding(header: str, brotli_available: bool = brotli is not None) -> str:
+    """
+    Pick the best supported encoding for an Accept-Encoding header
+
+    Brotli wins ties with gzip; returns "identity" when neither is acceptable.
+    """
+    encodings = parse_accept_encoding(header or "")
+    wildcard = encodings.get("*", 0.0)
+
+    candidates = ["br", "gzip"] if brotli_available else ["gzip"]
+    best, best_quality = "identity", 0.0
+    for encoding in candidates:
+        quality = encodings.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+class GZipCompressor:
+    content_encoding = "gzip"
+
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, body: bytes, more_body: bool) -> bytes:
+        if more_body:
+            return self._compressor.compress(body) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        return self._compressor.compress(body) + self._compressor.flush()
+
+class BrotliCompressor:
+    content_encoding = "br"
+
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, body: bytes, more_body: bool) -> bytes:
+        if more_body:
+            return self._compressor.process(body) + self._compressor.flush()
+        return self._compressor.process(body) + self._compressor.finish()
+
+class CompressionResponder:
+    """
+    Compresses one response with the given compressor
+
+    The start message is held back until the first body chunk shows whether
+    the response is large enough to compress. Responses that are already
+    encoded or partial pass through untouched.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int, make_compressor):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.make_compressor = make_compressor
+        self.compressor = None
+        self.initial_message = None
+        self.passthrough = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_with_compression)
+
+    async def send_with_compression(self, message: Message) -> None:
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            self.passthrough = "content-encoding" in headers or message["status"] == 206
+            if self.passthrough:
+                await self.send(message)
+            else:
+                self.initial_message = message
+        elif self.passthrough:
+            await self.send(message)
+        elif message_type != "http.response.body":
+            await self.flush_start()
+            await self.send(message)
+        elif self.initial_message is not None:
+            await self.start(message)
+        elif self.compressor is not None:
+            message["body"] = await self.compress(message.get("body", b""), message.get("more_body", False))
+            await self.send(message)
+        else:
+            await self.send(message)
+
+    async def start(self, message: Message) -> None:
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if len(body) < self.minimum_size and not more_body:
+            await self.flush_start()
+            await self.send(message)
+            return
+
+        headers = MutableHeaders(raw=self.initial_message["headers"])
+        headers.add_vary_header("Accept-Encoding")
+        self.compressor = self.make_compressor()
+        message["body"] = await self.compress(body, more_body)
+        headers["Content-Encoding"] = self.compressor.content_encoding
+        if more_body:
+            del headers["Content-Length"]
+        else:
+            headers["Content-Length"] = str(len(message["body"]))
+
+        await self.flush_start()
+        await self.send(message)
+
+    async def flush_start(self) -> None:
+        if self.initial_message is not None:
+            initial_message, self.initial_message = self.initial_message, None
+            await self.send(initial_message)
+
+    async def compress(self, body: bytes, more_body: bool) -> bytes:
+        if len(body) >= THREAD_MINIMUM_SIZE:
+            # Compressing large bodies inline would block the event loop
+            return await anyio.to_thread.run_sync(self.compressor.compress, body, more_body)
+        return self.compressor.compress(body, more_body)
+
+class CompressionMiddleware:
+    """
+    gzip/brotli compression chosen per request from Accept-Encoding
+
+    Settings are read from the environment: COMPRESSION_MINIMUM_SIZE (bytes,
+    default 1024), COMPRESSION_GZIP_LEVEL (default 6) and
+    COMPRESSION_BROTLI_QUALITY (default 4). The defaults trade a little ratio
+    for much lower latency on multi-megabyte layouts.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = None, gzip_level: int = None, brotli_quality: int = None):
+        self.app = app
+        self.minimum_size = minimum_size if minimum_size is not None else int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024"))
+        self.gzip_level = gzip_level if gzip_level is not None else int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+        self.brotli_quality = brotli_quality if brotli_quality is not None else int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("Accept-Encoding", ""))
+        if encoding == "br":
+            responder = CompressionResponder(self.app, self.minimum_size, lambda: BrotliCompressor(self.brotli_quality))
+        elif encoding == "gzip":
+            responder = CompressionResponder(self.app, self.minimum_size, lambda: GZipCompressor(self.gzip_level))
+        else:
+            await self.app(scope, receive, send)
+            return
+
+        await responder(scope, receive, send)
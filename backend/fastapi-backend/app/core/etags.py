@@ -0,0 +1,52 @@
+"""
+Strong ETags and conditional GET helpers.
+
+ETags are built from whatever version identifies a representation (a catalog
+content hash, a datacenter's updated_at and layout_version), so a matching
+If-None-Match can be answered with 304 before the expensive part of the
+response is loaded or serialized.
+"""
+import hashlib
+from fastapi import Request, Response
+
+# Clients may cache but must revalidate with If-None-Match before reuse
+CACHE_CONTROL = "no-cache"
+
+def make_etag(*parts) -> str:
+    """Quoted strong ETag hashing the given version parts"""
+    digest = hashlib.sha1("\x1f".join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest}"'
+
+def content_etag(body: bytes) -> str:
+    """Quoted strong ETag hashing a rendered body, for data with no version"""
+    return f'"{hashlib.sha1(body).hexdigest()}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """
+    Whether If-None-Match matches the ETag
+
+    If-None-Match uses weak comparison, so a W/ prefix added by a proxy
+    still matches.
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+
+    if header.strip() == "*":
+        return True
+
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+def with_etag(response: Response, etag: str) -> Response:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    return response
@@ -0,0 +1,153 @@
+"""
+Sparse fieldsets (`fields=` query parameters) pushed down as Mongo projections.
+
+Each resource maps its API field names to the document fields its esquema
+function reads, so a request for a few fields only reads those fields from
+MongoDB. The esquema output is then trimmed to the requested fields; `id` is
+always returned.
+"""
+from typing import Dict, List, Optional, Tuple
+from fastapi import HTTPException
+from DB.esquemas.esquema_modules import MODERN_FIELD_SOURCES
+
+DATACENTER_FIELDS = {
+    "id": ("_id",),
+    "name": ("name",),
+    "description": ("description",),
+    "created_at": ("created_at",),
+    "updated_at": ("updated_at",),
+    "style_id": ("style_id",),
+    "dim": ("dim",),
+    "grid_connection": ("grid_connection",),
+    "water_connection": ("water_connection",),
+    "layout_version": ("layout_version",),
+    # Placed modules live in their own collection; see split_nested
+    "modules": (),
+}
+
+PLACED_MODULE_FIELDS = {
+    "id": ("_id", "id"),
+    "position": ("position",),
+    "rotation": ("rotation",),
+    "datacenter_id": ("datacenter_id",),
+    "module_id": ("module_id",),
+    # Hydrated from the module catalog, so only the reference is read
+    "module": ("module_id", "module"),
+}
+
+DATACENTER_STYLE_FIELDS = {
+    "id": ("_id", "id"),
+    "name": ("name", "Name"),
+    "description": ("description", "Description"),
+    "grid_connection": ("grid_connection", "Grid_Connection"),
+    "water_connection": ("water_connection", "Water_Connection"),
+    "dim": ("dim", "Space_X", "Space_Y"),
+    "focus": ("focus", "Focus"),
+    "processing": ("processing", "Processing"),
+    "price": ("price", "Price"),
+    "data_storage": ("data_storage", "Data_storage"),
+    "recommended_modules": ("recommended_modules", "Recommended_Modules"),
+}
+
+# Modules are schemaless: any field may be requested and is read under its own
+# name, plus the legacy spellings listed here
+MODULE_FIELDS = {
+    "id": ("_id", "id"),
+    "ID": ("_id", "ID"),
+    "type": ("type", "Name"),
+    "dim": ("dim", "Space_X", "Space_Y"),
+    **{field: (field, legacy_field) for field, legacy_field in MODERN_FIELD_SOURCES},
+}
+
+def _is_known(name: str, allowed: Dict[str, tuple], nested: Dict[str, Dict[str, tuple]]) -> bool:
+    parent, _, child = name.partition(".")
+    if not child:
+        return parent in allowed
+    return parent in nested and child in nested[parent]
+
+def parse_fields(fields: Optional[str], allowed: Optional[Dict[str, tuple]] = None,
+                 nested: Optional[Dict[str, Dict[str, tuple]]] = None) -> Optional[List[str]]:
+    """
+    Split a comma-separated fields parameter
+
+    Returns None when no fieldset was requested. Unknown names are rejected
+    with a 400; names in `nested` may be followed by a dotted sub-field of that
+    resource (e.g. `modules.position`).
+    """
+    if fields is None:
+        return None
+
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    if allowed is not None:
+        unknown = [name for name in names if not _is_known(name, allowed, nested or {})]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return names
+
+def split_nested(names: Optional[List[str]], parent: str) -> Tuple[Optional[List[str]], bool, Optional[List[str]]]:
+    """
+    Separate a parent's own fields from the sub-fields of one nested resource
+
+    Returns (own fields, whether the nested resource was requested, its
+    sub-fields or None for all of them).
+    """
+    if names is None:
+        return None, True, None
+
+    own = [name for name in names if name.split(".", 1)[0] != parent]
+    children = [name.split(".", 1)[1] for name in names if name.startswith(parent + ".")]
+    requested = parent in names or bool(children)
+    return own, requested, (children or None) if parent not in names else None
+
+def projection(names: Optional[List[str]], sources: Dict[str, tuple]) -> Optional[dict]:
+    """Mongo projection reading only what the requested fields need"""
+    if names is None:
+        return None
+
+    fields = {"_id": 1}
+    for name in names:
+        for source in sources.get(name, ()):
+            fields[source] = 1
+    return fields
+
+def module_projection(names: Optional[List[str]]) -> Optional[dict]:
+    """Mongo projection for a module fieldset, reading each field under its own name and its legacy spellings"""
+    if names is None:
+        return None
+    names = ["id", *names]
+    return projection(names, {name: MODULE_FIELDS.get(name, (name,)) for name in names})
+
+def includes(names: Optional[List[str]], name: str) -> bool:
+    """Whether a field is part of the response (every field is when no fieldset was requested)"""
+    return names is None or name in names
+
+def select_fields(row: Optional[dict], names: Optional[List[str]]) -> Optional[dict]:
+    """Trim an esquema row to the requested fields (plus id)"""
+    if row is None or names is None:
+        return row
+    return {key: row[key] for key in ("id", *names) if key in row}
+
+def select_fields_many(rows: list, names: Optional[List[str]]) -> list:
+    if names is None:
+        return rows
+    return [select_fields(row, names) for row in rows]
+
+class DatacenterFieldset:
+    """A datacenter fields= parameter resolved into projections for both collections"""
+
+    def __init__(self, fields: Optional[str]):
+        names = parse_fields(fields, DATACENTER_FIELDS, nested={"modules": PLACED_MODULE_FIELDS})
+        self.fields = fields
+        self.own, self.include_modules, self.module_fields = split_nested(names, "modules")
+        self.projection = projection(self.own, DATACENTER_FIELDS)
+        self.module_projection = projection(self.module_fields, PLACED_MODULE_FIELDS)
+        # Module data is only attached when it is part of the response
+        self.hydrate = includes(self.module_fields, "module")
+
+    def select(self, row: dict) -> dict:
+        if self.own is None:
+            return row
+        row = select_fields(row, self.own + (["modules"] if self.include_modules else []))
+        if "modules" in row:
+            row["modules"] = select_fields_many(row["modules"], self.module_fields)
+        return row
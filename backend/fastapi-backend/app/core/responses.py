@@ -0,0 +1,70 @@
+import inspect
+import orjson
+from bson import ObjectId
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+
+def _default(value):
+    """Serialize the few types orjson does not handle natively"""
+    if isinstance(value, ObjectId):
+        return str(value)
+    # Pydantic models, sets, Decimals and the like
+    return jsonable_encoder(value)
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson
+
+    ObjectId, datetime and NumPy values are serialized directly, so route
+    handlers can return this response with raw repository output and skip
+    FastAPI's jsonable_encoder pass, which dominates the cost of large layouts.
+    """
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(
+            content,
+            default=_default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        )
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Documents converted and written per chunk of a streamed response
+NDJSON_BATCH_SIZE = 1000
+
+def wants_ndjson(request: Request, stream: bool = False) -> bool:
+    """Whether the client opted into streaming via ?stream=true or the Accept header"""
+    return stream or NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+async def ndjson_chunks(cursor, convert, batch_size: int = NDJSON_BATCH_SIZE):
+    """
+    Yield NDJSON chunks from an async cursor, one batch of documents at a time
+
+    convert maps a list of raw documents to a list of API rows and may be a
+    coroutine function (e.g. to hydrate from the module catalog). Only one
+    batch is held in memory, so peak memory is flat in the collection size.
+    """
+    try:
+        batch = []
+        async for document in cursor:
+            batch.append(document)
+            if len(batch) >= batch_size:
+                yield await _encode_batch(batch, convert)
+                batch = []
+
+        if batch:
+            yield await _encode_batch(batch, convert)
+    finally:
+        # Release the server-side cursor if the client disconnects mid-stream
+        await cursor.close()
+
+async def _encode_batch(batch: list, convert) -> bytes:
+    rows = convert(batch)
+    if inspect.isawaitable(rows):
+        rows = await rows
+    return b"".join(orjson.dumps(row, default=_default, option=orjson.OPT_APPEND_NEWLINE) for row in rows)
+
+def ndjson_response(cursor, convert, batch_size: int = NDJSON_BATCH_SIZE) -> StreamingResponse:
+    """Stream a cursor as newline-delimited JSON"""
+    return StreamingResponse(ndjson_chunks(cursor, convert, batch_size), media_type=NDJSON_MEDIA_TYPE)
@@ -1,10 +1,41 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from bson.errors import InvalidId
+from DB.cliente import mongo_manager
+from DB.indexes import ensure_indexes
+from app.core.compression import CompressionMiddleware
+from app.services.exploration import design_explorer
+from app.services.module_catalog import module_catalog
 from app.routers import modules, datacenter_spec, datacenter_styles, datacenters, placed_modules, positions
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open the shared MongoDB pool once for the whole process
+    db = await mongo_manager.connect_async()
+
+    # Create or verify the declared indexes before serving traffic
+    if os.getenv("MONGODB_ENSURE_INDEXES", "true").lower() == "true":
+        await ensure_indexes(db)
+
+    # Optionally follow the modules change stream so catalog writes made by
+    # other processes invalidate this process's cache too
+    watcher = None
+    if os.getenv("MODULE_CATALOG_CHANGE_STREAM", "false").lower() == "true":
+        watcher = asyncio.create_task(module_catalog.watch(db["modules"]))
+
+    yield
+
+    if watcher:
+        watcher.cancel()
+    design_explorer.shutdown()
+    await mongo_manager.close_async()
+    mongo_manager.close()
+
+app = FastAPI(lifespan=lifespan)
 
 @app.get("/")
 def read_root():
@@ -27,6 +58,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large responses with brotli or gzip, as the client accepts
+app.add_middleware(CompressionMiddleware)
+
 # Include all routers
 app.include_router(modules.router)
 app.include_router(datacenter_spec.router)
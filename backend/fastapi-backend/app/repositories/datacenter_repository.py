@@ -1,13 +1,115 @@
+import asyncio
 from bson import ObjectId
-from DB.cliente import get_database
+from pymongo import InsertOne, UpdateOne, DeleteOne, ReturnDocument
+from pymongo.errors import BulkWriteError
+from DB.cliente import get_database, get_async_database, mongo_manager
+from app.repositories.placed_module_repository import PlacedModuleRepository, compact_placed_module, hydrate_placed_modules
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 
+class LayoutConflict(Exception):
+    """A layout delta targets placed modules the datacenter does not have"""
+
+def stored_placed_modules(datacenter_id: str, modules: List[dict]) -> List[dict]:
+    """
+    Compact placed modules for storage under a datacenter
+
+    The caller's documents keep their module data but get the datacenter_id
+    and a pre-assigned _id, so they can be returned without a re-read.
+    """
+    stored = []
+    for module in modules:
+        module["datacenter_id"] = datacenter_id
+        module.setdefault("_id", ObjectId())
+        stored.append(compact_placed_module(module))
+    return stored
+
+def build_layout_delta_writes(datacenter_id: str, operations: List[dict]) -> List[Any]:
+    """
+    Turn layout delta operations into the smallest set of bulk writes
+
+    Operations on the same placed module are folded together: a move and a
+    rotate become one update, and anything followed by a remove becomes a
+    single delete. Adds carry the placed-module document to insert, which
+    gets its datacenter_id and a pre-assigned _id in place.
+    """
+    inserts = []
+    updates = {}
+    deletes = set()
+
+    for operation in operations:
+        op = operation["op"]
+        if op == "add":
+            inserts.extend(stored_placed_modules(datacenter_id, [operation["document"]]))
+            continue
+
+        target = operation["placed_module_id"]
+        if op == "remove":
+            updates.pop(target, None)
+            deletes.add(target)
+            continue
+
+        changes = updates.setdefault(target, {})
+        if op == "move":
+            changes["position"] = {"x": int(operation["position"]["x"]), "y": int(operation["position"]["y"])}
+            if operation.get("rotation") is not None:
+                changes["rotation"] = int(operation["rotation"])
+        elif op == "rotate":
+            changes["rotation"] = int(operation["rotation"])
+
+    writes = [InsertOne(document) for document in inserts]
+    writes.extend(
+        UpdateOne({"_id": ObjectId(target), "datacenter_id": datacenter_id}, {"$set": changes})
+        for target, changes in updates.items()
+        if target not in deletes
+    )
+    writes.extend(DeleteOne({"_id": ObjectId(target), "datacenter_id": datacenter_id}) for target in deletes)
+    return writes
+
+def page_pipeline(skip: int, limit: int, after: Optional[str] = None, projection: Optional[dict] = None,
+                  include_modules: bool = False, module_projection: Optional[dict] = None) -> List[dict]:
+    """
+    Aggregation pipeline for one page of datacenters ordered by _id
+
+    The keyset $match, $sort, $skip and $limit lead the pipeline so they run
+    on the _id index; placed modules are only looked up for the page.
+    """
+    pipeline = []
+    if after:
+        pipeline.append({"$match": {"_id": {"$gt": ObjectId(after)}}})
+    pipeline.append({"$sort": {"_id": 1}})
+    if skip:
+        pipeline.append({"$skip": skip})
+    pipeline.append({"$limit": limit})
+    if projection:
+        pipeline.append({"$project": projection})
+
+    if include_modules:
+        lookup = {
+            "from": "placed_modules",
+            "localField": "_datacenter_id",
+            "foreignField": "datacenter_id",
+            "as": "modules"
+        }
+        if module_projection:
+            lookup["pipeline"] = [{"$project": module_projection}]
+
+        # Placed modules reference their datacenter by the stringified _id
+        pipeline.extend([
+            {"$addFields": {"_datacenter_id": {"$toString": "$_id"}}},
+            {"$lookup": lookup},
+            {"$project": {"_datacenter_id": 0}}
+        ])
+    return pipeline
+
 class DatacenterRepository:
-    def __init__(self):
-        db = get_database()
-        self.collection = db["datacenters"]
-        self.placed_modules_collection = db["placed_modules"]
+    @property
+    def collection(self):
+        return get_database()["datacenters"]
+
+    @property
+    def placed_modules_collection(self):
+        return get_database()["placed_modules"]
 
     def create(self, datacenter: dict) -> str:
         """Create a new datacenter"""
@@ -24,10 +126,7 @@ class DatacenterRepository:
 
         # Add datacenter_id to modules and insert them if they exist
         if modules:
-            for module in modules:
-                module["datacenter_id"] = datacenter_id
-
-            self.placed_modules_collection.insert_many(modules)
+            self.placed_modules_collection.insert_many(stored_placed_modules(datacenter_id, modules))
 
         return datacenter_id
 
@@ -72,10 +171,7 @@ class DatacenterRepository:
             self.placed_modules_collection.delete_many({"datacenter_id": id})
 
             if modules:
-                for module in modules:
-                    module["datacenter_id"] = id
-
-                self.placed_modules_collection.insert_many(modules)
+                self.placed_modules_collection.insert_many(stored_placed_modules(id, modules))
 
         return result
 
@@ -92,7 +188,7 @@ class DatacenterRepository:
         """Populate the modules field with the placed modules for this datacenter"""
         datacenter_id = str(datacenter["_id"]) if "_id" in datacenter else datacenter.get("id")
         modules = list(self.placed_modules_collection.find({"datacenter_id": datacenter_id}))
-        datacenter["modules"] = modules
+        datacenter["modules"] = PlacedModuleRepository()._populate_modules(modules)
         return datacenter
 
     def search(self, query: str, limit: int = 10) -> List[dict]:
@@ -108,3 +204,270 @@ class DatacenterRepository:
     def get_by_style_id(self, style_id: str) -> List[dict]:
         """Get datacenters by style ID"""
         return list(self.collection.find({"style_id": style_id}))
+
+
+class AsyncDatacenterRepository:
+    """asyncio counterpart of DatacenterRepository used by the API routers"""
+
+    @property
+    def collection(self):
+        return get_async_database()["datacenters"]
+
+    @property
+    def placed_modules_collection(self):
+        return get_async_database()["placed_modules"]
+
+    async def _run_write(self, operation):
+        """Run a multi-collection write, inside a transaction when the deployment supports one"""
+        if not mongo_manager.async_supports_transactions:
+            return await operation(None)
+
+        async with mongo_manager.async_client.start_session() as session:
+            return await session.with_transaction(operation)
+
+    async def create(self, datacenter: dict) -> str:
+        """
+        Create a new datacenter
+
+        Placed modules passed under "modules" are written in compact form with
+        one unordered insert_many. The passed datacenter keeps its "modules",
+        and it and its placed modules get their _id set in place.
+        """
+        # Set timestamps
+        datacenter["created_at"] = datetime.utcnow().isoformat()
+        datacenter["updated_at"] = datacenter["created_at"]
+
+        # Store modules separately if they exist
+        modules = datacenter.pop("modules", [])
+
+        async def write(session):
+            # Insert the datacenter
+            result = await self.collection.insert_one(datacenter, session=session)
+            datacenter_id = str(result.inserted_id)
+
+            # Add datacenter_id to modules and insert them if they exist
+            if modules:
+                await self.placed_modules_collection.insert_many(stored_placed_modules(datacenter_id, modules), ordered=False, session=session)
+
+            return datacenter_id
+
+        datacenter_id = await self._run_write(write)
+        datacenter["modules"] = modules
+        return datacenter_id
+
+    async def get_by_id(self, id: str, include_modules: bool = True, projection: Optional[dict] = None,
+                        module_projection: Optional[dict] = None, hydrate: bool = True) -> Optional[dict]:
+        """
+        Get a datacenter by ID
+
+        projection and module_projection limit the fields read from the
+        datacenter and its placed modules; hydrate=False skips attaching
+        module data from the catalog.
+        """
+        # First try as ObjectId
+        if ObjectId.is_valid(id):
+            if include_modules:
+                # Placed modules are keyed by the stringified _id, so both
+                # lookups can run at the same time
+                datacenter, modules = await asyncio.gather(
+                    self.collection.find_one({"_id": ObjectId(id)}, projection),
+                    self.placed_modules_collection.find({"datacenter_id": id}, module_projection).to_list(None)
+                )
+                if datacenter:
+                    datacenter["modules"] = await hydrate_placed_modules(modules) if hydrate else modules
+                    return datacenter
+            else:
+                datacenter = await self.collection.find_one({"_id": ObjectId(id)}, projection)
+                if datacenter:
+                    return datacenter
+
+        # Try with string ID
+        datacenter = await self.collection.find_one({"id": id}, projection)
+        if datacenter:
+            return await self._populate_modules(datacenter, module_projection, hydrate) if include_modules else datacenter
+
+        return None
+
+    async def get_all(self, include_modules: bool = False) -> List[dict]:
+        """Get all datacenters"""
+        datacenters = await self.collection.find().to_list(None)
+
+        if include_modules:
+            return list(await asyncio.gather(*(self._populate_modules(dc) for dc in datacenters)))
+
+        return datacenters
+
+    async def list_page(self, skip: int = 0, limit: int = 100, include_modules: bool = False, after: Optional[str] = None,
+                        projection: Optional[dict] = None, module_projection: Optional[dict] = None,
+                        hydrate: bool = True) -> Dict[str, Any]:
+        """
+        Get one page of datacenters and the collection total
+
+        Pages are ordered by _id. Passing the last _id of a page as `after`
+        switches to keyset pagination, which stays cheap for deep pages where
+        a large skip would not. The page is a plain aggregation that matches,
+        sorts and limits on the _id index before anything else runs, and the
+        total comes from the collection metadata at the same time. The
+        projections are applied inside the aggregation, so unrequested fields
+        never leave the server.
+        """
+        pipeline = page_pipeline(skip, limit, after, projection, include_modules, module_projection)
+
+        async def read_page():
+            return await (await self.collection.aggregate(pipeline)).to_list(None)
+
+        datacenters, total = await asyncio.gather(read_page(), self.collection.estimated_document_count())
+
+        if include_modules and hydrate:
+            # Hydrate the whole page against one catalog snapshot
+            await hydrate_placed_modules([module for datacenter in datacenters for module in datacenter["modules"]])
+
+        return {
+            "total": total,
+            "datacenters": datacenters,
+            "next_cursor": str(datacenters[-1]["_id"]) if len(datacenters) == limit else None
+        }
+
+    async def update(self, id: str, datacenter_data: dict) -> Any:
+        """Update a datacenter"""
+        # Update timestamp
+        datacenter_data["updated_at"] = datetime.utcnow().isoformat()
+
+        # Handle modules separately
+        modules = datacenter_data.pop("modules", None)
+
+        filter_query = {"_id": ObjectId(id)} if ObjectId.is_valid(id) else {"id": id}
+
+        update = {"$set": datacenter_data}
+        if modules is not None:
+            # Replacing the layout invalidates every outstanding layout delta
+            update["$inc"] = {"layout_version": 1}
+
+        async def write(session):
+            # Update the datacenter
+            result = await self.collection.update_one(filter_query, update, session=session)
+
+            # If modules are provided, replace all existing modules
+            if modules is not None:
+                await self.placed_modules_collection.delete_many({"datacenter_id": id}, session=session)
+
+                if modules:
+                    await self.placed_modules_collection.insert_many(stored_placed_modules(id, modules), ordered=False, session=session)
+
+            return result
+
+        return await self._run_write(write)
+
+    async def apply_layout_delta(self, id: str, expected_version: int, operations: List[dict]) -> Optional[Dict[str, Any]]:
+        """
+        Apply incremental layout operations guarded by the layout version
+
+        The version is checked and bumped atomically before any placed module
+        is written, so concurrent editors working from the same version cannot
+        both succeed. Returns None when the expected version is stale and
+        raises LayoutConflict when an operation targets a placed module the
+        datacenter does not have. Without a transaction the bump is undone if
+        nothing was written.
+        """
+        filter_query = {"_id": ObjectId(id)} if ObjectId.is_valid(id) else {"id": id}
+        if expected_version:
+            version_query = {"layout_version": expected_version}
+        else:
+            # Datacenters written before layouts were versioned are at version 0
+            version_query = {"$or": [{"layout_version": 0}, {"layout_version": {"$exists": False}}]}
+        writes = build_layout_delta_writes(id, operations)
+        targets = {operation["placed_module_id"] for operation in operations if operation["op"] != "add"}
+
+        async def release_version():
+            await self.collection.update_one(
+                {**filter_query, "layout_version": expected_version + 1},
+                {"$inc": {"layout_version": -1}}
+            )
+
+        async def write(session):
+            result = await self.collection.update_one(
+                {**filter_query, **version_query},
+                {"$inc": {"layout_version": 1}, "$set": {"updated_at": datetime.utcnow().isoformat()}},
+                session=session
+            )
+            if result.matched_count == 0:
+                return None
+
+            # Check the targets up front, since a standalone server cannot undo a partial delta
+            if targets:
+                found = await self.placed_modules_collection.count_documents(
+                    {"_id": {"$in": [ObjectId(target) for target in targets]}, "datacenter_id": id},
+                    session=session
+                )
+                if found < len(targets):
+                    if session is None:
+                        await release_version()
+                    raise LayoutConflict(f"{len(targets) - found} of the targeted placed modules are not in datacenter {id}")
+
+            summary = {"version": expected_version + 1, "inserted_ids": [], "modified": 0, "deleted": 0}
+            if writes:
+                try:
+                    bulk = await self.placed_modules_collection.bulk_write(writes, ordered=False, session=session)
+                except BulkWriteError as e:
+                    applied = sum(e.details.get(key, 0) for key in ("nInserted", "nMatched", "nRemoved"))
+                    if session is None and applied == 0:
+                        await release_version()
+                    raise
+                # A placed module removed since the check above
+                if bulk.matched_count + bulk.deleted_count < len(targets):
+                    raise LayoutConflict(f"Some of the targeted placed modules were removed from datacenter {id} concurrently")
+                summary["inserted_ids"] = [str(operation["document"]["_id"]) for operation in operations if operation["op"] == "add"]
+                summary["modified"] = bulk.modified_count
+                summary["deleted"] = bulk.deleted_count
+            return summary
+
+        return await self._run_write(write)
+
+    async def touch_layout(self, id: str) -> Optional[int]:
+        """Bump the layout version after a single placed-module change, returning the new version"""
+        filter_query = {"_id": ObjectId(id)} if ObjectId.is_valid(id) else {"id": id}
+        updated = await self.collection.find_one_and_update(
+            filter_query,
+            {"$inc": {"layout_version": 1}, "$set": {"updated_at": datetime.utcnow().isoformat()}},
+            projection={"layout_version": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        return updated.get("layout_version") if updated else None
+
+    async def delete(self, id: str) -> Any:
+        """Delete a datacenter and all its modules"""
+        filter_query = {"_id": ObjectId(id)} if ObjectId.is_valid(id) else {"id": id}
+        _, result = await asyncio.gather(
+            self.placed_modules_collection.delete_many({"datacenter_id": id}),
+            self.collection.delete_one(filter_query)
+        )
+        return result
+
+    async def attach_modules(self, datacenter: dict, module_projection: Optional[dict] = None, hydrate: bool = True) -> dict:
+        """Load the placed modules of a datacenter fetched without them"""
+        return await self._populate_modules(datacenter, module_projection, hydrate)
+
+    async def _populate_modules(self, datacenter: dict, module_projection: Optional[dict] = None, hydrate: bool = True) -> dict:
+        """Populate the modules field with the placed modules for this datacenter"""
+        datacenter_id = str(datacenter["_id"]) if "_id" in datacenter else datacenter.get("id")
+        modules = await self.placed_modules_collection.find({"datacenter_id": datacenter_id}, module_projection).to_list(None)
+        datacenter["modules"] = await hydrate_placed_modules(modules) if hydrate else modules
+        return datacenter
+
+    async def search(self, query: str, limit: int = 10) -> List[dict]:
+        """Search datacenters by name or description"""
+        filter_query = {
+            "$or": [
+                {"name": {"$regex": query, "$options": "i"}},
+                {"description": {"$regex": query, "$options": "i"}}
+            ]
+        }
+        return await self.collection.find(filter_query).limit(limit).to_list(None)
+
+    async def get_by_style_id(self, style_id: str) -> List[dict]:
+        """Get datacenters by style ID"""
+        return await self.collection.find({"style_id": style_id}).to_list(None)
+
+    def iter_by_style_id(self, style_id: str, batch_size: int = 1000):
+        """Cursor over the datacenters using a style, fetched in batches"""
+        return self.collection.find({"style_id": style_id}).batch_size(batch_size)
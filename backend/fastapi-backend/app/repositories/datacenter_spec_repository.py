@@ -1,15 +1,131 @@
 from bson import ObjectId
-from DB.cliente import get_database
+from pymongo import ASCENDING, UpdateOne
+from DB.cliente import get_database, get_async_database
 from app.models.schemas import DatacenterSpec
-from typing import List, Dict, Any, Optional
+from DB.esquemas.esquema_datacenter_specs import DATACENTER_SPEC_SCHEMA_VERSION, unit_field_name
+from DB.migrations.schema_versions import upgrade_document
+from typing import List, Dict, Any, Iterable, Optional
+
+# merge_datacenter_specs takes the first row as the base record; the ID_1_Unit_1
+# index would otherwise return rows in Unit order
+SPEC_ROW_ORDER = [("_id", ASCENDING)]
+
+def merge_datacenter_specs(specs: List[dict]) -> Optional[Dict[str, Any]]:
+    """
+    Merge the unit rows of one datacenter spec into a single object
+
+    The first row is the base record; every following row contributes its
+    Amount under a snake_case field derived from its Unit. `constraints`
+    keeps the Amount and the Below/Above/Minimize/Maximize/Unconstrained
+    flags of every row (the base row included) by field, which is what the
+    module-mix solver reads.
+    """
+    if not specs:
+        return None
+
+    # Start with the first record, without the stored bookkeeping fields
+    complete_spec = dict(specs[0])
+    complete_spec.pop("unit_field", None)
+    complete_spec.pop("schema_version", None)
+
+    # Add _id as string for API response
+    complete_spec["id"] = str(complete_spec["_id"]) if "_id" in complete_spec else None
+
+    # Merge all unit-specific properties
+    constraints = {}
+    for index, spec in enumerate(specs):
+        if spec.get("schema_version", 0) >= DATACENTER_SPEC_SCHEMA_VERSION:
+            field_name = spec.get("unit_field")
+        else:
+            # Unmigrated rows derive the snake_case field name from the unit
+            # ("Data storage" -> data_storage, "Processing" -> processing)
+            field_name = unit_field_name(spec.get("Unit"))
+        if not field_name:
+            continue
+
+        amount = spec.get("Amount")
+        constraints[field_name] = {
+            "amount": amount,
+            "below": bool(spec.get("Below_Amount")),
+            "above": bool(spec.get("Above_Amount")),
+            "minimize": bool(spec.get("Minimize")),
+            "maximize": bool(spec.get("Maximize")),
+            "unconstrained": bool(spec.get("Unconstrained"))
+        }
+        if index and amount:
+            complete_spec[field_name] = amount
+
+    complete_spec["constraints"] = constraints
+    return complete_spec
+
+def revision_claims(component_ids: Iterable[str]) -> list:
+    """
+    Writes that claim a new refresh revision for some components
+
+    Materialized complete specs are refreshed by reading the rows after the
+    claim and writing the merged spec only over a spec of an older revision.
+    Any refresh therefore reads every row write whose claim is not newer than
+    its revision, so concurrent refreshes landing out of order cannot leave
+    an older snapshot behind. The claim creates the document if needed.
+    """
+    return [UpdateOne({"_id": component_id}, {"$inc": {"revision": 1}}, upsert=True) for component_id in component_ids]
+
+def complete_spec_operations(component_ids: Iterable[str], specs: List[dict], revisions: Dict[str, int]) -> list:
+    """
+    Writes that bring the materialized complete specs of some components up to date
+
+    `specs` are the current rows of those components in the order an ID query
+    returns them, read after `revisions` (component ID -> claimed revision,
+    see revision_claims), so each materialized spec is exactly what
+    merge_datacenter_specs builds from a live query. A component left
+    without rows keeps its document with a None spec, so its revision
+    survives; components without a claimed revision are skipped.
+    """
+    rows_by_component = {component_id: [] for component_id in component_ids}
+    for spec in specs:
+        if spec.get("ID") in rows_by_component:
+            rows_by_component[spec["ID"]].append(spec)
+
+    operations = []
+    for component_id, rows in rows_by_component.items():
+        revision = revisions.get(component_id)
+        if revision is None:
+            continue
+        operations.append(UpdateOne(
+            {"_id": component_id, "spec_revision": {"$not": {"$gte": revision}}},
+            {"$set": {"spec": merge_datacenter_specs(rows), "spec_revision": revision}}
+        ))
+    return operations
+
+def component_ids_of(specs: Iterable[Optional[dict]]) -> set:
+    """Component IDs of the given spec rows, skipping missing rows"""
+    return {spec["ID"] for spec in specs if spec and spec.get("ID") is not None}
 
 class DatacenterSpecRepository:
-    def __init__(self):
-        db = get_database()
-        self.collection = db["datacenter_specs"]
+    @property
+    def collection(self):
+        return get_database()["datacenter_specs"]
+
+    @property
+    def complete_collection(self):
+        return get_database()["complete_datacenter_specs"]
+
+    def refresh_complete_specs(self, component_ids: Iterable[str]):
+        """Rebuild the materialized complete specs of the given components"""
+        component_ids = list(component_ids)
+        if not component_ids:
+            return
+
+        # Rows must be read after the claim (see revision_claims)
+        self.complete_collection.bulk_write(revision_claims(component_ids), ordered=False)
+        claimed = self.complete_collection.find({"_id": {"$in": component_ids}}, {"revision": 1})
+        revisions = {document["_id"]: document["revision"] for document in claimed}
+        specs = list(self.collection.find({"ID": {"$in": component_ids}}).sort(SPEC_ROW_ORDER))
+        self.complete_collection.bulk_write(complete_spec_operations(component_ids, specs, revisions), ordered=False)
 
     def create(self, datacenter_spec: dict) -> str:
-        result = self.collection.insert_one(datacenter_spec)
+        result = self.collection.insert_one(upgrade_document("datacenter_specs", datacenter_spec))
+        self.refresh_complete_specs(component_ids_of([datacenter_spec]))
         return str(result.inserted_id)
 
     def get_by_id(self, id: str):
@@ -19,19 +135,29 @@ class DatacenterSpecRepository:
         return list(self.collection.find())
 
     def update(self, id: str, datacenter_spec: dict):
-        return self.collection.update_one(
+        # The row may move to another component, so both are rebuilt
+        previous = self.collection.find_one({"_id": ObjectId(id)}, {"ID": 1})
+        result = self.collection.update_one(
             {"_id": ObjectId(id)},
-            {"$set": datacenter_spec}
+            {"$set": upgrade_document("datacenter_specs", datacenter_spec) if "Unit" in datacenter_spec else datacenter_spec}
         )
+        if result.matched_count:
+            self.refresh_complete_specs(component_ids_of([previous, datacenter_spec]))
+        return result
 
     def delete(self, id: str):
-        return self.collection.delete_one({"_id": ObjectId(id)})
+        previous = self.collection.find_one({"_id": ObjectId(id)}, {"ID": 1})
+        result = self.collection.delete_one({"_id": ObjectId(id)})
+        if result.deleted_count:
+            self.refresh_complete_specs(component_ids_of([previous]))
+        return result
 
     def bulk_create(self, datacenter_specs: list) -> list:
         """Insert multiple datacenter specs at once"""
         if not datacenter_specs:
             return []
-        result = self.collection.insert_many(datacenter_specs)
+        result = self.collection.insert_many([upgrade_document("datacenter_specs", spec) for spec in datacenter_specs])
+        self.refresh_complete_specs(component_ids_of(datacenter_specs))
         return [str(id) for id in result.inserted_ids]
 
     def get_by_component_id(self, component_id: str):
@@ -51,42 +177,122 @@ class DatacenterSpecRepository:
         Get a complete datacenter spec by ID with all properties merged
 
         This combines all individual specs for the same datacenter ID into
-        a single comprehensive object with all properties.
+        a single comprehensive object with all properties. Component IDs are
+        served from the materialized complete spec; row ObjectIds and
+        components not materialized yet are merged from the rows.
         """
         if not id:
             return None
 
+        if not ObjectId.is_valid(id):
+            materialized = self.complete_collection.find_one({"_id": id})
+            # Claimed but not refreshed yet when there is no spec
+            if materialized is not None and "spec" in materialized:
+                return materialized["spec"]
+
         # Get base record
         query = {"ID": id} if not ObjectId.is_valid(id) else {"$or": [{"_id": ObjectId(id)}, {"ID": id}]}
-        specs = list(self.collection.find(query))
+        specs = list(self.collection.find(query).sort(SPEC_ROW_ORDER))
 
-        if not specs:
-            return None
+        return merge_datacenter_specs(specs)
 
-        # Start with the first record
-        complete_spec = dict(specs[0])
+    def delete_all(self):
+        """Delete all datacenter specs"""
+        self.complete_collection.delete_many({})
+        return self.collection.delete_many({})
 
-        # Add _id as string for API response
-        complete_spec["id"] = str(complete_spec["_id"]) if "_id" in complete_spec else None
 
-        # Merge all unit-specific properties
-        for spec in specs[1:]:
-            unit = spec.get("Unit")
-            amount = spec.get("Amount")
+class AsyncDatacenterSpecRepository:
+    """asyncio counterpart of DatacenterSpecRepository used by the API routers"""
 
-            if unit and amount:
-                # Convert unit name to snake_case field name
-                field_name = unit.lower().replace(" ", "_")
-                complete_spec[field_name] = amount
+    @property
+    def collection(self):
+        return get_async_database()["datacenter_specs"]
 
-                # Also handle specific field name mappings
-                if unit == "Data storage":
-                    complete_spec["data_storage"] = amount
-                elif unit == "Processing":
-                    complete_spec["processing"] = amount
+    @property
+    def complete_collection(self):
+        return get_async_database()["complete_datacenter_specs"]
 
-        return complete_spec
+    async def refresh_complete_specs(self, component_ids: Iterable[str]):
+        """Rebuild the materialized complete specs of the given components"""
+        component_ids = list(component_ids)
+        if not component_ids:
+            return
 
-    def delete_all(self):
+        # Rows must be read after the claim (see revision_claims)
+        await self.complete_collection.bulk_write(revision_claims(component_ids), ordered=False)
+        claimed = await self.complete_collection.find({"_id": {"$in": component_ids}}, {"revision": 1}).to_list(None)
+        revisions = {document["_id"]: document["revision"] for document in claimed}
+        specs = await self.collection.find({"ID": {"$in": component_ids}}).sort(SPEC_ROW_ORDER).to_list(None)
+        await self.complete_collection.bulk_write(complete_spec_operations(component_ids, specs, revisions), ordered=False)
+
+    async def create(self, datacenter_spec: dict) -> str:
+        result = await self.collection.insert_one(upgrade_document("datacenter_specs", datacenter_spec))
+        await self.refresh_complete_specs(component_ids_of([datacenter_spec]))
+        return str(result.inserted_id)
+
+    async def get_by_id(self, id: str):
+        return await self.collection.find_one({"_id": ObjectId(id)})
+
+    async def get_all(self):
+        return await self.collection.find().to_list(None)
+
+    async def update(self, id: str, datacenter_spec: dict):
+        # The row may move to another component, so both are rebuilt
+        previous = await self.collection.find_one({"_id": ObjectId(id)}, {"ID": 1})
+        result = await self.collection.update_one(
+            {"_id": ObjectId(id)},
+            {"$set": upgrade_document("datacenter_specs", datacenter_spec) if "Unit" in datacenter_spec else datacenter_spec}
+        )
+        if result.matched_count:
+            await self.refresh_complete_specs(component_ids_of([previous, datacenter_spec]))
+        return result
+
+    async def delete(self, id: str):
+        previous = await self.collection.find_one({"_id": ObjectId(id)}, {"ID": 1})
+        result = await self.collection.delete_one({"_id": ObjectId(id)})
+        if result.deleted_count:
+            await self.refresh_complete_specs(component_ids_of([previous]))
+        return result
+
+    async def bulk_create(self, datacenter_specs: list) -> list:
+        """Insert multiple datacenter specs at once"""
+        if not datacenter_specs:
+            return []
+        result = await self.collection.insert_many([upgrade_document("datacenter_specs", spec) for spec in datacenter_specs])
+        await self.refresh_complete_specs(component_ids_of(datacenter_specs))
+        return [str(id) for id in result.inserted_ids]
+
+    async def get_by_component_id(self, component_id: str):
+        """Get all specs for a specific component ID"""
+        return await self.collection.find({"ID": component_id}).to_list(None)
+
+    async def get_by_component_and_unit(self, component_id: str, unit: str):
+        """Get a specific component property by ID and Unit"""
+        return await self.collection.find_one({"ID": component_id, "Unit": unit})
+
+    async def get_by_focus(self, focus: str):
+        """Get all datacenter specs with a specific focus"""
+        return await self.collection.find({"focus": focus}).to_list(None)
+
+    async def get_complete_datacenter_spec(self, id: str) -> Optional[Dict[str, Any]]:
+        """Get a complete datacenter spec by ID with all properties merged"""
+        if not id:
+            return None
+
+        # One _id lookup for component IDs once they are materialized
+        if not ObjectId.is_valid(id):
+            materialized = await self.complete_collection.find_one({"_id": id})
+            # Claimed but not refreshed yet when there is no spec
+            if materialized is not None and "spec" in materialized:
+                return materialized["spec"]
+
+        query = {"ID": id} if not ObjectId.is_valid(id) else {"$or": [{"_id": ObjectId(id)}, {"ID": id}]}
+        specs = await self.collection.find(query).sort(SPEC_ROW_ORDER).to_list(None)
+
+        return merge_datacenter_specs(specs)
+
+    async def delete_all(self):
         """Delete all datacenter specs"""
-        return self.collection.delete_many({})
+        await self.complete_collection.delete_many({})
+        return await self.collection.delete_many({})
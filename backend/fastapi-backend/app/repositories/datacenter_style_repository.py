@@ -1,16 +1,17 @@
 from bson import ObjectId
-from DB.cliente import get_database
+from DB.cliente import get_database, get_async_database
 from app.models.schemas import DatacenterStyle
+from DB.migrations.schema_versions import upgrade_document
 from typing import List, Optional
 
 class DatacenterStyleRepository:
-    def __init__(self):
-        db = get_database()
-        self.collection = db["datacenter_styles"]
+    @property
+    def collection(self):
+        return get_database()["datacenter_styles"]
 
     def create(self, datacenter_style: dict) -> str:
         """Create a new datacenter style"""
-        result = self.collection.insert_one(datacenter_style)
+        result = self.collection.insert_one(upgrade_document("datacenter_styles", datacenter_style))
         return str(result.inserted_id)
 
     def get_by_id(self, id: str) -> Optional[dict]:
@@ -49,5 +50,57 @@ class DatacenterStyleRepository:
         """Create multiple datacenter styles at once"""
         if not styles:
             return []
-        result = self.collection.insert_many(styles)
+        result = self.collection.insert_many([upgrade_document("datacenter_styles", style) for style in styles])
+        return [str(id) for id in result.inserted_ids]
+
+
+class AsyncDatacenterStyleRepository:
+    """asyncio counterpart of DatacenterStyleRepository used by the API routers"""
+
+    @property
+    def collection(self):
+        return get_async_database()["datacenter_styles"]
+
+    async def create(self, datacenter_style: dict) -> str:
+        """Create a new datacenter style"""
+        result = await self.collection.insert_one(upgrade_document("datacenter_styles", datacenter_style))
+        return str(result.inserted_id)
+
+    async def get_by_id(self, id: str, projection: Optional[dict] = None) -> Optional[dict]:
+        """Get a datacenter style by ID"""
+        if ObjectId.is_valid(id):
+            return await self.collection.find_one({"_id": ObjectId(id)}, projection)
+        return await self.collection.find_one({"id": id}, projection)
+
+    async def get_all(self, projection: Optional[dict] = None) -> List[dict]:
+        """Get all datacenter styles"""
+        return await self.collection.find({}, projection).to_list(None)
+
+    async def update(self, id: str, datacenter_style: dict):
+        """Update a datacenter style"""
+        if ObjectId.is_valid(id):
+            return await self.collection.update_one(
+                {"_id": ObjectId(id)},
+                {"$set": datacenter_style}
+            )
+        return await self.collection.update_one(
+            {"id": id},
+            {"$set": datacenter_style}
+        )
+
+    async def delete(self, id: str):
+        """Delete a datacenter style"""
+        if ObjectId.is_valid(id):
+            return await self.collection.delete_one({"_id": ObjectId(id)})
+        return await self.collection.delete_one({"id": id})
+
+    async def get_by_focus(self, focus: str) -> List[dict]:
+        """Get datacenter styles by focus type"""
+        return await self.collection.find({"focus": focus}).to_list(None)
+
+    async def bulk_create(self, styles: List[dict]) -> List[str]:
+        """Create multiple datacenter styles at once"""
+        if not styles:
+            return []
+        result = await self.collection.insert_many([upgrade_document("datacenter_styles", style) for style in styles])
         return [str(id) for id in result.inserted_ids]
@@ -1,41 +1,68 @@
 from bson import ObjectId
-from DB.cliente import get_database
+from DB.cliente import get_database, get_async_database
 from app.models.schemas import Module
+from DB.migrations.schema_versions import upgrade_document
 from typing import List, Optional
 
+def normalize_module_id(value) -> str:
+    """Canonical form of a module ID used for indexed lookups"""
+    return str(value).strip().lower()
+
+def module_lookup_keys(module: dict) -> List[str]:
+    """Lookup keys for a module document: its normalized id and legacy ID"""
+    keys = []
+    for field in ("id", "ID"):
+        if module.get(field) is not None:
+            key = normalize_module_id(module[field])
+            if key not in keys:
+                keys.append(key)
+    return keys
+
+def with_lookup_keys(module: dict) -> dict:
+    """Stamp the lookup keys on a module document before it is written"""
+    module["lookup_keys"] = module_lookup_keys(module)
+    return module
+
+def module_id_query(id: str) -> dict:
+    """Single indexed query matching every accepted form of a module ID"""
+    query = {"lookup_keys": normalize_module_id(id)}
+    if ObjectId.is_valid(id):
+        return {"$or": [query, {"_id": ObjectId(id)}]}
+    return query
+
+def pick_module_match(id: str, candidates: List[dict]) -> Optional[dict]:
+    """
+    Choose the best match for an ID among the candidates of module_id_query
+
+    Precedence matches the historical lookup cascade: exact id, then
+    case-insensitive id, then ObjectId, then the legacy ID field.
+    """
+    key = normalize_module_id(id)
+    ranks = (
+        lambda module: module.get("id") == id,
+        lambda module: module.get("id") is not None and normalize_module_id(module["id"]) == key,
+        lambda module: ObjectId.is_valid(id) and module.get("_id") == ObjectId(id),
+        lambda module: module.get("ID") == id,
+    )
+    for matches in ranks:
+        for module in candidates:
+            if matches(module):
+                return module
+    return None
+
 class ModuleRepository:
-    def __init__(self):
-        db = get_database()
-        self.collection = db["modules"]
+    @property
+    def collection(self):
+        return get_database()["modules"]
 
     def create(self, module: dict) -> str:
-        result = self.collection.insert_one(module)
+        result = self.collection.insert_one(with_lookup_keys(upgrade_document("modules", module)))
         return str(result.inserted_id)
 
     def get_by_id(self, id: str) -> Optional[dict]:
-        """Get a module by ID"""
-        # First try by string ID (most likely for frontend-provided IDs)
-        module = self.collection.find_one({"id": id})
-        if module:
-            return module
-
-        # Try with a case-insensitive search (for robustness)
-        module = self.collection.find_one({"id": {"$regex": f"^{id}$", "$options": "i"}})
-        if module:
-            return module
-
-        # Try as ObjectId (for MongoDB's _id field)
-        if ObjectId.is_valid(id):
-            module = self.collection.find_one({"_id": ObjectId(id)})
-            if module:
-                return module
-
-        # Try legacy ID field
-        module = self.collection.find_one({"ID": id})
-        if module:
-            return module
-
-        return None
+        """Get a module by ID with a single indexed query"""
+        candidates = list(self.collection.find(module_id_query(id)))
+        return pick_module_match(id, candidates)
 
     def get_all(self):
         return list(self.collection.find())
@@ -45,11 +72,19 @@ class ModuleRepository:
         return list(self.collection.find({field: value}))
 
     def update(self, id: str, module: dict):
-        return self.collection.update_one(
+        result = self.collection.update_one(
             {"_id": ObjectId(id)},
             {"$set": module}
         )
 
+        # Keep the lookup keys in step with the identifiers they are derived from
+        if "id" in module or "ID" in module:
+            updated = self.collection.find_one({"_id": ObjectId(id)}, {"id": 1, "ID": 1})
+            if updated:
+                self.collection.update_one({"_id": updated["_id"]}, {"$set": {"lookup_keys": module_lookup_keys(updated)}})
+
+        return result
+
     def delete(self, id: str):
         return self.collection.delete_one({"_id": ObjectId(id)})
 
@@ -57,7 +92,7 @@ class ModuleRepository:
         """Insert multiple modules at once"""
         if not modules:
             return []
-        result = self.collection.insert_many(modules)
+        result = self.collection.insert_many([with_lookup_keys(upgrade_document("modules", module)) for module in modules])
         return [str(id) for id in result.inserted_ids]
 
     def count(self):
@@ -68,3 +103,63 @@ class ModuleRepository:
         """Validate that a string is a valid MongoDB ObjectId"""
         if not ObjectId.is_valid(id):
             raise ValueError("Invalid ID format")  # English error message
+
+
+class AsyncModuleRepository:
+    """asyncio counterpart of ModuleRepository used by the API routers"""
+
+    @property
+    def collection(self):
+        return get_async_database()["modules"]
+
+    async def create(self, module: dict) -> str:
+        result = await self.collection.insert_one(with_lookup_keys(upgrade_document("modules", module)))
+        return str(result.inserted_id)
+
+    async def get_by_id(self, id: str) -> Optional[dict]:
+        """Get a module by ID with a single indexed query"""
+        candidates = await self.collection.find(module_id_query(id)).to_list(None)
+        return pick_module_match(id, candidates)
+
+    async def get_all(self):
+        return await self.collection.find().to_list(None)
+
+    def iter_all(self, batch_size: int = 1000, projection: Optional[dict] = None):
+        """Cursor over every module, fetched in batches"""
+        return self.collection.find({}, projection).batch_size(batch_size)
+
+    async def get_by_field(self, field: str, value):
+        """Get modules by any field value"""
+        return await self.collection.find({field: value}).to_list(None)
+
+    async def update(self, id: str, module: dict):
+        result = await self.collection.update_one(
+            {"_id": ObjectId(id)},
+            {"$set": module}
+        )
+
+        # Keep the lookup keys in step with the identifiers they are derived from
+        if "id" in module or "ID" in module:
+            updated = await self.collection.find_one({"_id": ObjectId(id)}, {"id": 1, "ID": 1})
+            if updated:
+                await self.collection.update_one({"_id": updated["_id"]}, {"$set": {"lookup_keys": module_lookup_keys(updated)}})
+
+        return result
+
+    async def delete(self, id: str):
+        return await self.collection.delete_one({"_id": ObjectId(id)})
+
+    async def delete_all(self):
+        """Delete every module in the collection"""
+        return await self.collection.delete_many({})
+
+    async def bulk_create(self, modules: list) -> list:
+        """Insert multiple modules at once"""
+        if not modules:
+            return []
+        result = await self.collection.insert_many([with_lookup_keys(upgrade_document("modules", module)) for module in modules])
+        return [str(id) for id in result.inserted_ids]
+
+    async def count(self):
+        """Count total modules in collection"""
+        return await self.collection.count_documents({})
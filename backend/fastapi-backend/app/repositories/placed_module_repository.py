@@ -1,29 +1,151 @@
 from bson import ObjectId
-from DB.cliente import get_database
+from DB.cliente import get_database, get_async_database
+from app.services.module_catalog import module_catalog
 from typing import List, Optional, Dict, Any
 
+def _needs_module(placed_module: dict) -> bool:
+    """Whether a placed module only stores a reference to its module"""
+    return "module_id" in placed_module and ("module" not in placed_module or placed_module["module"] is None)
+
+def _module_batch_query(placed_modules: List[dict]) -> Optional[dict]:
+    """
+    Build one query resolving every distinct module reference
+
+    References are matched against the string id and, when they look like an
+    ObjectId, against _id as well.
+    """
+    module_ids = {pm["module_id"] for pm in placed_modules if _needs_module(pm)}
+    if not module_ids:
+        return None
+
+    clauses = [{"id": {"$in": list(module_ids)}}]
+    object_ids = [ObjectId(module_id) for module_id in module_ids if ObjectId.is_valid(module_id)]
+    if object_ids:
+        clauses.append({"_id": {"$in": object_ids}})
+
+    return {"$or": clauses} if len(clauses) > 1 else clauses[0]
+
+def _attach_modules(placed_modules: List[dict], modules: List[dict]) -> List[dict]:
+    """Join fetched modules onto placed modules the same way _populate_module resolves them"""
+    by_id = {}
+    by_object_id = {}
+    for module in modules:
+        if "id" in module:
+            by_id.setdefault(module["id"], module)
+        by_object_id[str(module["_id"])] = module
+
+    for placed_module in placed_modules:
+        if not _needs_module(placed_module):
+            continue
+
+        module_id = placed_module["module_id"]
+        module = by_id.get(module_id)
+        if not module and ObjectId.is_valid(module_id):
+            module = by_object_id.get(str(module_id))
+
+        if module:
+            placed_module["module"] = module
+
+    return placed_modules
+
+def _module_reference(placed_module: dict) -> Optional[str]:
+    """Module ID a placed module points at, from its embedded module or module_id"""
+    module = placed_module.get("module")
+    if isinstance(module, dict):
+        if "id" in module:
+            return module["id"]
+        if "module_id" not in placed_module and "_id" in module:
+            return str(module["_id"])
+    elif module is not None and "module_id" not in placed_module:
+        return str(module)
+    return placed_module.get("module_id")
+
+def _compact_coordinates(placed_module: dict, compact: dict) -> dict:
+    if "position" in placed_module:
+        position = placed_module.get("position") or {}
+        compact["position"] = {"x": int(position.get("x", 0)), "y": int(position.get("y", 0))}
+    if "rotation" in placed_module:
+        compact["rotation"] = int(placed_module.get("rotation") or 0)
+    return compact
+
+def compact_placed_module(placed_module: dict) -> dict:
+    """
+    Reduce a placed module to its compact stored form
+
+    Only the module reference, integer position and rotation (plus the
+    datacenter and any explicit ids) are stored. Module data is not embedded;
+    it is hydrated from the module catalog at read time.
+    """
+    compact = {}
+    for field in ("_id", "id", "datacenter_id"):
+        if placed_module.get(field) is not None:
+            compact[field] = placed_module[field]
+
+    module_id = _module_reference(placed_module)
+    if module_id is not None:
+        compact["module_id"] = module_id
+
+    placed_module = {"position": {}, "rotation": 0, **placed_module}
+    return _compact_coordinates(placed_module, compact)
+
+def compact_placed_module_update(placed_module_data: dict) -> dict:
+    """Compact the fields of a partial placed module update"""
+    compact = {key: value for key, value in placed_module_data.items() if key not in ("module", "position", "rotation")}
+
+    module_id = _module_reference(placed_module_data)
+    if module_id is not None:
+        compact["module_id"] = module_id
+
+    return _compact_coordinates(placed_module_data, compact)
+
+def placed_module_update(placed_module_data: dict, existing: Optional[dict] = None) -> dict:
+    """
+    Update document for a partial placed module update
+
+    A legacy embedded module is only dropped once the update stores a
+    module_id, taken from the patch or else from the existing document.
+    """
+    changes = compact_placed_module_update(placed_module_data)
+    if "module_id" not in changes and existing and "module" in existing:
+        module_id = _module_reference(existing)
+        if module_id is not None:
+            changes["module_id"] = module_id
+
+    update = {"$set": changes}
+    if "module_id" in changes:
+        update["$unset"] = {"module": ""}
+    return update
+
+async def hydrate_placed_modules(placed_modules: List[dict]) -> List[dict]:
+    """Attach module data to compact placed modules from the cached module catalog"""
+    module_ids = {pm["module_id"] for pm in placed_modules if _needs_module(pm)}
+    if not module_ids:
+        return placed_modules
+
+    # Catalog documents are shared, read-only references
+    modules = await module_catalog.get_many(module_ids, copy=False)
+    for placed_module in placed_modules:
+        if _needs_module(placed_module):
+            module = modules.get(placed_module["module_id"])
+            if module:
+                placed_module["module"] = module
+
+    return placed_modules
+
 class PlacedModuleRepository:
-    def __init__(self):
-        db = get_database()
-        self.collection = db["placed_modules"]
-        self.modules_collection = db["modules"]
+    @property
+    def collection(self):
+        return get_database()["placed_modules"]
+
+    @property
+    def modules_collection(self):
+        return get_database()["modules"]
 
     def create(self, placed_module: dict) -> str:
         """Create a new placed module"""
         try:
-            # Save module reference instead of embedding if it's a dict
-            if "module" in placed_module and isinstance(placed_module["module"], dict) and "id" in placed_module["module"]:
-                module_id = placed_module["module"]["id"]
-                placed_module["module_id"] = module_id
-
-            # Ensure we have a module_id
-            if "module_id" not in placed_module:
-                # Try to extract from module if present
-                if "module" in placed_module and isinstance(placed_module["module"], dict):
-                    if "id" in placed_module["module"]:
-                        placed_module["module_id"] = placed_module["module"]["id"]
-                    elif "_id" in placed_module["module"]:
-                        placed_module["module_id"] = str(placed_module["module"]["_id"])
+            # Store only the module reference and coordinates
+            placed_module = compact_placed_module(placed_module)
 
             result = self.collection.insert_one(placed_module)
             return str(result.inserted_id)
@@ -49,22 +171,24 @@ class PlacedModuleRepository:
     def get_all(self) -> List[dict]:
         """Get all placed modules"""
         placed_modules = list(self.collection.find())
-        return [self._populate_module(pm) for pm in placed_modules]
+        return self._populate_modules(placed_modules)
 
     def get_by_datacenter_id(self, datacenter_id: str) -> List[dict]:
         """Get all placed modules for a specific datacenter"""
         placed_modules = list(self.collection.find({"datacenter_id": datacenter_id}))
-        return [self._populate_module(pm) for pm in placed_modules]
+        return self._populate_modules(placed_modules)
 
     def update(self, id: str, placed_module_data: dict) -> Any:
         """Update a placed module"""
-        # Handle module reference
-        if "module" in placed_module_data and isinstance(placed_module_data["module"], dict) and "id" in placed_module_data["module"]:
-            placed_module_data["module_id"] = placed_module_data["module"]["id"]
-            placed_module_data.pop("module", None)
-
         filter_query = {"_id": ObjectId(id)} if ObjectId.is_valid(id) else {"id": id}
-        return self.collection.update_one(filter_query, {"$set": placed_module_data})
+
+        # Store only the module reference; a legacy embedded copy is migrated
+        # to module_id rather than dropped when the patch carries none
+        existing = None
+        if _module_reference(placed_module_data) is None:
+            existing = self.collection.find_one(filter_query, {"module": 1, "module_id": 1})
+
+        return self.collection.update_one(filter_query, placed_module_update(placed_module_data, existing))
 
     def delete(self, id: str) -> Any:
         """Delete a placed module"""
@@ -78,11 +202,7 @@ class PlacedModuleRepository:
 
     def bulk_create(self, placed_modules: List[dict]) -> List[str]:
         """Create multiple placed modules at once"""
-        for pm in placed_modules:
-            # Handle module reference
-            if "module" in pm and isinstance(pm["module"], dict) and "id" in pm["module"]:
-                pm["module_id"] = pm["module"]["id"]
-                pm.pop("module", None)
+        placed_modules = [compact_placed_module(pm) for pm in placed_modules]
 
         result = self.collection.insert_many(placed_modules)
         return [str(id) for id in result.inserted_ids]
@@ -98,3 +218,106 @@ class PlacedModuleRepository:
                 placed_module["module"] = module
 
         return placed_module
+
+    def _populate_modules(self, placed_modules: List[dict]) -> List[dict]:
+        """Populate module data for many placed modules with a single query"""
+        query = _module_batch_query(placed_modules)
+        if query is None:
+            return placed_modules
+
+        modules = list(self.modules_collection.find(query))
+        return _attach_modules(placed_modules, modules)
+
+
+class AsyncPlacedModuleRepository:
+    """asyncio counterpart of PlacedModuleRepository used by the API routers"""
+
+    @property
+    def collection(self):
+        return get_async_database()["placed_modules"]
+
+    @property
+    def modules_collection(self):
+        return get_async_database()["modules"]
+
+    async def create(self, placed_module: dict) -> str:
+        """Create a new placed module"""
+        try:
+            # Store only the module reference and coordinates
+            placed_module = compact_placed_module(placed_module)
+
+            result = await self.collection.insert_one(placed_module)
+            return str(result.inserted_id)
+        except Exception as e:
+            # Log error for debugging
+            print(f"Error creating placed module: {str(e)}")
+            raise
+
+    async def get_by_id(self, id: str, projection: Optional[dict] = None, hydrate: bool = True) -> Optional[dict]:
+        """Get a placed module by ID"""
+        if ObjectId.is_valid(id):
+            placed_module = await self.collection.find_one({"_id": ObjectId(id)}, projection)
+            if placed_module:
+                return await self._populate_module(placed_module) if hydrate else placed_module
+
+        # Try with string ID
+        placed_module = await self.collection.find_one({"id": id}, projection)
+        if placed_module:
+            return await self._populate_module(placed_module) if hydrate else placed_module
+
+        return None
+
+    async def get_all(self, projection: Optional[dict] = None, hydrate: bool = True) -> List[dict]:
+        """Get all placed modules"""
+        placed_modules = await self.collection.find({}, projection).to_list(None)
+        return await self._populate_modules(placed_modules) if hydrate else placed_modules
+
+    def iter_all(self, batch_size: int = 1000):
+        """Cursor over every placed module (not hydrated), fetched in batches"""
+        return self.collection.find().batch_size(batch_size)
+
+    async def get_by_datacenter_id(self, datacenter_id: str, projection: Optional[dict] = None, hydrate: bool = True) -> List[dict]:
+        """Get all placed modules for a specific datacenter"""
+        placed_modules = await self.collection.find({"datacenter_id": datacenter_id}, projection).to_list(None)
+        return await self._populate_modules(placed_modules) if hydrate else placed_modules
+
+    def iter_by_datacenter_id(self, datacenter_id: str, projection: Optional[dict] = None, batch_size: int = 1000):
+        """Cursor over the placed modules of a datacenter (not hydrated), fetched in batches"""
+        return self.collection.find({"datacenter_id": datacenter_id}, projection).batch_size(batch_size)
+
+    async def update(self, id: str, placed_module_data: dict) -> Any:
+        """Update a placed module"""
+        filter_query = {"_id": ObjectId(id)} if ObjectId.is_valid(id) else {"id": id}
+
+        # Store only the module reference; a legacy embedded copy is migrated
+        # to module_id rather than dropped when the patch carries none
+        existing = None
+        if _module_reference(placed_module_data) is None:
+            existing = await self.collection.find_one(filter_query, {"module": 1, "module_id": 1})
+
+        return await self.collection.update_one(filter_query, placed_module_update(placed_module_data, existing))
+
+    async def delete(self, id: str) -> Any:
+        """Delete a placed module"""
+        filter_query = {"_id": ObjectId(id)} if ObjectId.is_valid(id) else {"id": id}
+        return await self.collection.delete_one(filter_query)
+
+    async def delete_by_datacenter_id(self, datacenter_id: str) -> int:
+        """Delete all placed modules for a datacenter"""
+        result = await self.collection.delete_many({"datacenter_id": datacenter_id})
+        return result.deleted_count
+
+    async def bulk_create(self, placed_modules: List[dict]) -> List[str]:
+        """Create multiple placed modules at once"""
+        placed_modules = [compact_placed_module(pm) for pm in placed_modules]
+
+        result = await self.collection.insert_many(placed_modules)
+        return [str(id) for id in result.inserted_ids]
+
+    async def _populate_module(self, placed_module: dict) -> dict:
+        """Populate the module data if only the ID is stored"""
+        return (await self._populate_modules([placed_module]))[0]
+
+    async def _populate_modules(self, placed_modules: List[dict]) -> List[dict]:
+        """Populate module data for many placed modules from the cached module catalog"""
+        return await hydrate_placed_modules(placed_modules)
@@ -1,11 +1,11 @@
 from bson import ObjectId
-from DB.cliente import get_database
+from DB.cliente import get_database, get_async_database
 from typing import List, Optional, Dict, Any
 
 class PositionRepository:
-    def __init__(self):
-        db = get_database()
-        self.collection = db["positions"]
+    @property
+    def collection(self):
+        return get_database()["positions"]
 
     def create(self, position: dict) -> str:
         """Create a new position"""
@@ -66,3 +66,74 @@ class PositionRepository:
         """Create multiple positions at once"""
         result = self.collection.insert_many(positions)
         return [str(id) for id in result.inserted_ids]
+
+
+class AsyncPositionRepository:
+    """asyncio counterpart of PositionRepository used by the API routers"""
+
+    @property
+    def collection(self):
+        return get_async_database()["positions"]
+
+    async def create(self, position: dict) -> str:
+        """Create a new position"""
+        result = await self.collection.insert_one(position)
+        return str(result.inserted_id)
+
+    async def get_by_id(self, id: str) -> Optional[dict]:
+        """Get a position by ID"""
+        if ObjectId.is_valid(id):
+            position = await self.collection.find_one({"_id": ObjectId(id)})
+            if position:
+                return position
+
+        # Try with string ID
+        return await self.collection.find_one({"id": id})
+
+    async def get_all(self) -> List[dict]:
+        """Get all positions"""
+        return await self.collection.find().to_list(None)
+
+    def iter_all(self, batch_size: int = 1000):
+        """Cursor over every position, fetched in batches"""
+        return self.collection.find().batch_size(batch_size)
+
+    async def get_by_datacenter_id(self, datacenter_id: str) -> List[dict]:
+        """Get all positions for a specific datacenter"""
+        return await self.collection.find({"datacenter_id": datacenter_id}).to_list(None)
+
+    async def get_by_module_id(self, module_id: str) -> Optional[dict]:
+        """Get position for a specific module"""
+        return await self.collection.find_one({"module_id": module_id})
+
+    async def update(self, id: str, position_data: dict) -> Any:
+        """Update a position"""
+        filter_query = {"_id": ObjectId(id)} if ObjectId.is_valid(id) else {"id": id}
+        return await self.collection.update_one(filter_query, {"$set": position_data})
+
+    async def delete(self, id: str) -> Any:
+        """Delete a position"""
+        filter_query = {"_id": ObjectId(id)} if ObjectId.is_valid(id) else {"id": id}
+        return await self.collection.delete_one(filter_query)
+
+    async def delete_by_datacenter_id(self, datacenter_id: str) -> int:
+        """Delete all positions for a datacenter"""
+        result = await self.collection.delete_many({"datacenter_id": datacenter_id})
+        return result.deleted_count
+
+    async def find_positions_in_area(self, x1: int, y1: int, x2: int, y2: int, datacenter_id: Optional[str] = None) -> List[dict]:
+        """Find all positions within a rectangular area"""
+        query = {
+            "x": {"$gte": min(x1, x2), "$lte": max(x1, x2)},
+            "y": {"$gte": min(y1, y2), "$lte": max(y1, y2)}
+        }
+
+        if datacenter_id:
+            query["datacenter_id"] = datacenter_id
+
+        return await self.collection.find(query).to_list(None)
+
+    async def bulk_create(self, positions: List[dict]) -> List[str]:
+        """Create multiple positions at once"""
+        result = await self.collection.insert_many(positions)
+        return [str(id) for id in result.inserted_ids]
@@ -2,8 +2,9 @@ from fastapi import APIRouter, HTTPException, File, UploadFile
 from typing import List
 from bson import ObjectId
 from app.models.schemas import DatacenterSpec
-from app.repositories.datacenter_spec_repository import DatacenterSpecRepository
-from DB.cliente import cliente_modulos
+from app.repositories.datacenter_spec_repository import AsyncDatacenterSpecRepository
+from app.core.responses import FastJSONResponse
+from app.services.solver import module_mix_solver
 from DB.esquemas.esquema_datacenter_specs import datacenter_spec_esquema, datacenter_specs_esquema
 import csv
 import io
@@ -14,7 +15,7 @@ router = APIRouter(
     prefix="/datacenter-specs",
     tags=["datacenter_specs"]
 )
-datacenter_spec_repo = DatacenterSpecRepository()
+datacenter_spec_repo = AsyncDatacenterSpecRepository()
 
 # Import request model
 class CSVImportRequest(BaseModel):
@@ -26,7 +27,7 @@ class CSVImportRequest(BaseModel):
 async def list_datacenter_specs():
     """Get all datacenter specifications."""
     try:
-        datacenter_specs = datacenter_spec_repo.get_all()
+        datacenter_specs = await datacenter_spec_repo.get_all()
         return datacenter_specs_esquema(datacenter_specs)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving specifications: {str(e)}")
@@ -38,7 +39,7 @@ async def get_datacenter_spec(id: str):
         if not ObjectId.is_valid(id):
             raise HTTPException(status_code=400, detail=f"Invalid ID format: {id}")
 
-        datacenter_spec = datacenter_spec_repo.get_by_id(id)
+        datacenter_spec = await datacenter_spec_repo.get_by_id(id)
         if datacenter_spec is None:
             raise HTTPException(status_code=404, detail=f"Datacenter specification {id} not found")
 
@@ -53,8 +54,8 @@ async def create_datacenter_spec(datacenter_spec: DatacenterSpec):
     """Create a new datacenter specification."""
     try:
         datacenter_spec_dict = datacenter_spec.dict(exclude={"id"})
-        id = datacenter_spec_repo.create(datacenter_spec_dict)
-        new_spec = datacenter_spec_repo.get_by_id(id)
+        id = await datacenter_spec_repo.create(datacenter_spec_dict)
+        new_spec = await datacenter_spec_repo.get_by_id(id)
         return datacenter_spec_esquema(new_spec)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating specification: {str(e)}")
@@ -67,12 +68,12 @@ async def update_datacenter_spec(id: str, datacenter_spec: DatacenterSpec):
             raise HTTPException(status_code=400, detail=f"Invalid ID format: {id}")
 
         datacenter_spec_dict = datacenter_spec.dict(exclude={"id"})
-        result = datacenter_spec_repo.update(id, datacenter_spec_dict)
+        result = await datacenter_spec_repo.update(id, datacenter_spec_dict)
 
         if result.modified_count == 0:
             raise HTTPException(status_code=404, detail=f"Datacenter specification {id} not found")
 
-        updated_spec = datacenter_spec_repo.get_by_id(id)
+        updated_spec = await datacenter_spec_repo.get_by_id(id)
         return datacenter_spec_esquema(updated_spec)
     except HTTPException:
         raise
@@ -86,7 +87,7 @@ async def delete_datacenter_spec(id: str):
         if not ObjectId.is_valid(id):
             raise HTTPException(status_code=400, detail=f"Invalid ID format: {id}")
 
-        result = datacenter_spec_repo.delete(id)
+        result = await datacenter_spec_repo.delete(id)
 
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail=f"Datacenter specification {id} not found")
@@ -128,7 +129,7 @@ async def import_datacenter_specs(import_request: CSVImportRequest):
             }
             specs_to_insert.append(spec)
 
-        result = datacenter_spec_repo.bulk_create(specs_to_insert)
+        result = await datacenter_spec_repo.bulk_create(specs_to_insert)
         return {"message": f"Imported {len(result)} datacenter specifications"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error importing data: {str(e)}")
@@ -137,7 +138,7 @@ async def import_datacenter_specs(import_request: CSVImportRequest):
 async def get_component_specs(component_id: str):
     """Get all specifications for a specific component."""
     try:
-        specs = datacenter_spec_repo.get_by_component_id(component_id)
+        specs = await datacenter_spec_repo.get_by_component_id(component_id)
         if not specs:
             raise HTTPException(status_code=404, detail=f"No specifications found for component {component_id}")
 
@@ -145,6 +146,61 @@ async def get_component_specs(component_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving component specifications: {str(e)}")
 
+@router.get("/component/{component_id}/complete", response_description="Get the complete specification of a component")
+async def get_complete_component_spec(component_id: str):
+    """
+    Get every unit row of a component merged into one specification.
+
+    - **component_id**: Component ID shared by the spec rows (e.g. `Server_Square`)
+    """
+    try:
+        complete_spec = await datacenter_spec_repo.get_complete_datacenter_spec(component_id)
+        if complete_spec is None:
+            raise HTTPException(status_code=404, detail=f"No specifications found for component {component_id}")
+
+        # The merged spec keeps the base row's ObjectId, which orjson encodes
+        return FastJSONResponse(complete_spec)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error retrieving complete specification: {str(e)}")
+
+@router.post("/{id}/solve", response_description="Solve the module mix of a datacenter specification")
+async def solve_datacenter_spec(id: str):
+    """
+    Find the module counts that best meet a datacenter specification.
+
+    Below/Above units become constraints and Minimize/Maximize units the
+    objective; solutions are cached per specification and catalog version.
+
+    - **id**: Component ID (e.g. `Server_Square`) or the ObjectId of one of its rows
+    """
+    try:
+        complete_spec = await datacenter_spec_repo.get_complete_datacenter_spec(id)
+        if complete_spec is None:
+            raise HTTPException(status_code=404, detail=f"Datacenter specification {id} not found")
+
+        if "constraints" not in complete_spec:
+            # Materialized before constraints were kept; rebuild it once so later calls read it directly.
+            # Only materialized specs lack constraints, and those are keyed by the component ID.
+            component_id = complete_spec.get("ID") or id
+            await datacenter_spec_repo.refresh_complete_specs([component_id])
+            complete_spec = await datacenter_spec_repo.get_complete_datacenter_spec(component_id)
+            if complete_spec is None:
+                raise HTTPException(status_code=404, detail=f"Datacenter specification {id} not found")
+
+        solution, cached = await module_mix_solver.solve(complete_spec)
+        return FastJSONResponse({
+            "component_id": complete_spec.get("ID"),
+            "name": complete_spec.get("Name"),
+            "cached": cached,
+            **solution
+        })
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error solving datacenter specification: {str(e)}")
+
 @router.delete("/all", response_description="Delete all datacenter specifications")
 async def delete_all_specs():
     """
@@ -152,9 +208,8 @@ async def delete_all_specs():
     WARNING: This will remove ALL specifications and cannot be undone.
     """
     try:
-        count = datacenter_spec_repo.collection.count_documents({})
-
-        result = datacenter_spec_repo.collection.delete_many({})
+        # Goes through the repository so the complete specs are dropped too
+        result = await datacenter_spec_repo.delete_all()
 
         if result.deleted_count == 0:
             return {"message": "No datacenter specifications found to delete"}
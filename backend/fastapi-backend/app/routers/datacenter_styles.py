@@ -1,8 +1,12 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from typing import List, Optional
 from bson import ObjectId
 from app.models.schemas import DatacenterStyle
-from app.repositories.datacenter_style_repository import DatacenterStyleRepository
+from app.repositories.datacenter_style_repository import AsyncDatacenterStyleRepository
+from app.core.responses import FastJSONResponse
+from app.core.etags import content_etag, etag_matches, not_modified, with_etag
+from app.core.fieldsets import DATACENTER_STYLE_FIELDS, parse_fields, projection, select_fields, select_fields_many
+from app.services.exploration import MAX_COUNT, MAX_TIME_BUDGET, TIME_BUDGET, design_explorer
 from DB.esquemas.esquema_datacenter_styles import datacenter_style_esquema, datacenter_styles_esquema
 from pydantic import BaseModel
 
@@ -12,7 +16,7 @@ router = APIRouter(
     responses={404: {"description": "Not found"}}
 )
 
-datacenter_style_repo = DatacenterStyleRepository()
+datacenter_style_repo = AsyncDatacenterStyleRepository()
 
 class StylesImport(BaseModel):
     styles: List[DatacenterStyle]
@@ -23,28 +27,54 @@ class CSVImportRequest(BaseModel):
 class StylesImportRequest(BaseModel):
     styles: List[dict]
 
+class ExploreRequest(BaseModel):
+    workers: Optional[int] = None  # Worker processes to use; at most EXPLORATION_WORKERS
+    time_budget: float = TIME_BUDGET  # Seconds of evaluation
+    max_mixes: Optional[int] = None  # Stop after evaluating this many mixes
+    patience: Optional[int] = None  # Stop after this many chunks in a row leave the front unchanged
+    max_count: int = MAX_COUNT  # Most modules of one kind in a mix
+    limit: int = 100  # Front entries returned
+    seed: int = 0
+
 @router.get("/", response_description="Get all datacenter styles")
-async def get_all_datacenter_styles():
-    """Get all available datacenter styles"""
-    styles = datacenter_style_repo.get_all()
-    return datacenter_styles_esquema(styles)
+async def get_all_datacenter_styles(request: Request, fields: Optional[str] = None):
+    """
+    Get all available datacenter styles
+
+    - **fields**: Comma-separated fields to return (e.g. `name,dim`)
+    """
+    names = parse_fields(fields, DATACENTER_STYLE_FIELDS)
+    styles = await datacenter_style_repo.get_all(projection(names, DATACENTER_STYLE_FIELDS))
+
+    # Styles carry no version, so the ETag hashes the (small) rendered list
+    response = FastJSONResponse(select_fields_many(datacenter_styles_esquema(styles), names))
+    etag = content_etag(response.body)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    return with_etag(response, etag)
 
 @router.get("/{id}", response_description="Get a datacenter style by ID")
-async def get_datacenter_style(id: str):
-    """Get a specific datacenter style by ID"""
-    style = datacenter_style_repo.get_by_id(id)
+async def get_datacenter_style(id: str, fields: Optional[str] = None):
+    """
+    Get a specific datacenter style by ID
+
+    - **fields**: Comma-separated fields to return (e.g. `name,dim`)
+    """
+    names = parse_fields(fields, DATACENTER_STYLE_FIELDS)
+    style = await datacenter_style_repo.get_by_id(id, projection(names, DATACENTER_STYLE_FIELDS))
     if not style:
         raise HTTPException(status_code=404, detail=f"Datacenter style with ID {id} not found")
 
-    return datacenter_style_esquema(style)
+    return select_fields(datacenter_style_esquema(style), names)
 
 @router.post("/", response_description="Create a new datacenter style", status_code=201)
 async def create_datacenter_style(style: DatacenterStyle):
     """Create a new datacenter style"""
     try:
         style_dict = style.dict()
-        id = datacenter_style_repo.create(style_dict)
-        new_style = datacenter_style_repo.get_by_id(id)
+        id = await datacenter_style_repo.create(style_dict)
+        new_style = await datacenter_style_repo.get_by_id(id)
         return datacenter_style_esquema(new_style)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating datacenter style: {str(e)}")
@@ -52,30 +82,64 @@ async def create_datacenter_style(style: DatacenterStyle):
 @router.put("/{id}", response_description="Update a datacenter style")
 async def update_datacenter_style(id: str, style: DatacenterStyle):
     """Update an existing datacenter style"""
-    if not ObjectId.is_valid(id) and not any(datacenter_style_repo.get_by_id(id)):
+    if not ObjectId.is_valid(id) and not any(await datacenter_style_repo.get_by_id(id)):
         raise HTTPException(status_code=404, detail=f"Datacenter style with ID {id} not found")
 
     style_dict = style.dict(exclude={"id"})
-    result = datacenter_style_repo.update(id, style_dict)
+    result = await datacenter_style_repo.update(id, style_dict)
 
     if result.modified_count == 0:
         raise HTTPException(status_code=304, detail=f"Datacenter style {id} was not modified")
 
-    updated_style = datacenter_style_repo.get_by_id(id)
+    updated_style = await datacenter_style_repo.get_by_id(id)
     return datacenter_style_esquema(updated_style)
 
 @router.delete("/{id}", response_description="Delete a datacenter style")
 async def delete_datacenter_style(id: str):
     """Delete a datacenter style"""
-    if not ObjectId.is_valid(id) and not any(datacenter_style_repo.get_by_id(id)):
+    if not ObjectId.is_valid(id) and not any(await datacenter_style_repo.get_by_id(id)):
         raise HTTPException(status_code=404, detail=f"Datacenter style with ID {id} not found")
 
-    result = datacenter_style_repo.delete(id)
+    result = await datacenter_style_repo.delete(id)
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail=f"Datacenter style with ID {id} not found")
 
     return {"message": f"Datacenter style {id} deleted successfully"}
 
+@router.post("/{id}/explore", response_description="Explore the module mixes of a datacenter style")
+async def explore_datacenter_style(id: str, explore_request: Optional[ExploreRequest] = None):
+    """
+    Find the Pareto front of module mixes that meet a datacenter style
+
+    Mixes are compared on price, processing, data storage and footprint area;
+    the front holds every evaluated mix no other one beats on all four.
+
+    - **time_budget**: Seconds to spend evaluating (at most 30)
+    - **workers**: Worker processes to use
+    - **max_mixes**, **patience**: Stop early after that many mixes, or after that many chunks without a new front entry
+    """
+    explore_request = explore_request or ExploreRequest()
+    if not 0 < explore_request.time_budget <= MAX_TIME_BUDGET:
+        raise HTTPException(status_code=400, detail=f"time_budget must be between 0 and {MAX_TIME_BUDGET} seconds")
+    for field in ("workers", "max_mixes", "patience", "max_count"):
+        value = getattr(explore_request, field)
+        if value is not None and value < 1:
+            raise HTTPException(status_code=400, detail=f"{field} must be at least 1")
+    if explore_request.limit < 0:
+        raise HTTPException(status_code=400, detail="limit must not be negative")
+
+    try:
+        style = await datacenter_style_repo.get_by_id(id)
+        if not style:
+            raise HTTPException(status_code=404, detail=f"Datacenter style with ID {id} not found")
+
+        result = await design_explorer.explore(style, **explore_request.dict())
+        return FastJSONResponse({"style_id": id, **result})
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error exploring datacenter style: {str(e)}")
+
 @router.get("/focus/{focus}", response_description="Get datacenter styles by focus")
 async def get_datacenter_styles_by_focus(focus: str):
     """Get all datacenter styles of a specific focus type"""
@@ -83,7 +147,7 @@ async def get_datacenter_styles_by_focus(focus: str):
     if focus not in valid_focuses:
         raise HTTPException(status_code=400, detail=f"Invalid focus: {focus}. Must be one of {valid_focuses}")
 
-    styles = datacenter_style_repo.get_by_focus(focus)
+    styles = await datacenter_style_repo.get_by_focus(focus)
     return datacenter_styles_esquema(styles)
 
 @router.post("/import", response_description="Import datacenter styles", status_code=201)
@@ -121,7 +185,7 @@ async def import_datacenter_styles(styles: List[DatacenterStyle]):
             if style.get("processing") == -1:
                 style["processing"] = 5000
 
-        result = datacenter_style_repo.bulk_create(styles_to_insert)
+        result = await datacenter_style_repo.bulk_create(styles_to_insert)
 
         return {
             "message": f"Successfully imported {len(result)} datacenter styles",
@@ -187,7 +251,7 @@ async def import_datacenter_styles_csv(import_request: CSVImportRequest):
         if not styles_to_insert:
             raise HTTPException(status_code=400, detail="No valid styles found in CSV data")
 
-        result = datacenter_style_repo.bulk_create(styles_to_insert)
+        result = await datacenter_style_repo.bulk_create(styles_to_insert)
         return {
             "message": f"Successfully imported {len(result)} datacenter styles",
             "imported_count": len(result)
@@ -238,7 +302,7 @@ async def import_datacenter_styles_json(import_request: StylesImportRequest):
             styles_to_insert.append(style_data)
 
         # Insert into database
-        result = datacenter_style_repo.bulk_create(styles_to_insert)
+        result = await datacenter_style_repo.bulk_create(styles_to_insert)
 
         return {
             "message": f"Successfully imported {len(result)} datacenter styles",
@@ -263,7 +327,7 @@ async def delete_all_datacenter_styles(confirm: bool = False):
         )
 
     try:
-        result = datacenter_style_repo.collection.delete_many({})
+        result = await datacenter_style_repo.collection.delete_many({})
         return {
             "message": f"Successfully deleted {result.deleted_count} datacenter styles",
             "deleted_count": result.deleted_count
@@ -1,11 +1,22 @@
-from fastapi import APIRouter, HTTPException, Query
-from typing import List, Optional, Dict, Any
+import asyncio
+import anyio.to_thread
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from typing import List, Optional, Dict, Any, Literal
 from bson import ObjectId
 from app.models.schemas import Datacenter, PlacedModule, Position
-from app.repositories.datacenter_repository import DatacenterRepository
-from app.repositories.placed_module_repository import PlacedModuleRepository
-from app.repositories.module_repository import ModuleRepository
-from app.repositories.datacenter_style_repository import DatacenterStyleRepository
+from app.repositories.datacenter_repository import AsyncDatacenterRepository, LayoutConflict
+from app.repositories.placed_module_repository import AsyncPlacedModuleRepository
+from app.repositories.datacenter_style_repository import AsyncDatacenterStyleRepository
+from app.services.module_catalog import module_catalog
+from app.services.layout import Layout, referenced_module_id
+from app.services.layout_encoding import LAYOUT_MEDIA_TYPE, encode_layout
+from app.services.layout_validation import ValidationMode, validate_layout
+from app.services.metrics import metrics_engine
+from app.services.packing import MAX_MODULES, footprint_counts, pack_modules
+from app.services.placement import PLACEMENT_ERROR_STATUS, LAYOUT_PROJECTION, floor_dim, placement_engine
+from app.core.responses import FastJSONResponse, wants_ndjson, ndjson_response
+from app.core.etags import make_etag, etag_matches, not_modified, with_etag
+from app.core.fieldsets import DATACENTER_FIELDS, DatacenterFieldset, projection
 from DB.esquemas.esquema_datacenters import datacenter_esquema, datacenters_esquema, datacenter_esquema_minimal, datacenters_esquema_minimal
 from pydantic import BaseModel
 from datetime import datetime
@@ -13,13 +24,13 @@ from datetime import datetime
 router = APIRouter(
     prefix="/datacenters",
     tags=["datacenters"],
+    default_response_class=FastJSONResponse,
     responses={404: {"description": "Not found"}}
 )
 
-datacenter_repo = DatacenterRepository()
-placed_module_repo = PlacedModuleRepository()
-module_repo = ModuleRepository()
-style_repo = DatacenterStyleRepository()
+datacenter_repo = AsyncDatacenterRepository()
+placed_module_repo = AsyncPlacedModuleRepository()
+style_repo = AsyncDatacenterStyleRepository()
 
 # Request models
 class DatacenterCreate(BaseModel):
@@ -54,8 +65,86 @@ class DatacenterCreateSimple(BaseModel):
     styleId: str  # Style ID to use as base for datacenter
     modules: List[ModulePosition] = []
 
+class DatacenterGenerateRequest(BaseModel):
+    name: Optional[str] = None
+    description: Optional[str] = None
+    styleId: str  # Style whose floor the modules are packed onto
+    modules: Dict[str, int]  # Catalog module ID -> how many to place
+    clearance: int = 0  # Meters kept free between modules
+    aisle: int = 0  # Extra meters kept free below every module
+
+# Incremental layout edits against a known layout version
+class LayoutOperation(BaseModel):
+    op: Literal["add", "move", "rotate", "remove"]
+    placed_module_id: Optional[str] = None  # Target of move/rotate/remove
+    module_id: Optional[str] = None  # Catalog module to add
+    position: Optional[Position] = None
+    rotation: Optional[int] = None
+
+class LayoutDelta(BaseModel):
+    version: int  # Layout version the operations were made against
+    operations: List[LayoutOperation]
+
+class PlacementCheckRequest(BaseModel):
+    module_id: str  # Catalog module to place
+    position: Position
+    rotation: int = 0
+    placed_module_id: Optional[str] = None  # Placed module being moved; its own footprint is ignored
+
+# Fields read by the views that only need module references and coordinates
+MINIMAL_DATACENTER_PROJECTION = projection(["name", "description", "created_at", "updated_at", "style_id"], DATACENTER_FIELDS)
+SIMPLE_DATACENTER_PROJECTION = projection(["name", "description", "style_id", "created_at", "updated_at", "layout_version"], DATACENTER_FIELDS)
+SIMPLE_MODULE_PROJECTION = {"_id": 1, "module_id": 1, "module.id": 1, "position": 1, "rotation": 1}
+
+async def datacenter_etag(datacenter: dict, view: str, include_modules: bool = True, uses_catalog: bool = False) -> str:
+    """
+    ETag of a datacenter representation
+
+    Every layout write bumps updated_at and layout_version, so neither the
+    placed modules nor the response body are needed to compute it. Views that
+    embed module data also depend on the module catalog.
+    """
+    parts = ["datacenter", view, datacenter["_id"], datacenter.get("updated_at"), datacenter.get("layout_version", 0), include_modules]
+    if include_modules and uses_catalog:
+        parts.append(await module_catalog.fingerprint())
+    return make_etag(*parts)
+
+async def get_datacenter_conditionally(request: Request, id: str, view: str, include_modules: bool = True,
+                                       projection: Optional[dict] = None, module_projection: Optional[dict] = None,
+                                       hydrate: bool = True):
+    """
+    Load a datacenter for a conditional GET
+
+    Returns (datacenter, etag, None), or (None, etag, 304 response) when
+    If-None-Match matches. The 304 path reads only the datacenter document and
+    never touches placed_modules.
+    """
+    if projection is not None:
+        # The ETag is built from these whatever fields were requested
+        projection = {**projection, "updated_at": 1, "layout_version": 1}
+
+    if not request.headers.get("if-none-match"):
+        # Nothing to revalidate: load the datacenter and its modules concurrently
+        datacenter = await datacenter_repo.get_by_id(id, include_modules, projection, module_projection, hydrate)
+        if not datacenter:
+            raise HTTPException(status_code=404, detail=f"Datacenter with ID {id} not found")
+        return datacenter, await datacenter_etag(datacenter, view, include_modules, hydrate), None
+
+    datacenter = await datacenter_repo.get_by_id(id, include_modules=False, projection=projection)
+    if not datacenter:
+        raise HTTPException(status_code=404, detail=f"Datacenter with ID {id} not found")
+
+    etag = await datacenter_etag(datacenter, view, include_modules, hydrate)
+    if etag_matches(request, etag):
+        return None, etag, not_modified(etag)
+
+    if include_modules:
+        datacenter = await datacenter_repo.attach_modules(datacenter, module_projection, hydrate)
+    return datacenter, etag, None
+
 @router.get("/", response_description="List all datacenters")
-async def list_datacenters(include_modules: bool = False, minimal: bool = True, limit: int = 100, skip: int = 0):
+async def list_datacenters(include_modules: bool = False, minimal: bool = True, limit: int = 100, skip: int = 0, cursor: Optional[str] = None,
+                           fields: Optional[str] = None):
     """
     Get all datacenters with pagination.
 
@@ -63,50 +152,139 @@ async def list_datacenters(include_modules: bool = False, minimal: bool = True,
     - **minimal**: Return only essential datacenter information
     - **limit**: Maximum number of datacenters to return
     - **skip**: Number of datacenters to skip
+    - **cursor**: `next_cursor` from a previous page, for keyset pagination of deep pages
+    - **fields**: Comma-separated fields to return (e.g. `name,style_id,modules.position`); overrides minimal
     """
     try:
-        datacenters = datacenter_repo.get_all(include_modules if not minimal else False)
+        if limit < 1 or skip < 0:
+            raise HTTPException(status_code=400, detail="limit must be positive and skip must not be negative")
+
+        if cursor and not ObjectId.is_valid(cursor):
+            raise HTTPException(status_code=400, detail=f"Invalid cursor: {cursor}")
+
+        fieldset = DatacenterFieldset(fields)
+        if fields is not None:
+            page = await datacenter_repo.list_page(
+                skip=skip,
+                limit=limit,
+                include_modules=fieldset.include_modules,
+                after=cursor,
+                projection=fieldset.projection,
+                module_projection=fieldset.module_projection,
+                hydrate=fieldset.hydrate
+            )
+
+            return FastJSONResponse({
+                "total": page["total"],
+                "datacenters": [fieldset.select(datacenter_esquema(datacenter)) for datacenter in page["datacenters"]],
+                "next_cursor": page["next_cursor"]
+            })
 
-        # Apply pagination
-        paginated = datacenters[skip:skip + limit]
+        page = await datacenter_repo.list_page(
+            skip=skip,
+            limit=limit,
+            include_modules=include_modules if not minimal else False,
+            after=cursor,
+            projection=MINIMAL_DATACENTER_PROJECTION if minimal else None
+        )
 
         if minimal:
-            return {
-                "total": len(datacenters),
-                "datacenters": datacenters_esquema_minimal(paginated)
-            }
+            return FastJSONResponse({
+                "total": page["total"],
+                "datacenters": datacenters_esquema_minimal(page["datacenters"]),
+                "next_cursor": page["next_cursor"]
+            })
         else:
-            return {
-                "total": len(datacenters),
-                "datacenters": datacenters_esquema(paginated)
-            }
+            return FastJSONResponse({
+                "total": page["total"],
+                "datacenters": datacenters_esquema(page["datacenters"]),
+                "next_cursor": page["next_cursor"]
+            })
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving datacenters: {str(e)}")
 
+@router.post("/generate", response_description="Generate a datacenter layout from module counts")
+async def generate_datacenter(generate_request: DatacenterGenerateRequest):
+    """
+    Pack module counts onto a style's floor
+
+    Returns positions and rotations in the `POST /datacenters/` request
+    shape, so the result can be created as is. Modules that do not fit are
+    listed under `packing.unplaced`.
+
+    - **modules**: Module counts by catalog ID, e.g. `{"server_rack_500": 40, "transformer_1000": 2}`
+    - **clearance**: Meters kept free between any two modules
+    - **aisle**: Extra meters kept free below every module, leaving walkways along the x axis
+    """
+    try:
+        if any(count < 0 for count in generate_request.modules.values()):
+            raise HTTPException(status_code=400, detail="Module counts must not be negative")
+        if generate_request.clearance < 0 or generate_request.aisle < 0:
+            raise HTTPException(status_code=400, detail="Clearance and aisle must not be negative")
+        if sum(generate_request.modules.values()) > MAX_MODULES:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_MODULES} modules can be generated at once")
+
+        style, (modules, footprints) = await asyncio.gather(
+            style_repo.get_by_id(generate_request.styleId),
+            module_catalog.resolve_footprints(generate_request.modules)
+        )
+        if not style:
+            raise HTTPException(status_code=404, detail=f"Datacenter style with ID {generate_request.styleId} not found")
+
+        counts, missing = footprint_counts(generate_request.modules, modules, footprints)
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Modules not found: {', '.join(missing)}")
+
+        # Packing is CPU-bound; keep it off the event loop
+        result = await anyio.to_thread.run_sync(
+            lambda: pack_modules(counts, footprints, floor_dim(style), generate_request.clearance, generate_request.aisle)
+        )
+        return {
+            "name": generate_request.name or f"Datacenter using {style.get('name', 'unknown style')}",
+            "description": generate_request.description or style.get("description", ""),
+            "styleId": generate_request.styleId,
+            "modules": result.layout.to_module_positions(),
+            "packing": result.to_dict()
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error generating datacenter: {str(e)}")
+
 @router.post("/search", response_description="Search datacenters")
 async def search_datacenters(search: DatacenterSearch):
     """
     Search datacenters by name or description
     """
     try:
-        results = datacenter_repo.search(search.query, search.limit)
+        results = await datacenter_repo.search(search.query, search.limit)
         return datacenters_esquema(results)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error searching datacenters: {str(e)}")
 
 @router.get("/{id}", response_description="Get a datacenter by ID")
-async def get_datacenter(id: str, include_modules: bool = True):
+async def get_datacenter(id: str, request: Request, include_modules: bool = True, fields: Optional[str] = None):
     """
     Get a specific datacenter by ID
 
     - **include_modules**: Whether to include placed modules in the response
+    - **fields**: Comma-separated fields to return (e.g. `name,modules.position,modules.module_id`)
+
+    Supports If-None-Match; an unchanged datacenter is answered with 304.
     """
     try:
-        datacenter = datacenter_repo.get_by_id(id, include_modules)
-        if not datacenter:
-            raise HTTPException(status_code=404, detail=f"Datacenter with ID {id} not found")
-
-        return datacenter_esquema(datacenter)
+        fieldset = DatacenterFieldset(fields)
+        datacenter, etag, not_modified_response = await get_datacenter_conditionally(
+            request, id, f"full:{fields}", include_modules and fieldset.include_modules,
+            fieldset.projection, fieldset.module_projection, fieldset.hydrate
+        )
+        if not_modified_response:
+            return not_modified_response
+
+        # Returning the response directly skips the jsonable_encoder pass
+        return with_etag(FastJSONResponse(fieldset.select(datacenter_esquema(datacenter))), etag)
     except HTTPException:
         raise
     except Exception as e:
@@ -115,7 +293,10 @@ async def get_datacenter(id: str, include_modules: bool = True):
 @router.get("/minimal/{id}", response_description="Get a datacenter by ID")
 async def get_datacenter(id: str, include_modules: bool = True):
     try:
-        datacenter = datacenter_repo.get_by_id(id, include_modules)
+        # Only the style and the module references and coordinates are needed
+        datacenter = await datacenter_repo.get_by_id(
+            id, include_modules, projection={"style_id": 1}, module_projection=SIMPLE_MODULE_PROJECTION, hydrate=False
+        )
         if not datacenter:
             raise HTTPException(status_code=404, detail=f"Datacenter with ID {id} not found")
 
@@ -145,16 +326,20 @@ async def get_datacenter(id: str, include_modules: bool = True):
         raise HTTPException(status_code=500, detail=f"Error retrieving datacenter: {str(e)}")
 
 @router.get("/{id}/simple", response_description="Get a simplified datacenter view")
-async def get_datacenter_simple(id: str):
+async def get_datacenter_simple(id: str, request: Request):
     """
     Get a datacenter with its modules in the simplified format
 
-    Returns the datacenter with its style ID and a list of module positions
+    Returns the datacenter with its style ID and a list of module positions.
+    Supports If-None-Match; an unchanged datacenter is answered with 304.
     """
     try:
-        datacenter = datacenter_repo.get_by_id(id, include_modules=True)
-        if not datacenter:
-            raise HTTPException(status_code=404, detail=f"Datacenter with ID {id} not found")
+        # Only module references and coordinates are read, never module data
+        datacenter, etag, not_modified_response = await get_datacenter_conditionally(
+            request, id, "simple", projection=SIMPLE_DATACENTER_PROJECTION, module_projection=SIMPLE_MODULE_PROJECTION, hydrate=False
+        )
+        if not_modified_response:
+            return not_modified_response
 
         # Transform to the simplified format
         simple_modules = []
@@ -176,19 +361,49 @@ async def get_datacenter_simple(id: str):
             "styleId": datacenter.get("style_id", ""),
             "modules": simple_modules,
             "created_at": datacenter.get("created_at"),
-            "updated_at": datacenter.get("updated_at")
+            "updated_at": datacenter.get("updated_at"),
+            "layout_version": datacenter.get("layout_version", 0)
         }
 
-        return {
+        return with_etag(FastJSONResponse({
             "datacenter": simple_datacenter
-        }
+        }), etag)
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving datacenter: {str(e)}")
 
+@router.get("/{id}/layout", response_description="Get a datacenter layout in the binary columnar format")
+async def get_datacenter_layout_binary(id: str, request: Request):
+    """
+    Get a datacenter's placed modules as a binary columnar layout
+
+    The body holds a module-ID dictionary followed by packed little-endian
+    columns (uint16 module index, int32 x, int32 y, uint8 rotation code) that
+    clients can read as typed arrays; see app/services/layout_encoding.py for
+    the exact format. Supports If-None-Match like the simple view.
+    """
+    try:
+        datacenter, etag, not_modified_response = await get_datacenter_conditionally(
+            request, id, "binary", projection={"updated_at": 1, "layout_version": 1},
+            module_projection=SIMPLE_MODULE_PROJECTION, hydrate=False
+        )
+        if not_modified_response:
+            return not_modified_response
+
+        try:
+            body = encode_layout(datacenter.get("modules", []), datacenter.get("layout_version", 0))
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=f"Layout cannot be encoded: {str(e)}")
+
+        return with_etag(Response(content=body, media_type=LAYOUT_MEDIA_TYPE), etag)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error retrieving datacenter layout: {str(e)}")
+
 @router.post("/", response_description="Create a new datacenter", status_code=201)
-async def create_datacenter(datacenter_request: DatacenterCreateSimple):
+async def create_datacenter(datacenter_request: DatacenterCreateSimple, validation: ValidationMode = "report"):
     """
     Create a new datacenter with a specific style and modules
 
@@ -197,13 +412,25 @@ async def create_datacenter(datacenter_request: DatacenterCreateSimple):
     - modules: List of module positions to place in the datacenter
     - name (optional): Name for the datacenter
     - description (optional): Description for the datacenter
+
+    Overlapping modules and modules outside the style's floor are listed
+    under `validation` (by index in `modules`); with `validation=strict`
+    such a layout is rejected with 422 instead.
     """
     try:
-        # Fetch the style
-        style = style_repo.get_by_id(datacenter_request.styleId)
+        # Fetch the style while resolving every referenced module from the catalog
+        style, module_infos, layout = await asyncio.gather(
+            style_repo.get_by_id(datacenter_request.styleId),
+            module_catalog.get_many(module_pos.id for module_pos in datacenter_request.modules),
+            Layout.from_simple(datacenter_request.modules, module_catalog)
+        )
         if not style:
             raise HTTPException(status_code=404, detail=f"Datacenter style with ID {datacenter_request.styleId} not found")
 
+        report = validate_layout(layout, floor_dim(style))
+        if validation == "strict" and not report.valid:
+            raise HTTPException(status_code=422, detail={"message": report.describe(), "validation": report.to_dict()})
+
         # Create datacenter base from style
         datacenter_base = {
             "name": datacenter_request.name or f"Datacenter using {style.get('name', 'unknown style')}",
@@ -216,16 +443,13 @@ async def create_datacenter(datacenter_request: DatacenterCreateSimple):
             "updated_at": datetime.utcnow().isoformat(),
         }
 
-        # Create the datacenter first
-        datacenter_id = datacenter_repo.create(datacenter_base)
-
         missing_modules = []
         placed_modules = []
 
         # Now process all modules
         for module_pos in datacenter_request.modules:
+            module_info = module_infos[module_pos.id]
             # Verify the module exists
-            module_info = module_repo.get_by_id(module_pos.id)
             if not module_info:
                 missing_modules.append(module_pos.id)
                 continue  # Skip if module not found
@@ -234,27 +458,26 @@ async def create_datacenter(datacenter_request: DatacenterCreateSimple):
             placed_module = {
                 "module_id": module_pos.id,
                 "position": module_pos.position.dict(),
-                "rotation": module_pos.rotation,
-                "datacenter_id": datacenter_id
+                "rotation": module_pos.rotation
             }
 
-            # Store full module info if available (can be referenced later)
+            # Keep the full module info for the response; storage only keeps the reference
             if module_info:
                 # Convert ObjectId to string to make it JSON serializable
                 if "_id" in module_info:
                     module_info["_id"] = str(module_info["_id"])
                 placed_module["module"] = module_info
 
-            # Add to database
-            placed_id = placed_module_repo.create(placed_module)
-            placed_modules.append(placed_id)
+            placed_modules.append(placed_module)
 
-        # Fetch the complete datacenter with all placed modules
-        new_datacenter = datacenter_repo.get_by_id(datacenter_id)
+        # Create the datacenter and all its placed modules in one batched write
+        datacenter_base["modules"] = placed_modules
+        await datacenter_repo.create(datacenter_base)
 
         response = {
-            "datacenter": datacenter_esquema(new_datacenter),
-            "message": "Datacenter created successfully"
+            "datacenter": datacenter_esquema(datacenter_base),
+            "message": "Datacenter created successfully",
+            "validation": report.to_dict()
         }
 
         # Add warnings for missing modules
@@ -275,7 +498,7 @@ async def update_datacenter(id: str, datacenter: DatacenterUpdate):
     """Update a datacenter"""
     try:
         # Verify datacenter exists
-        existing = datacenter_repo.get_by_id(id, include_modules=False)
+        existing = await datacenter_repo.get_by_id(id, include_modules=False)
         if not existing:
             raise HTTPException(status_code=404, detail=f"Datacenter with ID {id} not found")
 
@@ -283,10 +506,10 @@ async def update_datacenter(id: str, datacenter: DatacenterUpdate):
         update_data = {k: v for k, v in datacenter.dict().items() if v is not None}
 
         # Update the datacenter
-        result = datacenter_repo.update(id, update_data)
+        result = await datacenter_repo.update(id, update_data)
 
         # Get updated datacenter
-        updated = datacenter_repo.get_by_id(id)
+        updated = await datacenter_repo.get_by_id(id)
         return datacenter_esquema(updated)
     except HTTPException:
         raise
@@ -294,21 +517,29 @@ async def update_datacenter(id: str, datacenter: DatacenterUpdate):
         raise HTTPException(status_code=500, detail=f"Error updating datacenter: {str(e)}")
 
 @router.put("/{id}/layout", response_description="Update datacenter layout")
-async def update_datacenter_layout(id: str, layout_request: DatacenterCreateSimple):
+async def update_datacenter_layout(id: str, layout_request: DatacenterCreateSimple, validation: ValidationMode = "report"):
     """
     Update an existing datacenter's layout with new modules
 
-    This replaces all existing modules with the new layout.
+    This replaces all existing modules with the new layout. Overlaps and
+    modules outside the floor are reported as in `POST /datacenters/`, or
+    rejected with 422 when `validation=strict`.
     """
     try:
-        # Verify datacenter exists
-        existing = datacenter_repo.get_by_id(id, include_modules=False)
+        # Verify datacenter exists while resolving the requested modules
+        existing, module_infos, layout = await asyncio.gather(
+            datacenter_repo.get_by_id(id, include_modules=False),
+            module_catalog.get_many(module_pos.id for module_pos in layout_request.modules),
+            Layout.from_simple(layout_request.modules, module_catalog)
+        )
         if not existing:
             raise HTTPException(status_code=404, detail=f"Datacenter with ID {id} not found")
 
+        update_data = {}
+
         # If style ID is changing, update datacenter properties
         if layout_request.styleId != existing.get("style_id"):
-            style = style_repo.get_by_id(layout_request.styleId)
+            style = await style_repo.get_by_id(layout_request.styleId)
             if not style:
                 raise HTTPException(status_code=404, detail=f"Datacenter style with ID {layout_request.styleId} not found")
 
@@ -317,8 +548,7 @@ async def update_datacenter_layout(id: str, layout_request: DatacenterCreateSimp
                 "style_id": layout_request.styleId,
                 "dim": style.get("dim", [1000, 1000]),
                 "grid_connection": style.get("grid_connection", 0),
-                "water_connection": style.get("water_connection", 0),
-                "updated_at": datetime.utcnow().isoformat()
+                "water_connection": style.get("water_connection", 0)
             }
 
             # Update name and description if provided
@@ -327,53 +557,125 @@ async def update_datacenter_layout(id: str, layout_request: DatacenterCreateSimp
             if layout_request.description:
                 update_data["description"] = layout_request.description
 
-            datacenter_repo.update(id, update_data)
-
-        # Delete all existing modules
-        placed_module_repo.delete_by_datacenter_id(id)
+        report = validate_layout(layout, floor_dim({**existing, **update_data}))
+        if validation == "strict" and not report.valid:
+            raise HTTPException(status_code=422, detail={"message": report.describe(), "validation": report.to_dict()})
 
         # Process all new modules
+        placed_modules = []
         for module_pos in layout_request.modules:
+            module_info = module_infos[module_pos.id]
             # Verify the module exists
-            module_info = module_repo.get_by_id(module_pos.id)
             if not module_info:
                 continue  # Skip if module not found
 
             # Create a placed module - only store the module_id, not the full module
             placed_module = {
-                "module": module_info,  # Full module info
-                "module_id": module_pos.id,  # Also store the ID separately
+                "module": module_info,  # Full module info, for the response only
+                "module_id": module_pos.id,  # The stored reference
                 "position": module_pos.position.dict(),
-                "rotation": module_pos.rotation,
-                "datacenter_id": id
+                "rotation": module_pos.rotation
             }
 
-            # Add to database
-            placed_module_repo.create(placed_module)
+            placed_modules.append(placed_module)
 
-        # Fetch the updated datacenter with all placed modules
-        updated_datacenter = datacenter_repo.get_by_id(id)
+        # Replace the layout (and any style properties) in one batched write
+        update_data["modules"] = placed_modules
+        await datacenter_repo.update(id, update_data)
+
+        # Build the response from what was written instead of re-reading it
+        updated_datacenter = {**existing, **update_data, "modules": placed_modules}
+        updated_datacenter["layout_version"] = existing.get("layout_version", 0) + 1
 
         return {
             "datacenter": datacenter_esquema(updated_datacenter),
-            "message": "Datacenter layout updated successfully"
+            "message": "Datacenter layout updated successfully",
+            "validation": report.to_dict()
         }
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating datacenter layout: {str(e)}")
 
+@router.patch("/{id}/layout", response_description="Apply incremental layout changes")
+async def patch_datacenter_layout(id: str, delta: LayoutDelta):
+    """
+    Apply add/move/rotate/remove operations to a datacenter layout
+
+    The request names the layout version it was made against. If the layout
+    has changed since, or an operation targets a placed module the datacenter
+    does not have, nothing is written and 409 is returned; otherwise the
+    operations are applied as one minimal bulk write and the new version is
+    returned.
+    """
+    try:
+        operations = []
+        for index, operation in enumerate(delta.operations):
+            if operation.op == "add":
+                if not operation.module_id or operation.position is None:
+                    raise HTTPException(status_code=400, detail=f"Operation {index}: add requires module_id and position")
+            elif not operation.placed_module_id or not ObjectId.is_valid(operation.placed_module_id):
+                raise HTTPException(status_code=400, detail=f"Operation {index}: {operation.op} requires a valid placed_module_id")
+            elif operation.op == "move" and operation.position is None:
+                raise HTTPException(status_code=400, detail=f"Operation {index}: move requires a position")
+            elif operation.op == "rotate" and operation.rotation is None:
+                raise HTTPException(status_code=400, detail=f"Operation {index}: rotate requires a rotation")
+
+            operations.append({
+                "op": operation.op,
+                "placed_module_id": operation.placed_module_id,
+                "position": operation.position.dict() if operation.position else None,
+                "rotation": operation.rotation
+            })
+
+        # Resolve every added module from the catalog at once
+        added = [operation for operation in delta.operations if operation.op == "add"]
+        existing, module_infos = await asyncio.gather(
+            datacenter_repo.get_by_id(id, include_modules=False),
+            module_catalog.get_many(operation.module_id for operation in added)
+        )
+        if not existing:
+            raise HTTPException(status_code=404, detail=f"Datacenter with ID {id} not found")
+
+        missing_modules = [module_id for module_id, module_info in module_infos.items() if not module_info]
+        if missing_modules:
+            raise HTTPException(status_code=400, detail=f"Some modules were not found: {', '.join(missing_modules)}")
+
+        for operation, payload in zip(delta.operations, operations):
+            if operation.op == "add":
+                payload["document"] = {
+                    "module": module_infos[operation.module_id],
+                    "module_id": operation.module_id,
+                    "position": payload["position"],
+                    "rotation": operation.rotation or 0
+                }
+
+        result = await datacenter_repo.apply_layout_delta(id, delta.version, operations)
+        if result is None:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Layout version {delta.version} is stale; current version is {existing.get('layout_version', 0)}"
+            )
+
+        return result
+    except HTTPException:
+        raise
+    except LayoutConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error applying layout changes: {str(e)}")
+
 @router.delete("/{id}", response_description="Delete a datacenter")
 async def delete_datacenter(id: str):
     """Delete a datacenter and all its placed modules"""
     try:
         # Verify datacenter exists
-        existing = datacenter_repo.get_by_id(id, include_modules=False)
+        existing = await datacenter_repo.get_by_id(id, include_modules=False)
         if not existing:
             raise HTTPException(status_code=404, detail=f"Datacenter with ID {id} not found")
 
         # Delete the datacenter
-        result = datacenter_repo.delete(id)
+        result = await datacenter_repo.delete(id)
 
         return {"message": f"Datacenter {id} and its modules deleted successfully"}
     except HTTPException:
@@ -381,12 +683,48 @@ async def delete_datacenter(id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error deleting datacenter: {str(e)}")
 
+@router.post("/{id}/placements/check", response_description="Check whether a module can be placed")
+async def check_placement(id: str, placement: PlacementCheckRequest):
+    """
+    Check a placement against the datacenter floor and its placed modules
+
+    - **module_id**: Catalog module to place
+    - **position**: Grid position of the module's top-left corner
+    - **rotation**: Rotation in degrees
+    - **placed_module_id**: Placed module being moved, whose current footprint is ignored
+    """
+    try:
+        datacenter = await datacenter_repo.get_by_id(id, include_modules=False)
+        if not datacenter:
+            raise HTTPException(status_code=404, detail=f"Datacenter with ID {id} not found")
+
+        moving = None
+        if placement.placed_module_id:
+            moving = await placed_module_repo.get_by_id(placement.placed_module_id, projection={**LAYOUT_PROJECTION, "datacenter_id": 1}, hydrate=False)
+            if not moving or moving.get("datacenter_id") != id:
+                raise HTTPException(status_code=404, detail=f"Placed module {placement.placed_module_id} not found in datacenter {id}")
+
+        check = await placement_engine.check(
+            id, datacenter, placement.module_id, placement.position.x, placement.position.y, placement.rotation, moving
+        )
+        return check.to_dict()
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error checking placement: {str(e)}")
+
 @router.post("/{id}/modules", response_description="Add a module to a datacenter")
 async def add_module_to_datacenter(id: str, placed_module: PlacedModule):
-    """Add a new module to a datacenter"""
+    """
+    Add a new module to a datacenter
+
+    The placement is rejected with 404 if the module is not in the catalog,
+    422 if it extends outside the datacenter floor and 409 if it overlaps a
+    placed module.
+    """
     try:
         # Verify datacenter exists
-        existing = datacenter_repo.get_by_id(id, include_modules=False)
+        existing = await datacenter_repo.get_by_id(id, include_modules=False)
         if not existing:
             raise HTTPException(status_code=404, detail=f"Datacenter with ID {id} not found")
 
@@ -394,11 +732,21 @@ async def add_module_to_datacenter(id: str, placed_module: PlacedModule):
         placed_module_dict = placed_module.dict()
         placed_module_dict["datacenter_id"] = id
 
-        # Create the placed module
-        module_id = placed_module_repo.create(placed_module_dict)
+        async with placement_engine.lock(id):
+            check = await placement_engine.check(
+                id, existing, placed_module.module.id, placed_module.position.x, placed_module.position.y, placed_module.rotation
+            )
+            if not check.valid:
+                raise HTTPException(status_code=PLACEMENT_ERROR_STATUS[check.reason], detail=check.describe())
+
+            # Create the placed module
+            module_id = await placed_module_repo.create(placed_module_dict)
+            version = await datacenter_repo.touch_layout(id)
+            placement_engine.commit(id, check, version)
+            await metrics_engine.apply(id, {placed_module.module.id: 1}, existing.get("layout_version", 0), version)
 
         # Get the updated datacenter
-        updated = datacenter_repo.get_by_id(id)
+        updated = await datacenter_repo.get_by_id(id)
         return datacenter_esquema(updated)
     except HTTPException:
         raise
@@ -409,13 +757,17 @@ async def add_module_to_datacenter(id: str, placed_module: PlacedModule):
 async def remove_module_from_datacenter(id: str, module_id: str):
     """Remove a module from a datacenter"""
     try:
+        # Look up the datacenter and the placed module concurrently
+        existing, placed_module = await asyncio.gather(
+            datacenter_repo.get_by_id(id, include_modules=False),
+            placed_module_repo.get_by_id(module_id)
+        )
+
         # Verify datacenter exists
-        existing = datacenter_repo.get_by_id(id, include_modules=False)
         if not existing:
             raise HTTPException(status_code=404, detail=f"Datacenter with ID {id} not found")
 
         # Verify module exists and belongs to this datacenter
-        placed_module = placed_module_repo.get_by_id(module_id)
         if not placed_module:
             raise HTTPException(status_code=404, detail=f"Module with ID {module_id} not found")
 
@@ -423,21 +775,57 @@ async def remove_module_from_datacenter(id: str, module_id: str):
             raise HTTPException(status_code=400, detail=f"Module {module_id} does not belong to datacenter {id}")
 
         # Delete the module
-        result = placed_module_repo.delete(module_id)
+        async with placement_engine.lock(id):
+            result = await placed_module_repo.delete(module_id)
+            version = await datacenter_repo.touch_layout(id)
+            await metrics_engine.apply(id, {referenced_module_id(placed_module): -1}, existing.get("layout_version", 0), version)
 
         # Get the updated datacenter
-        updated = datacenter_repo.get_by_id(id)
+        updated = await datacenter_repo.get_by_id(id)
         return datacenter_esquema(updated)
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error removing module from datacenter: {str(e)}")
 
+@router.get("/{id}/metrics", response_description="Get resource totals and style constraint slack")
+async def get_datacenter_metrics(id: str):
+    """
+    Get the resource metrics of a datacenter
+
+    Returns the totals of every module attribute, the supply, demand and
+    balance of each resource (power, water and network), and the slack of
+    each constraint of the datacenter's style: grid and water connections,
+    price and floor area are caps, processing and data storage are targets.
+    """
+    try:
+        datacenter = await datacenter_repo.get_by_id(id, include_modules=False)
+        if not datacenter:
+            raise HTTPException(status_code=404, detail=f"Datacenter with ID {id} not found")
+
+        if datacenter.get("style_id"):
+            style, metrics = await asyncio.gather(style_repo.get_by_id(datacenter["style_id"]), metrics_engine.get(id, datacenter))
+        else:
+            style, metrics = None, await metrics_engine.get(id, datacenter)
+
+        return FastJSONResponse({"datacenter_id": id, **metrics.to_dict(datacenter, style)})
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error computing datacenter metrics: {str(e)}")
+
 @router.get("/style/{style_id}", response_description="Get datacenters by style")
-async def get_datacenters_by_style(style_id: str):
-    """Get all datacenters using a specific style"""
+async def get_datacenters_by_style(style_id: str, request: Request, stream: bool = False):
+    """
+    Get all datacenters using a specific style
+
+    - **stream**: Stream the datacenters as NDJSON (also selected by `Accept: application/x-ndjson`)
+    """
     try:
-        datacenters = datacenter_repo.get_by_style_id(style_id)
+        if wants_ndjson(request, stream):
+            return ndjson_response(datacenter_repo.iter_by_style_id(style_id), datacenters_esquema)
+
+        datacenters = await datacenter_repo.get_by_style_id(style_id)
         return datacenters_esquema(datacenters)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving datacenters by style: {str(e)}")
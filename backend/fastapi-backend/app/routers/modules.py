@@ -1,18 +1,22 @@
-from fastapi import APIRouter, HTTPException, status
-from DB.cliente import cliente_modulos
+from fastapi import APIRouter, HTTPException, Request, status
 from DB.modelos.modules import Module
 from DB.esquemas.esquema_modules import module_esquema, modules_esquema
 from bson import ObjectId
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 from pydantic import BaseModel
-from typing import List
-from app.repositories.module_repository import ModuleRepository
+from typing import List, Optional
+from app.repositories.module_repository import AsyncModuleRepository
+from app.services.module_catalog import module_catalog
+from app.core.responses import FastJSONResponse, wants_ndjson, ndjson_response
+from app.core.etags import make_etag, etag_matches, not_modified, with_etag
+from app.core.fieldsets import parse_fields, module_projection, select_fields, select_fields_many
 
 router = APIRouter(
     prefix="/modules",
-    tags=["modules"]
+    tags=["modules"],
+    default_response_class=FastJSONResponse
 )
-modules_collection = cliente_modulos["modules"]
-module_repo = ModuleRepository()  # Initialize repository
+module_repo = AsyncModuleRepository()  # Initialize repository
 
 # Import request models
 class ModuleImportRequest(BaseModel):
@@ -21,10 +25,24 @@ class ModuleImportRequest(BaseModel):
 class JSONModuleImportRequest(BaseModel):
     modules: List[Module]
 
+def is_duplicate_key_error(error: Exception) -> bool:
+    """Whether an insert failed on a unique index (e.g. two modules with one id)"""
+    if isinstance(error, DuplicateKeyError):
+        return True
+    if isinstance(error, BulkWriteError):
+        write_errors = error.details.get("writeErrors", [])
+        return bool(write_errors) and all(write_error.get("code") == 11000 for write_error in write_errors)
+    return False
+
+def duplicate_key_message(error: Exception) -> str:
+    if isinstance(error, BulkWriteError):
+        return error.details["writeErrors"][0].get("errmsg", str(error))
+    return str(error)
+
 # Helper function for existing code
-def buscar_module(campo: str, clave):
+async def buscar_module(campo: str, clave):
     try:
-        module = modules_collection.find_one({campo: clave})
+        module = await module_repo.collection.find_one({campo: clave})
         if module:
             return module_esquema(module)
         else:
@@ -33,9 +51,31 @@ def buscar_module(campo: str, clave):
         return {"error": f"Module not found with field {campo} and value {clave}: {str(e)}"}
 
 @router.get("/")
-async def get_modules():
-    modules = modules_esquema(modules_collection.find())
-    return modules
+async def get_modules(request: Request, stream: bool = False, fields: Optional[str] = None):
+    """
+    Get every module
+
+    - **stream**: Stream the modules as NDJSON (also selected by `Accept: application/x-ndjson`)
+    - **fields**: Comma-separated module fields to return (e.g. `type,dim,price`)
+    """
+    # Modules are schemaless, so any field name is accepted
+    names = parse_fields(fields)
+
+    if wants_ndjson(request, stream):
+        return ndjson_response(
+            module_repo.iter_all(projection=module_projection(names)),
+            lambda batch: select_fields_many(modules_esquema(batch), names)
+        )
+
+    # The catalog content hash changes with every module write. The catalog
+    # is served from memory, so fieldsets only trim the response here.
+    etag = make_etag("modules", await module_catalog.fingerprint(), fields)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    modules = select_fields_many(modules_esquema(await module_catalog.all()), names)
+    # Returning the response directly skips the jsonable_encoder pass
+    return with_etag(FastJSONResponse(modules), etag)
 
 # Place specific routes BEFORE dynamic routes with path parameters
 @router.post("/csv-import", response_description="Import modules from CSV data", status_code=201)
@@ -71,10 +111,8 @@ async def import_modules(import_request: ModuleImportRequest):
             raise HTTPException(status_code=400, detail="No valid modules found in the CSV data")
 
         # Insert modules
-        result = modules_collection.insert_many(modules_to_insert)
-
-        # Get the inserted modules
-        inserted_ids = [str(id) for id in result.inserted_ids]
+        inserted_ids = await module_repo.bulk_create(modules_to_insert)
+        module_catalog.invalidate()
         return {
             "message": f"Successfully imported {len(inserted_ids)} modules",
             "imported_count": len(inserted_ids)
@@ -87,7 +125,8 @@ async def import_modules(import_request: ModuleImportRequest):
 async def import_modules_json(import_request: JSONModuleImportRequest):
     """
     Import modules from JSON data.
-    Preserves the exact structure of the input data without any transformations.
+    Preserves the structure of the input data; legacy fields are only renamed
+    to the current module schema when stored.
     """
     try:
         if not import_request.modules:
@@ -99,60 +138,58 @@ async def import_modules_json(import_request: JSONModuleImportRequest):
             # Get the raw dict from the pydantic model
             module_dict = module.dict(exclude_unset=True)
 
-            # No transformation, just insert as is
+            # Inserted as is apart from the schema upgrade every write gets
             modules_to_insert.append(module_dict)
 
         # Insert modules directly
-        result = modules_collection.insert_many(modules_to_insert)
-
-        # Get the inserted modules for confirmation
-        inserted_ids = [str(id) for id in result.inserted_ids]
+        try:
+            inserted_ids = await module_repo.bulk_create(modules_to_insert)
+        except (DuplicateKeyError, BulkWriteError) as e:
+            if not is_duplicate_key_error(e):
+                raise
+            # An ordered insert stops at the first duplicate; the ones before it are stored
+            module_catalog.invalidate()
+            raise HTTPException(status_code=409, detail=f"Module ID already exists: {duplicate_key_message(e)}")
+        module_catalog.invalidate()
+
+        # Get the inserted modules for confirmation in a single query
+        stored = {
+            module["_id"]: module
+            for module in await module_repo.collection.find(
+                {"_id": {"$in": [ObjectId(id) for id in inserted_ids]}}
+            ).to_list(None)
+        }
         inserted_modules = []
-
         for id in inserted_ids:
-            if ObjectId.is_valid(id):
-                module = modules_collection.find_one({"_id": ObjectId(id)})
-                if module:
-                    # Convert ObjectId to string for JSON serialization
-                    module["_id"] = str(module["_id"])
-                    inserted_modules.append(module)
+            module = stored.get(ObjectId(id))
+            if module:
+                # Convert ObjectId to string for JSON serialization
+                module["_id"] = str(module["_id"])
+                inserted_modules.append(module)
 
         return {
             "message": f"Successfully imported {len(inserted_ids)} modules",
             "imported_count": len(inserted_ids),
             "modules": inserted_modules
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error importing modules: {str(e)}")
 
+@router.get("/catalog/stats", response_description="Module catalog cache counters")
+async def get_catalog_stats():
+    """Get the version and hit/miss counters of the in-process module catalog"""
+    return module_catalog.stats()
+
 # Place dynamic path parameter routes AFTER specific routes
 @router.get("/{id}")
-async def get_module_by_id(id: str):
+async def get_module_by_id(id: str, fields: Optional[str] = None):
     try:
-        # First check if ID is valid before attempting conversion
-        is_valid_object_id = False
-        try:
-            if id and ObjectId.is_valid(id):
-                is_valid_object_id = True
-        except:
-            # If any error occurs during validation, just treat it as invalid
-            is_valid_object_id = False
-
-        # First try to find by string ID directly
-        module = modules_collection.find_one({"id": id})
+        # Every accepted ID form resolves against the cached catalog
+        module = await module_catalog.get(id, copy=False)
         if module:
-            return module_esquema(module)
-
-        # Try by legacy ID field
-        module = modules_collection.find_one({"ID": id})
-        if module:
-            return module_esquema(module)
-
-        # Only try ObjectId if it's valid
-        if is_valid_object_id:
-            module = modules_collection.find_one({"_id": ObjectId(id)})
-            if module:
-                return module_esquema(module)
+            return select_fields(module_esquema(module), parse_fields(fields))
 
         # If we get here, no module was found
         raise HTTPException(status_code=404, detail=f"Module not found with ID: {id}")
@@ -165,9 +202,9 @@ async def get_module_by_id(id: str):
 async def get_module_by_query(id: str):
     try:
         if ObjectId.is_valid(id):
-            module = buscar_module("_id", ObjectId(id))
+            module = await buscar_module("_id", ObjectId(id))
         else:
-            module = buscar_module("ID", id)
+            module = await buscar_module("ID", id)
 
         if isinstance(module, dict) and "error" in module:
             raise HTTPException(status_code=404, detail=module["error"])
@@ -182,17 +219,18 @@ async def post_module(module: Module):
     try:
         if hasattr(module, "id") and module.id:
             if ObjectId.is_valid(module.id):
-                existing = modules_collection.find_one({"_id": ObjectId(module.id)})
+                existing = await module_repo.collection.find_one({"_id": ObjectId(module.id)})
                 if existing:
                     raise HTTPException(status_code=400, detail=f"Module with id {module.id} already exists")
             else:
-                existing = modules_collection.find_one({"id": module.id})
+                existing = await module_repo.collection.find_one({"id": module.id})
                 if existing:
                     raise HTTPException(status_code=400, detail=f"Module with id {module.id} already exists")
 
         module_dict = module.dict(exclude={"id"} if hasattr(module, "id") else None)
-        id = modules_collection.insert_one(module_dict).inserted_id
-        new_module = module_esquema(modules_collection.find_one({"_id": id}))
+        id = await module_repo.create(module_dict)
+        module_catalog.invalidate()
+        new_module = module_esquema(await module_repo.collection.find_one({"_id": ObjectId(id)}))
         return Module(**new_module)
     except HTTPException:
         raise
@@ -206,9 +244,10 @@ async def delete_all_modules():
     WARNING: This will remove ALL modules and cannot be undone.
     """
     try:
-        count = modules_collection.count_documents({})
+        count = await module_repo.collection.count_documents({})
 
-        result = modules_collection.delete_many({})
+        result = await module_repo.collection.delete_many({})
+        module_catalog.invalidate()
 
         if result.deleted_count == 0:
             return {"message": "No modules found to delete"}
@@ -1,20 +1,31 @@
-from fastapi import APIRouter, HTTPException, Query
+import asyncio
+from fastapi import APIRouter, HTTPException, Query, Request
 from typing import List, Optional
 from bson import ObjectId
 from app.models.schemas import PlacedModule, Module, Position
-from app.repositories.placed_module_repository import PlacedModuleRepository
-from app.repositories.module_repository import ModuleRepository
+from app.repositories.placed_module_repository import AsyncPlacedModuleRepository, hydrate_placed_modules
+from app.repositories.module_repository import AsyncModuleRepository
+from app.repositories.datacenter_repository import AsyncDatacenterRepository
+from app.core.responses import FastJSONResponse, wants_ndjson, ndjson_response
+from app.services.layout import referenced_module_id
+from app.services.layout_validation import ValidationMode, validate_additions
+from app.services.module_catalog import module_catalog
+from app.services.metrics import metrics_engine
+from app.services.placement import PLACEMENT_ERROR_STATUS, LAYOUT_PROJECTION, floor_dim, placement_engine
+from app.core.fieldsets import PLACED_MODULE_FIELDS, parse_fields, projection, includes, select_fields, select_fields_many
 from DB.esquemas.esquema_placed_modules import placed_module_esquema, placed_modules_esquema
 from pydantic import BaseModel
 
 router = APIRouter(
     prefix="/placed-modules",
     tags=["placed_modules"],
+    default_response_class=FastJSONResponse,
     responses={404: {"description": "Not found"}}
 )
 
-placed_module_repo = PlacedModuleRepository()
-module_repo = ModuleRepository()
+placed_module_repo = AsyncPlacedModuleRepository()
+module_repo = AsyncModuleRepository()
+datacenter_repo = AsyncDatacenterRepository()
 
 # Import models
 class PlacedModuleImport(BaseModel):
@@ -24,33 +35,73 @@ class PlacedModuleUpdatePosition(BaseModel):
     position: Position
     rotation: Optional[int] = None
 
+async def _touch_layouts(*datacenter_ids):
+    """Bump the layout version of every affected datacenter so ETags and layout deltas see the change"""
+    await asyncio.gather(*(datacenter_repo.touch_layout(datacenter_id) for datacenter_id in set(datacenter_ids) if datacenter_id))
+
+async def _validate_import(datacenter_id: str, placed_modules: List[dict]):
+    """Validation report of modules imported into one datacenter, or None if it does not exist"""
+    datacenter = await datacenter_repo.get_by_id(datacenter_id, include_modules=False)
+    if not datacenter:
+        return None
+    existing = placed_module_repo.iter_by_datacenter_id(datacenter_id, LAYOUT_PROJECTION)
+    return await validate_additions(existing, placed_modules, floor_dim(datacenter), module_catalog)
+
+async def _hydrated_esquema(placed_modules: List[dict]) -> list:
+    return placed_modules_esquema(await hydrate_placed_modules(placed_modules))
+
 @router.get("/", response_description="Get all placed modules")
-async def get_all_placed_modules():
-    """Get all placed modules across all datacenters"""
+async def get_all_placed_modules(request: Request, stream: bool = False, fields: Optional[str] = None):
+    """
+    Get all placed modules across all datacenters
+
+    - **stream**: Stream the placed modules as NDJSON (also selected by `Accept: application/x-ndjson`)
+    - **fields**: Comma-separated fields to return (e.g. `position,rotation,module_id`)
+    """
     try:
-        placed_modules = placed_module_repo.get_all()
-        return placed_modules_esquema(placed_modules)
+        if wants_ndjson(request, stream):
+            return ndjson_response(placed_module_repo.iter_all(), _hydrated_esquema)
+
+        names = parse_fields(fields, PLACED_MODULE_FIELDS)
+        placed_modules = await placed_module_repo.get_all(projection(names, PLACED_MODULE_FIELDS), hydrate=includes(names, "module"))
+        return FastJSONResponse(select_fields_many(placed_modules_esquema(placed_modules), names))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving placed modules: {str(e)}")
 
 @router.get("/datacenter/{datacenter_id}", response_description="Get all placed modules for a datacenter")
-async def get_placed_modules_by_datacenter(datacenter_id: str):
-    """Get all modules placed in a specific datacenter"""
+async def get_placed_modules_by_datacenter(datacenter_id: str, fields: Optional[str] = None):
+    """
+    Get all modules placed in a specific datacenter
+
+    - **fields**: Comma-separated fields to return (e.g. `position,rotation,module_id`)
+    """
     try:
-        placed_modules = placed_module_repo.get_by_datacenter_id(datacenter_id)
-        return placed_modules_esquema(placed_modules)
+        names = parse_fields(fields, PLACED_MODULE_FIELDS)
+        placed_modules = await placed_module_repo.get_by_datacenter_id(
+            datacenter_id, projection(names, PLACED_MODULE_FIELDS), hydrate=includes(names, "module")
+        )
+        return FastJSONResponse(select_fields_many(placed_modules_esquema(placed_modules), names))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving placed modules: {str(e)}")
 
 @router.get("/{id}", response_description="Get a placed module by ID")
-async def get_placed_module(id: str):
-    """Get a specific placed module by ID"""
+async def get_placed_module(id: str, fields: Optional[str] = None):
+    """
+    Get a specific placed module by ID
+
+    - **fields**: Comma-separated fields to return (e.g. `position,rotation,module_id`)
+    """
     try:
-        placed_module = placed_module_repo.get_by_id(id)
+        names = parse_fields(fields, PLACED_MODULE_FIELDS)
+        placed_module = await placed_module_repo.get_by_id(id, projection(names, PLACED_MODULE_FIELDS), hydrate=includes(names, "module"))
         if not placed_module:
             raise HTTPException(status_code=404, detail=f"Placed module with ID {id} not found")
 
-        return placed_module_esquema(placed_module)
+        return select_fields(placed_module_esquema(placed_module), names)
     except HTTPException:
         raise
     except Exception as e:
@@ -68,8 +119,9 @@ async def create_placed_module(placed_module: PlacedModule):
         placed_module_dict = placed_module.dict()
 
         # Create the placed module
-        id = placed_module_repo.create(placed_module_dict)
-        new_placed_module = placed_module_repo.get_by_id(id)
+        id = await placed_module_repo.create(placed_module_dict)
+        await _touch_layouts(placed_module_dict.get("datacenter_id"))
+        new_placed_module = await placed_module_repo.get_by_id(id)
 
         return placed_module_esquema(new_placed_module)
     except HTTPException:
@@ -82,7 +134,7 @@ async def update_placed_module(id: str, placed_module: PlacedModule):
     """Update an existing placed module"""
     try:
         # Check if the placed module exists
-        existing = placed_module_repo.get_by_id(id)
+        existing = await placed_module_repo.get_by_id(id)
         if not existing:
             raise HTTPException(status_code=404, detail=f"Placed module with ID {id} not found")
 
@@ -90,10 +142,11 @@ async def update_placed_module(id: str, placed_module: PlacedModule):
         placed_module_dict = placed_module.dict(exclude={"id"})
 
         # Update the placed module
-        result = placed_module_repo.update(id, placed_module_dict)
+        result = await placed_module_repo.update(id, placed_module_dict)
+        await _touch_layouts(existing.get("datacenter_id"), placed_module_dict.get("datacenter_id"))
 
         # Fetch and return the updated module
-        updated = placed_module_repo.get_by_id(id)
+        updated = await placed_module_repo.get_by_id(id)
         return placed_module_esquema(updated)
     except HTTPException:
         raise
@@ -102,10 +155,15 @@ async def update_placed_module(id: str, placed_module: PlacedModule):
 
 @router.patch("/{id}/position", response_description="Update a placed module's position")
 async def update_placed_module_position(id: str, update_data: PlacedModuleUpdatePosition):
-    """Update just the position and rotation of a placed module"""
+    """
+    Update just the position and rotation of a placed module
+
+    Moves inside a datacenter are rejected with 422 if the module would
+    extend outside the floor and 409 if it would overlap another module.
+    """
     try:
         # Check if the placed module exists
-        existing = placed_module_repo.get_by_id(id)
+        existing = await placed_module_repo.get_by_id(id)
         if not existing:
             raise HTTPException(status_code=404, detail=f"Placed module with ID {id} not found")
 
@@ -114,11 +172,31 @@ async def update_placed_module_position(id: str, update_data: PlacedModuleUpdate
         if update_data.rotation is not None:
             update_dict["rotation"] = update_data.rotation
 
-        # Update the position
-        result = placed_module_repo.update(id, update_dict)
+        datacenter_id = existing.get("datacenter_id")
+        datacenter = await datacenter_repo.get_by_id(datacenter_id, include_modules=False) if datacenter_id else None
+        if not datacenter:
+            # Unplaced modules have no floor to check against
+            result = await placed_module_repo.update(id, update_dict)
+            await _touch_layouts(datacenter_id)
+        else:
+            async with placement_engine.lock(datacenter_id):
+                rotation = update_data.rotation if update_data.rotation is not None else existing.get("rotation", 0)
+                check = await placement_engine.check(
+                    datacenter_id, datacenter, referenced_module_id(existing),
+                    update_data.position.x, update_data.position.y, rotation, existing
+                )
+                if not check.valid:
+                    raise HTTPException(status_code=PLACEMENT_ERROR_STATUS[check.reason], detail=check.describe())
+
+                # Update the position
+                result = await placed_module_repo.update(id, update_dict)
+                version = await datacenter_repo.touch_layout(datacenter_id)
+                placement_engine.commit(datacenter_id, check, version)
+                # A move changes no totals, only the version the metrics are current for
+                await metrics_engine.apply(datacenter_id, {}, datacenter.get("layout_version", 0), version)
 
         # Fetch and return the updated module
-        updated = placed_module_repo.get_by_id(id)
+        updated = await placed_module_repo.get_by_id(id)
         return placed_module_esquema(updated)
     except HTTPException:
         raise
@@ -130,12 +208,13 @@ async def delete_placed_module(id: str):
     """Delete a placed module"""
     try:
         # Check if the placed module exists
-        existing = placed_module_repo.get_by_id(id)
+        existing = await placed_module_repo.get_by_id(id)
         if not existing:
             raise HTTPException(status_code=404, detail=f"Placed module with ID {id} not found")
 
         # Delete the placed module
-        result = placed_module_repo.delete(id)
+        result = await placed_module_repo.delete(id)
+        await _touch_layouts(existing.get("datacenter_id"))
 
         return {"message": f"Placed module {id} deleted successfully"}
     except HTTPException:
@@ -144,8 +223,15 @@ async def delete_placed_module(id: str):
         raise HTTPException(status_code=500, detail=f"Error deleting placed module: {str(e)}")
 
 @router.post("/import", response_description="Import multiple placed modules", status_code=201)
-async def import_placed_modules(import_request: PlacedModuleImport):
-    """Import multiple placed modules at once"""
+async def import_placed_modules(import_request: PlacedModuleImport, validation: ValidationMode = "report"):
+    """
+    Import multiple placed modules at once
+
+    Modules imported into a datacenter are checked against each other and
+    its current layout. Overlapping pairs and modules outside the floor are
+    listed under `validation` per datacenter (by placed module ID); with
+    `validation=strict` the import is rejected with 422 instead.
+    """
     try:
         if not import_request.placed_modules:
             raise HTTPException(status_code=400, detail="No placed modules to import")
@@ -153,13 +239,29 @@ async def import_placed_modules(import_request: PlacedModuleImport):
         # Convert each placed module to a dictionary
         placed_modules_to_insert = [pm.dict() for pm in import_request.placed_modules]
 
+        by_datacenter = {}
+        for pm in placed_modules_to_insert:
+            if pm.get("datacenter_id"):
+                by_datacenter.setdefault(pm["datacenter_id"], []).append(pm)
+        reports = await asyncio.gather(*(_validate_import(dc_id, pms) for dc_id, pms in by_datacenter.items()))
+        reports = {dc_id: report for dc_id, report in zip(by_datacenter, reports) if report is not None}
+
+        invalid = {dc_id: report.to_dict() for dc_id, report in reports.items() if not report.valid}
+        if validation == "strict" and invalid:
+            raise HTTPException(status_code=422, detail={
+                "message": "; ".join(f"{dc_id}: {reports[dc_id].describe()}" for dc_id in invalid),
+                "validation": invalid
+            })
+
         # Insert all placed modules
-        result = placed_module_repo.bulk_create(placed_modules_to_insert)
+        result = await placed_module_repo.bulk_create(placed_modules_to_insert)
+        await _touch_layouts(*(pm.get("datacenter_id") for pm in placed_modules_to_insert))
 
         return {
             "message": f"Successfully imported {len(result)} placed modules",
             "imported_count": len(result),
-            "ids": result
+            "ids": result,
+            "validation": {dc_id: report.to_dict() for dc_id, report in reports.items()}
         }
     except HTTPException:
         raise
@@ -176,7 +278,8 @@ async def delete_placed_modules_by_datacenter(datacenter_id: str, confirm: bool
                 detail="Confirmation required. Add '?confirm=true' to confirm deletion."
             )
 
-        deleted_count = placed_module_repo.delete_by_datacenter_id(datacenter_id)
+        deleted_count = await placed_module_repo.delete_by_datacenter_id(datacenter_id)
+        await _touch_layouts(datacenter_id)
 
         return {
             "message": f"Successfully deleted {deleted_count} placed modules from datacenter {datacenter_id}",
@@ -1,8 +1,9 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request
 from typing import List, Optional
 from bson import ObjectId
 from app.models.schemas import Position
-from app.repositories.position_repository import PositionRepository
+from app.repositories.position_repository import AsyncPositionRepository
+from app.core.responses import wants_ndjson, ndjson_response
 from DB.esquemas.esquema_positions import position_esquema, positions_esquema
 from pydantic import BaseModel
 
@@ -12,7 +13,7 @@ router = APIRouter(
     responses={404: {"description": "Not found"}}
 )
 
-position_repo = PositionRepository()
+position_repo = AsyncPositionRepository()
 
 # Extended position model with additional fields
 class PositionCreate(BaseModel):
@@ -35,10 +36,17 @@ class AreaQuery(BaseModel):
     datacenter_id: Optional[str] = None
 
 @router.get("/", response_description="Get all positions")
-async def get_all_positions():
-    """Get all positions"""
+async def get_all_positions(request: Request, stream: bool = False):
+    """
+    Get all positions
+
+    - **stream**: Stream the positions as NDJSON (also selected by `Accept: application/x-ndjson`)
+    """
     try:
-        positions = position_repo.get_all()
+        if wants_ndjson(request, stream):
+            return ndjson_response(position_repo.iter_all(), positions_esquema)
+
+        positions = await position_repo.get_all()
         return positions_esquema(positions)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving positions: {str(e)}")
@@ -47,7 +55,7 @@ async def get_all_positions():
 async def get_positions_by_datacenter(datacenter_id: str):
     """Get all positions in a specific datacenter"""
     try:
-        positions = position_repo.get_by_datacenter_id(datacenter_id)
+        positions = await position_repo.get_by_datacenter_id(datacenter_id)
         return positions_esquema(positions)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving positions: {str(e)}")
@@ -56,7 +64,7 @@ async def get_positions_by_datacenter(datacenter_id: str):
 async def get_position_by_module(module_id: str):
     """Get the position for a specific module"""
     try:
-        position = position_repo.get_by_module_id(module_id)
+        position = await position_repo.get_by_module_id(module_id)
         if not position:
             raise HTTPException(status_code=404, detail=f"No position found for module ID {module_id}")
 
@@ -70,7 +78,7 @@ async def get_position_by_module(module_id: str):
 async def find_positions_in_area(query: AreaQuery):
     """Find all positions within a rectangular area"""
     try:
-        positions = position_repo.find_positions_in_area(
+        positions = await position_repo.find_positions_in_area(
             query.x1, query.y1, query.x2, query.y2, query.datacenter_id
         )
         return positions_esquema(positions)
@@ -81,7 +89,7 @@ async def find_positions_in_area(query: AreaQuery):
 async def get_position(id: str):
     """Get a specific position by ID"""
     try:
-        position = position_repo.get_by_id(id)
+        position = await position_repo.get_by_id(id)
         if not position:
             raise HTTPException(status_code=404, detail=f"Position with ID {id} not found")
 
@@ -99,8 +107,8 @@ async def create_position(position: PositionCreate):
         position_dict = position.dict()
 
         # Create the position
-        id = position_repo.create(position_dict)
-        new_position = position_repo.get_by_id(id)
+        id = await position_repo.create(position_dict)
+        new_position = await position_repo.get_by_id(id)
 
         return position_esquema(new_position)
     except Exception as e:
@@ -111,7 +119,7 @@ async def update_position(id: str, position: PositionCreate):
     """Update an existing position"""
     try:
         # Check if the position exists
-        existing = position_repo.get_by_id(id)
+        existing = await position_repo.get_by_id(id)
         if not existing:
             raise HTTPException(status_code=404, detail=f"Position with ID {id} not found")
 
@@ -119,10 +127,10 @@ async def update_position(id: str, position: PositionCreate):
         position_dict = position.dict()
 
         # Update the position
-        result = position_repo.update(id, position_dict)
+        result = await position_repo.update(id, position_dict)
 
         # Fetch and return the updated position
-        updated = position_repo.get_by_id(id)
+        updated = await position_repo.get_by_id(id)
         return position_esquema(updated)
     except HTTPException:
         raise
@@ -134,12 +142,12 @@ async def delete_position(id: str):
     """Delete a position"""
     try:
         # Check if the position exists
-        existing = position_repo.get_by_id(id)
+        existing = await position_repo.get_by_id(id)
         if not existing:
             raise HTTPException(status_code=404, detail=f"Position with ID {id} not found")
 
         # Delete the position
-        result = position_repo.delete(id)
+        result = await position_repo.delete(id)
 
         return {"message": f"Position {id} deleted successfully"}
     except HTTPException:
@@ -158,7 +166,7 @@ async def import_positions(import_request: PositionsImport):
         positions_to_insert = [pos.dict() for pos in import_request.positions]
 
         # Insert all positions
-        result = position_repo.bulk_create(positions_to_insert)
+        result = await position_repo.bulk_create(positions_to_insert)
 
         return {
             "message": f"Successfully imported {len(result)} positions",
@@ -0,0 +1,274 @@
+"""
+Parallel design-space exploration: Pareto-optimal module mixes for a style.
+
+Every catalog module is a count variable (legacy unit rows grouped as in the
+module-mix solver) and a mix is feasible when its totals meet the style's
+constraints (see STYLE_CONSTRAINTS: connections, price and floor area as
+caps, processing and data storage as targets) and power, water and network
+supply cover demand. Mixes are compared on OBJECTIVES; the result is the set
+no other evaluated mix beats on every one of them.
+
+Small spaces are enumerated exhaustively, larger ones sampled and repaired
+(see exploration_worker). Mixes are evaluated in chunks across a
+ProcessPoolExecutor. The catalog arrays of an exploration are written once
+to a shared memory block that workers attach to by name, so a task carries
+only its chunk bounds. The search stops when the space (or `max_mixes`) is
+exhausted, at the time budget, or after `patience` chunks in a row left the
+front unchanged.
+
+Workers are started by the first exploration (whose time budget only starts
+once they are up) and reused; EXPLORATION_WORKERS sets how many (default:
+one per CPU), and a request may use fewer.
+"""
+import concurrent.futures
+import math
+import multiprocessing
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+import anyio.to_thread
+import numpy as np
+from app.services.exploration_worker import SharedArrays, evaluate_chunk, pareto_front, ready
+from app.services.metrics import ATTRIBUTES, ATTRIBUTE_INDEX, RESOURCES, STYLE_CONSTRAINTS, catalog_variables, style_limits
+from app.services.module_catalog import module_catalog
+from app.services.placement import floor_dim
+
+# (attribute, sense) the front is built on
+OBJECTIVES = (("price", "min"), ("processing", "max"), ("data_storage", "max"), ("area", "min"))
+
+WORKERS = int(os.getenv("EXPLORATION_WORKERS", "0")) or os.cpu_count() or 1
+TIME_BUDGET = 2.0  # seconds
+MAX_TIME_BUDGET = 30.0
+MAX_COUNT = 20  # default count bound per module
+
+# Spaces up to this many mixes are enumerated instead of sampled
+EXHAUSTIVE_LIMIT = 10_000_000
+CHUNK_SIZE = 32768  # mixes per task
+
+def _number(value: float):
+    value = float(value)
+    return int(value) if value.is_integer() else round(value, 6)
+
+class ExplorationProblem:
+    """Count variables, bounds and constraint rows of one exploration"""
+
+    def __init__(self, modules: List[dict], style: dict, max_count: int = MAX_COUNT):
+        width, height = floor_dim(style)
+        limits = style_limits(style)
+        variables = catalog_variables(modules)
+
+        # Flows keep their sign, every other attribute is a magnitude, as in the solver
+        signs = np.array([attribute in RESOURCES for attribute in ATTRIBUTES])
+        matrix = np.array([[attributes.get(attribute, 0.0) for attribute in ATTRIBUTES] for _, _, attributes, _ in variables],
+                          dtype=np.float64).reshape(len(variables), len(ATTRIBUTES))
+        matrix = np.where(signs, matrix, np.abs(matrix))
+
+        # Constraint rows over the attribute totals: rows @ totals <= bounds
+        rows, bounds = [], []
+        for name, attribute, kind in STYLE_CONSTRAINTS:
+            limit = limits[name]
+            if isinstance(limit, (int, float)) and limit >= 0:
+                row = np.zeros(len(ATTRIBUTES))
+                row[ATTRIBUTE_INDEX[attribute]] = 1.0 if kind == "max" else -1.0
+                rows.append(row)
+                bounds.append(float(limit) if kind == "max" else -float(limit))
+        for resource in RESOURCES:
+            if (matrix[:, ATTRIBUTE_INDEX[resource]] < 0).any():
+                row = np.zeros(len(ATTRIBUTES))
+                row[ATTRIBUTE_INDEX[resource]] = -1.0
+                rows.append(row)
+                bounds.append(0.0)
+        rows = np.array(rows, dtype=np.float64).reshape(len(rows), len(ATTRIBUTES))
+        bounds = np.array(bounds, dtype=np.float64)
+
+        upper = np.full(len(variables), max_count, dtype=np.int64)
+        for index, (_, _, _, dim) in enumerate(variables):
+            if dim and not ((dim[0] <= width and dim[1] <= height) or (dim[1] <= width and dim[0] <= height)):
+                upper[index] = 0
+        upper[~matrix.any(axis=1)] = 0
+        # Caps on attributes every module has a non-negative amount of bound each count
+        for row, bound in zip(rows, bounds):
+            coefficients = matrix @ row
+            if bound >= 0 and (coefficients >= 0).all():
+                capped = coefficients > 0
+                upper[capped] = np.minimum(upper[capped], np.floor(bound / coefficients[capped] + 1e-9).astype(np.int64))
+
+        keep = np.flatnonzero(upper > 0)
+        self.module_ids = [variables[index][0] for index in keep]
+        self.names = [variables[index][1] for index in keep]
+        self.matrix = matrix[keep]
+        self.upper = upper[keep]
+        self.rows = rows
+        self.bounds = bounds
+        # "At least" rows (targets and flow balances) are what sampled mixes are repaired against
+        at_least = [(int(np.flatnonzero(row)[0]), -bound) for row, bound in zip(rows, bounds) if row.min() < 0]
+        self.target_columns = np.array([column for column, _ in at_least], dtype=np.int64)
+        self.targets = np.array([target for _, target in at_least], dtype=np.float64)
+        objective_columns = [ATTRIBUTE_INDEX[attribute] for attribute, _ in OBJECTIVES]
+        # Objectives as minimization: maximized ones are negated
+        self.objectives = np.zeros((len(ATTRIBUTES), len(OBJECTIVES)))
+        self.objectives[objective_columns, np.arange(len(OBJECTIVES))] = [1.0 if sense == "min" else -1.0 for _, sense in OBJECTIVES]
+
+    @property
+    def space(self) -> int:
+        """Number of mixes within the count bounds"""
+        return math.prod(int(bound) + 1 for bound in self.upper.tolist())
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            "matrix": self.matrix, "upper": self.upper, "rows": self.rows, "bounds": self.bounds,
+            "objectives": self.objectives, "target_columns": self.target_columns, "targets": self.targets
+        }
+
+def multiprocessing_context():
+    # Workers must not inherit the event loop, driver threads or sockets of a forked server
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+class DesignExplorer:
+    """Runs explorations on a reusable process pool"""
+
+    def __init__(self, catalog, workers: int = WORKERS):
+        self._catalog = catalog
+        self.workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def executor(self) -> concurrent.futures.ProcessPoolExecutor:
+        """The worker pool, with every worker started"""
+        with self._lock:
+            if self._executor is None:
+                executor = concurrent.futures.ProcessPoolExecutor(self.workers, mp_context=multiprocessing_context())
+                # Workers start as tasks arrive; bring them all up before any time budget runs
+                concurrent.futures.wait([executor.submit(ready) for _ in range(self.workers)])
+                self._executor = executor
+            return self._executor
+
+    def shutdown(self):
+        """Stop the worker processes; the next exploration starts them again"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+
+    async def explore(self, style: dict, max_count: int = MAX_COUNT, **options) -> dict:
+        """Pareto front of a style's module mixes; the other options are those of run()"""
+        modules = await self._catalog.all()
+        # Evaluation blocks on the pool; keep it off the event loop
+        return await anyio.to_thread.run_sync(lambda: self.run(ExplorationProblem(modules, style, max_count), **options))
+
+    def run(self, problem: ExplorationProblem, workers: Optional[int] = None, time_budget: float = TIME_BUDGET,
+            max_mixes: Optional[int] = None, patience: Optional[int] = None, seed: int = 0, limit: Optional[int] = None) -> dict:
+        """
+        Explore a problem with up to `workers` chunks in flight
+
+        `max_mixes` caps the mixes evaluated (and makes spaces up to that
+        size exhaustive); `patience` stops after that many chunks in a row
+        that did not change the front; `limit` caps the front returned.
+        """
+        started = time.perf_counter()
+        workers = max(1, min(workers or self.workers, self.workers))
+        space = problem.space
+        exhaustive = space <= (max_mixes or EXHAUSTIVE_LIMIT)
+        total = space if exhaustive else max_mixes
+        executor = self.executor()
+        deadline = time.time() + time_budget
+
+        front_counts = np.zeros((0, len(problem.matrix)), dtype=np.int64)
+        front_values = np.zeros((0, len(OBJECTIVES)))
+        evaluated = feasible = unchanged = 0
+        next_start = task = 0
+        stopped = "exhausted"
+
+        shared = SharedArrays(problem.arrays())
+        pending = set()
+        try:
+            def submit():
+                nonlocal next_start, task
+                size = CHUNK_SIZE if total is None else min(CHUNK_SIZE, total - next_start)
+                pending.add(executor.submit(evaluate_chunk, shared.spec, task, next_start, size, exhaustive, seed, deadline))
+                next_start += size
+                task += 1
+
+            def merge(future):
+                nonlocal front_counts, front_values, evaluated, feasible, unchanged
+                counts, values, chunk_evaluated, chunk_feasible = future.result()
+                evaluated += chunk_evaluated
+                feasible += chunk_feasible
+                known = len(front_counts)
+                front_counts = np.concatenate((front_counts, counts))
+                front_values = np.concatenate((front_values, values))
+                keep = pareto_front(front_values)
+                front_counts, front_values = front_counts[keep], front_values[keep]
+                # The chunk helped if any of its mixes made it into the front
+                unchanged = 0 if (keep >= known).any() else unchanged + 1
+
+            while (total is None or next_start < total) and len(pending) < workers:
+                submit()
+            while pending:
+                done, _ = concurrent.futures.wait(pending, timeout=max(deadline - time.time(), 0),
+                                                  return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    pending.discard(future)
+                    merge(future)
+                if time.time() >= deadline:
+                    stopped = "time_budget"
+                    break
+                if patience and unchanged >= patience:
+                    stopped = "patience"
+                    break
+                while (total is None or next_start < total) and len(pending) < workers:
+                    submit()
+            else:
+                if not exhaustive:
+                    stopped = "max_mixes"
+
+            # Chunks still running stop at the deadline or finish soon; keep what they found
+            for future in pending:
+                future.cancel()
+            for future in concurrent.futures.as_completed(pending):
+                if not future.cancelled():
+                    merge(future)
+        finally:
+            for future in pending:
+                future.cancel()
+            concurrent.futures.wait(pending)
+            shared.close()
+
+        return self.describe(problem, front_counts, {
+            "evaluated": evaluated,
+            "feasible": feasible,
+            "space": float(space),
+            "exhaustive": exhaustive,
+            "complete": total is not None and evaluated >= total,
+            "stopped": stopped,
+            "workers": workers,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 3)
+        }, limit)
+
+    @staticmethod
+    def describe(problem: ExplorationProblem, front_counts: np.ndarray, stats: dict, limit: Optional[int]) -> dict:
+        totals = front_counts @ problem.matrix
+        # Cheapest first, then by processing
+        order = np.lexsort((-totals[:, ATTRIBUTE_INDEX["processing"]], totals[:, ATTRIBUTE_INDEX["price"]]))
+        shown = order if limit is None else order[:limit]
+
+        front = []
+        for index in shown.tolist():
+            front.append({
+                "modules": [
+                    {"id": module_id, "name": name, "count": count}
+                    for module_id, name, count in zip(problem.module_ids, problem.names, front_counts[index].tolist()) if count
+                ],
+                "metrics": {attribute: _number(value) for attribute, value in zip(ATTRIBUTES, totals[index].tolist())}
+            })
+        return {
+            "objectives": [{"field": field, "sense": sense} for field, sense in OBJECTIVES],
+            "front": front,
+            "front_size": len(front_counts),
+            "truncated": len(shown) < len(front_counts),
+            **stats
+        }
+
+design_explorer = DesignExplorer(module_catalog)
@@ -0,0 +1,148 @@
+"""
+Code run in the design-space exploration worker processes.
+
+It imports nothing but NumPy so workers start quickly. Arrays arrive in a
+shared memory block (SharedArrays) that each worker maps once per
+exploration; a task only names its chunk.
+
+Sampled mixes draw a per-mix density and mean count, include every module
+with that probability and give it a geometrically distributed count, so
+sparse and dense, small and large mixes are all covered. Random mixes rarely
+meet the targets and balance every flow, so each is then repaired: for every
+"at least" row (processing and storage targets, flow balances) that falls
+short, enough of one supplier of that attribute is added, picked at random
+in proportion to how much it supplies. A few passes settle the flows that
+the added suppliers consume in turn.
+"""
+import time
+from multiprocessing import shared_memory
+from typing import Dict
+import numpy as np
+
+BLOCK_SIZE = 4096  # mixes evaluated between deadline checks
+MEAN_COUNT = 6  # largest mean count a sampled mix draws
+REPAIR_PASSES = 3
+
+class SharedArrays:
+    """
+    Read-only arrays packed into one shared memory block
+
+    `spec` (the block name plus each array's dtype, shape and offset) is all
+    a worker needs to map the same arrays without copying them.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        layout, offset = [], 0
+        for key, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            layout.append((key, array.dtype.str, array.shape, offset))
+            offset += -(-array.nbytes // 8) * 8
+        self.shm = shared_memory.SharedMemory(create=True, size=max(offset, 8))
+        for (key, dtype, shape, start), array in zip(layout, arrays.values()):
+            np.ndarray(shape, dtype, self.shm.buf, start)[...] = array
+        self.spec = (self.shm.name, tuple(layout))
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+# Blocks attached by this worker process: name -> (SharedMemory, arrays)
+_attached = {}
+
+def attached_arrays(spec) -> Dict[str, np.ndarray]:
+    """Arrays of a SharedArrays spec, attaching to its block once per worker"""
+    name, layout = spec
+    if name not in _attached:
+        # Explorations run one after another; earlier blocks are no longer needed
+        for shm, _ in _attached.values():
+            shm.close()
+        _attached.clear()
+        shm = shared_memory.SharedMemory(name=name)
+        _attached[name] = (shm, {key: np.ndarray(shape, dtype, shm.buf, offset) for key, dtype, shape, offset in layout})
+    return _attached[name][1]
+
+def pareto_front(values: np.ndarray) -> np.ndarray:
+    """Indexes of the rows no other row is at least as good as on every column (minimized); duplicates keep one"""
+    order = np.argsort(values.sum(axis=1), kind="stable")
+    candidates, remaining = order, values[order]
+    next_index = 0
+    while next_index < len(remaining):
+        # Drop every row the current one is at least as good as everywhere, keeping itself
+        better = np.any(remaining < remaining[next_index], axis=1)
+        better[next_index] = True
+        candidates, remaining = candidates[better], remaining[better]
+        next_index = int(better[:next_index].sum()) + 1
+    return candidates
+
+def mixes(arrays: Dict[str, np.ndarray], task: int, start: int, size: int, exhaustive: bool, seed: int):
+    """Yield blocks of count vectors (as floats, ready for the matrix products) for one chunk"""
+    upper = arrays["upper"]
+    if exhaustive:
+        radix = upper + 1
+        strides = np.cumprod(radix) // radix
+        for offset in range(start, start + size, BLOCK_SIZE):
+            indexes = np.arange(offset, min(offset + BLOCK_SIZE, start + size), dtype=np.int64)
+            yield ((indexes[:, None] // strides) % radix).astype(np.float64)
+        return
+
+    rng = np.random.default_rng([seed, task])
+    for offset in range(0, size, BLOCK_SIZE):
+        count = min(BLOCK_SIZE, size - offset)
+        shape = (count, len(upper))
+        included = rng.random(shape, dtype=np.float32) < rng.random((count, 1), dtype=np.float32)
+        means = 1 + rng.random((count, 1)) * MEAN_COUNT
+        # The floor of an exponential variate is geometrically distributed
+        counts = np.minimum(np.floor(rng.standard_exponential(shape) * means), upper) * included
+        yield repair(counts, arrays, rng)
+
+def repair(counts: np.ndarray, arrays: Dict[str, np.ndarray], rng: np.random.Generator) -> np.ndarray:
+    """Add suppliers to mixes that fall short of an "at least" row"""
+    matrix = arrays["matrix"]
+    mix_indexes = np.arange(len(counts))
+    for _ in range(REPAIR_PASSES):
+        for column, target in zip(arrays["target_columns"].tolist(), arrays["targets"].tolist()):
+            supply = matrix[:, column]
+            suppliers = np.flatnonzero(supply > 0)
+            if not len(suppliers):
+                continue
+            deficit = target - counts @ supply
+            short = deficit > 1e-9
+            if not short.any():
+                continue
+            picked = rng.choice(suppliers, int(short.sum()), p=supply[suppliers] / supply[suppliers].sum())
+            counts[mix_indexes[short], picked] += np.ceil(deficit[short] / supply[picked])
+    return counts
+
+def evaluate_chunk(spec, task: int, start: int, size: int, exhaustive: bool, seed: int, deadline: float):
+    """
+    Evaluate one chunk of mixes in a worker process
+
+    Returns the chunk's Pareto front (counts and minimized objective values)
+    and how many mixes were evaluated and found feasible; stops early at the
+    deadline (wall-clock time).
+    """
+    arrays = attached_arrays(spec)
+    matrix, rows, bounds, objectives = arrays["matrix"], arrays["rows"], arrays["bounds"], arrays["objectives"]
+    front_counts = np.zeros((0, len(matrix)))
+    front_values = np.zeros((0, objectives.shape[1]))
+    evaluated = feasible = 0
+
+    for counts in mixes(arrays, task, start, size, exhaustive, seed):
+        totals = counts @ matrix
+        # Repairs may exceed a module's count bound
+        valid = np.all(totals @ rows.T <= bounds + 1e-9, axis=1) & np.all(counts <= arrays["upper"], axis=1)
+        evaluated += len(counts)
+        feasible += int(valid.sum())
+
+        front_counts = np.concatenate((front_counts, counts[valid]))
+        front_values = np.concatenate((front_values, totals[valid] @ objectives))
+        keep = pareto_front(front_values)
+        front_counts, front_values = front_counts[keep], front_values[keep]
+        if time.time() > deadline:
+            break
+
+    return front_counts.astype(np.int64), front_values, evaluated, feasible
+
+def ready() -> bool:
+    """No-op task that makes the pool start a worker"""
+    return True
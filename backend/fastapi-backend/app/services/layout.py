@@ -0,0 +1,253 @@
+"""
+Array-backed datacenter layout shared by the geometry code.
+
+A Layout is one NumPy structured array with a record per placed module
+(footprint table index, position, rotation and rotated footprint) plus the
+catalog FootprintTable those indexes point into, so placement checks and
+metrics work on columns instead of per-module dicts.
+
+Units follow the designer: positions are grid cells of GRID_CELL_SIZE meters
+and module dimensions are meters. A module rotated by anything but a multiple
+of 180 degrees has its width and height swapped, the same rule as the front
+end's checkPlacementValidity.
+"""
+import numpy as np
+from typing import Dict, Iterable, List, Optional
+
+GRID_CELL_SIZE = 10
+
+LAYOUT_DTYPE = np.dtype([
+    ("module", "<i4"),     # index into the footprint table
+    ("x", "<i4"),          # grid cells
+    ("y", "<i4"),
+    ("rotation", "<i2"),   # degrees, 0-359
+    ("width", "<i4"),      # rotated footprint in meters
+    ("height", "<i4"),
+])
+
+def module_dim(module: dict) -> tuple:
+    """Unrotated [width, height] of a module document in meters"""
+    dim = module.get("dim")
+    if dim:
+        return int(dim[0]), int(dim[1])
+    return int(module.get("Space_X", 0) or 0), int(module.get("Space_Y", 0) or 0)
+
+def module_reference(module: dict) -> str:
+    """ID a catalog module is referenced by: its id, else its legacy ID, else its _id"""
+    if module.get("id"):
+        return module["id"]
+    if module.get("ID") is not None:
+        return str(module["ID"])
+    return str(module.get("_id", ""))
+
+class FootprintTable:
+    """
+    Unrotated footprint of every catalog module, indexed by catalog position
+
+    Built once per loaded catalog (see ModuleCatalog.footprints). Documents
+    are matched by identity, so look modules up through the same catalog
+    snapshot the table was built from.
+    """
+
+    __slots__ = ("modules", "ids", "dims", "_indexes")
+
+    def __init__(self, modules: List[dict]):
+        self.modules = modules
+        self.ids = [module_reference(module) for module in modules]
+        self.dims = np.array([module_dim(module) for module in modules], dtype=np.int32).reshape(len(modules), 2)
+        self._indexes = {id(module): index for index, module in enumerate(modules)}
+
+    def __len__(self) -> int:
+        return len(self.modules)
+
+    def index_of(self, module: Optional[dict]) -> int:
+        """Table index of a catalog document, or -1 if it is not in the table"""
+        if module is None:
+            return -1
+        return self._indexes.get(id(module), -1)
+
+    def footprint(self, index: int, rotation: int) -> tuple:
+        """Rotated (width, height) of one module in meters"""
+        width, height = self.dims[index].tolist()
+        return (height, width) if rotation % 180 else (width, height)
+
+    def rotated(self, indexes: np.ndarray, rotations: np.ndarray):
+        """Rotated (widths, heights) for arrays of table indexes and rotations in degrees"""
+        dims = self.dims[indexes]
+        swapped = (rotations % 180) != 0
+        return np.where(swapped, dims[:, 1], dims[:, 0]), np.where(swapped, dims[:, 0], dims[:, 1])
+
+class Layout:
+    """
+    Placed modules of one datacenter as columns
+
+    `placed_module_ids` keeps the stored _id of each record when the layout
+    was read from the database; `missing` lists referenced module IDs that
+    did not resolve against the catalog (their records are left out), and
+    `sources` maps each record back to its position in the input.
+    """
+
+    __slots__ = ("records", "footprints", "placed_module_ids", "missing", "sources")
+
+    def __init__(self, records: np.ndarray, footprints: FootprintTable,
+                 placed_module_ids: Optional[List[str]] = None, missing: Optional[List[str]] = None,
+                 sources: Optional[np.ndarray] = None):
+        self.records = records
+        self.footprints = footprints
+        self.placed_module_ids = placed_module_ids
+        self.missing = missing or []
+        self.sources = sources if sources is not None else np.arange(len(records))
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @classmethod
+    def from_columns(cls, modules, xs, ys, rotations, footprints: FootprintTable,
+                     placed_module_ids: Optional[List[str]] = None, missing: Optional[List[str]] = None,
+                     sources: Optional[np.ndarray] = None) -> "Layout":
+        """Build a layout from per-record table indexes, positions and rotations"""
+        records = np.empty(len(modules), dtype=LAYOUT_DTYPE)
+        records["module"] = modules
+        records["x"] = xs
+        records["y"] = ys
+        records["rotation"] = np.mod(np.asarray(rotations, dtype=np.int64), 360)
+        records["width"], records["height"] = footprints.rotated(records["module"], records["rotation"])
+        return cls(records, footprints, placed_module_ids, missing, sources)
+
+    @classmethod
+    def from_references(cls, module_ids: List[str], xs: List[int], ys: List[int], rotations: List[int],
+                        modules: Dict[str, Optional[dict]], footprints: FootprintTable,
+                        placed_module_ids: Optional[List[str]] = None) -> "Layout":
+        """
+        Build a layout from module ID references
+
+        `modules` resolves every referenced ID to a document of the catalog
+        snapshot `footprints` was built from, as ModuleCatalog.resolve_footprints
+        returns them. References that do not
+        resolve are dropped and reported in `missing`.
+        """
+        indexes = {module_id: footprints.index_of(modules.get(module_id)) for module_id in dict.fromkeys(module_ids)}
+        table_indexes = np.fromiter((indexes[module_id] for module_id in module_ids), dtype=np.int32, count=len(module_ids))
+        resolved = table_indexes >= 0
+        missing = [module_id for module_id, index in indexes.items() if index < 0 and module_id]
+
+        if placed_module_ids is not None and missing:
+            placed_module_ids = [placed_id for placed_id, keep in zip(placed_module_ids, resolved) if keep]
+
+        return cls.from_columns(
+            table_indexes[resolved],
+            np.asarray(xs, dtype=np.int32)[resolved],
+            np.asarray(ys, dtype=np.int32)[resolved],
+            np.asarray(rotations, dtype=np.int64)[resolved],
+            footprints, placed_module_ids, missing, np.flatnonzero(resolved)
+        )
+
+    @classmethod
+    def from_placed_modules(cls, placed_modules: Iterable[dict], modules: Dict[str, Optional[dict]],
+                            footprints: FootprintTable) -> "Layout":
+        """Build a layout from stored (compact) placed module documents"""
+        module_ids, xs, ys, rotations, placed_ids = [], [], [], [], []
+        for placed_module in placed_modules:
+            append_placed_module(placed_module, module_ids, xs, ys, rotations, placed_ids)
+        return cls.from_references(module_ids, xs, ys, rotations, modules, footprints, placed_ids)
+
+    @classmethod
+    async def from_cursor(cls, cursor, catalog) -> "Layout":
+        """
+        Build a layout straight from an async cursor over placed modules
+
+        Only the columns are kept while iterating; module IDs are resolved
+        once per distinct ID against the catalog afterwards.
+        """
+        module_ids, xs, ys, rotations, placed_ids = [], [], [], [], []
+        async for placed_module in cursor:
+            append_placed_module(placed_module, module_ids, xs, ys, rotations, placed_ids)
+
+        modules, footprints = await catalog.resolve_footprints(dict.fromkeys(filter(None, module_ids)))
+        return cls.from_references(module_ids, xs, ys, rotations, modules, footprints, placed_ids)
+
+    @classmethod
+    async def from_simple(cls, module_positions, catalog) -> "Layout":
+        """Build a layout from the `modules` of a DatacenterCreateSimple payload"""
+        module_ids = [module_pos.id for module_pos in module_positions]
+        modules, footprints = await catalog.resolve_footprints(dict.fromkeys(module_ids))
+        return cls.from_references(
+            module_ids,
+            [module_pos.position.x for module_pos in module_positions],
+            [module_pos.position.y for module_pos in module_positions],
+            [module_pos.rotation for module_pos in module_positions],
+            modules, footprints
+        )
+
+    @property
+    def module_index(self) -> np.ndarray:
+        return self.records["module"]
+
+    @property
+    def x(self) -> np.ndarray:
+        return self.records["x"]
+
+    @property
+    def y(self) -> np.ndarray:
+        return self.records["y"]
+
+    @property
+    def rotation(self) -> np.ndarray:
+        return self.records["rotation"]
+
+    @property
+    def width(self) -> np.ndarray:
+        return self.records["width"]
+
+    @property
+    def height(self) -> np.ndarray:
+        return self.records["height"]
+
+    @property
+    def left(self) -> np.ndarray:
+        """Left edges in meters"""
+        return self.records["x"].astype(np.int64) * GRID_CELL_SIZE
+
+    @property
+    def top(self) -> np.ndarray:
+        """Top edges in meters"""
+        return self.records["y"].astype(np.int64) * GRID_CELL_SIZE
+
+    @property
+    def right(self) -> np.ndarray:
+        """Right edges in meters (exclusive)"""
+        return self.left + self.records["width"]
+
+    @property
+    def bottom(self) -> np.ndarray:
+        """Bottom edges in meters (exclusive)"""
+        return self.top + self.records["height"]
+
+    def module_ids(self) -> List[str]:
+        """Catalog module ID of every record"""
+        ids = self.footprints.ids
+        return [ids[index] for index in self.records["module"].tolist()]
+
+    def to_module_positions(self) -> List[dict]:
+        """Records in the DatacenterCreateSimple `modules` shape"""
+        return [
+            {"id": module_id, "position": {"x": x, "y": y}, "rotation": rotation}
+            for module_id, x, y, rotation in zip(
+                self.module_ids(), self.records["x"].tolist(), self.records["y"].tolist(), self.records["rotation"].tolist()
+            )
+        ]
+
+def referenced_module_id(placed_module: dict) -> Optional[str]:
+    """Catalog module ID a stored or hydrated placed module refers to"""
+    return placed_module.get("module_id") or (placed_module.get("module") or {}).get("id")
+
+def append_placed_module(placed_module: dict, module_ids: list, xs: list, ys: list, rotations: list, placed_ids: list):
+    """Append one stored placed module to layout columns"""
+    module_id = referenced_module_id(placed_module)
+    position = placed_module.get("position") or {}
+
+    module_ids.append(module_id)
+    xs.append(int(position.get("x", 0)))
+    ys.append(int(position.get("y", 0)))
+    rotations.append(int(placed_module.get("rotation", 0) or 0))
+    placed_ids.append(str(placed_module["_id"]) if "_id" in placed_module else placed_module.get("id"))
@@ -0,0 +1,159 @@
+"""
+Columnar binary encoding of a datacenter layout for the 3D designer.
+
+All integers are little-endian. The body is a fixed header followed by the
+module-ID dictionary and one packed column per attribute, each section padded
+to a 4-byte boundary so clients can view the columns as typed arrays
+(Uint16Array, Int32Array, Uint8Array) directly over the response buffer:
+
+    magic           4 bytes   b"DCLY"
+    format version  uint16    FORMAT_VERSION
+    dictionary size uint16    number of distinct module IDs (D)
+    module count    uint32    number of placed modules (N)
+    layout version  uint32    the datacenter's layout_version
+    dictionary len  uint32    byte length of the dictionary (L)
+    dictionary      L bytes   per module ID: uint16 byte length, then its UTF-8 bytes
+    module index    N uint16  index into the dictionary
+    x               N int32
+    y               N int32
+    rotation        N uint8   rotation code: degrees / 90 (0-3)
+"""
+import struct
+from typing import Iterable, List
+import numpy as np
+
+LAYOUT_MEDIA_TYPE = "application/x-datacenter-layout"
+
+MAGIC = b"DCLY"
+FORMAT_VERSION = 2
+HEADER = struct.Struct("<4sHHIII")
+
+# The dictionary size header field and each entry's length prefix are uint16s
+MAX_DICTIONARY_SIZE = np.iinfo(np.uint16).max
+MAX_ID_LENGTH = np.iinfo(np.uint16).max
+ENTRY_LENGTH = struct.Struct("<H")
+POSITION_RANGE = np.iinfo(np.int32)
+
+def _pad(length: int) -> int:
+    return -length % 4
+
+def rotation_code(rotation) -> int:
+    """Rotation code for a rotation in degrees; only quarter turns are encodable"""
+    rotation = int(rotation or 0)
+    if rotation % 90:
+        raise ValueError(f"Rotation {rotation} is not a multiple of 90 degrees")
+    return rotation % 360 // 90
+
+def encode_layout(placed_modules: Iterable[dict], layout_version: int = 0) -> bytes:
+    """
+    Encode placed modules (stored or simple-view form) as a binary layout
+
+    Placed modules without a module reference are skipped, like the simple
+    view does.
+    """
+    dictionary = {}
+    indexes: List[int] = []
+    xs: List[int] = []
+    ys: List[int] = []
+    rotations: List[int] = []
+
+    for placed_module in placed_modules:
+        module_id = placed_module.get("module_id") or (placed_module.get("module") or {}).get("id")
+        if not module_id:
+            continue
+
+        index = dictionary.get(module_id)
+        if index is None:
+            index = dictionary[module_id] = len(dictionary)
+        position = placed_module.get("position") or {}
+
+        indexes.append(index)
+        xs.append(position.get("x", 0))
+        ys.append(position.get("y", 0))
+        rotations.append(rotation_code(placed_module.get("rotation", 0)))
+
+    if len(dictionary) > MAX_DICTIONARY_SIZE:
+        raise ValueError(f"Layout references {len(dictionary)} distinct modules; at most {MAX_DICTIONARY_SIZE} are encodable")
+
+    for axis, column in (("x", xs), ("y", ys)):
+        if column and (min(column) < POSITION_RANGE.min or max(column) > POSITION_RANGE.max):
+            raise ValueError(f"A module {axis} position is outside the int32 range")
+
+    # IDs are arbitrary strings, so entries are length-prefixed rather than separated
+    entries = []
+    for module_id in dictionary:
+        encoded = module_id.encode()
+        if len(encoded) > MAX_ID_LENGTH:
+            raise ValueError(f"Module ID of {len(encoded)} bytes is too long; at most {MAX_ID_LENGTH} are encodable")
+        entries.append(ENTRY_LENGTH.pack(len(encoded)))
+        entries.append(encoded)
+    encoded_dictionary = b"".join(entries)
+    count = len(indexes)
+
+    sections = [
+        HEADER.pack(MAGIC, FORMAT_VERSION, len(dictionary), count, layout_version, len(encoded_dictionary)),
+        encoded_dictionary,
+        b"\0" * _pad(len(encoded_dictionary)),
+        np.asarray(indexes, dtype="<u2").tobytes(),
+        b"\0" * _pad(count * 2),
+        np.asarray(xs, dtype="<i4").tobytes(),
+        np.asarray(ys, dtype="<i4").tobytes(),
+        np.asarray(rotations, dtype="u1").tobytes(),
+    ]
+    return b"".join(sections)
+
+def decode_layout(data: bytes) -> dict:
+    """
+    Decode a binary layout into its dictionary and columns
+
+    Returns {"layout_version", "dictionary", "module_index", "x", "y",
+    "rotation"} with the columns as NumPy arrays and rotation in degrees.
+    """
+    magic, version, dictionary_size, count, layout_version, dictionary_length = HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError("Not a binary datacenter layout")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported layout format version {version}")
+
+    offset = HEADER.size
+    end = offset + dictionary_length
+    dictionary = []
+    while offset < end:
+        if offset + ENTRY_LENGTH.size > end:
+            raise ValueError("Corrupt layout dictionary")
+        (length,) = ENTRY_LENGTH.unpack_from(data, offset)
+        offset += ENTRY_LENGTH.size
+        if offset + length > end:
+            raise ValueError("Corrupt layout dictionary")
+        dictionary.append(data[offset:offset + length].decode())
+        offset += length
+    offset = end + _pad(dictionary_length)
+
+    if len(dictionary) != dictionary_size:
+        raise ValueError("Corrupt layout dictionary")
+
+    module_index = np.frombuffer(data, dtype="<u2", count=count, offset=offset)
+    offset += count * 2 + _pad(count * 2)
+    x = np.frombuffer(data, dtype="<i4", count=count, offset=offset)
+    offset += count * 4
+    y = np.frombuffer(data, dtype="<i4", count=count, offset=offset)
+    offset += count * 4
+    rotation = np.frombuffer(data, dtype="u1", count=count, offset=offset)
+
+    return {
+        "layout_version": layout_version,
+        "dictionary": dictionary,
+        "module_index": module_index,
+        "x": x,
+        "y": y,
+        "rotation": rotation.astype(np.int32) * 90,
+    }
+
+def decode_layout_modules(data: bytes) -> List[dict]:
+    """Decode a binary layout back into simple-view module rows"""
+    layout = decode_layout(data)
+    dictionary = layout["dictionary"]
+    return [
+        {"id": dictionary[index], "position": {"x": int(x), "y": int(y)}, "rotation": int(rotation)}
+        for index, x, y, rotation in zip(layout["module_index"], layout["x"], layout["y"], layout["rotation"])
+    ]
@@ -0,0 +1,155 @@
+"""
+Bulk collision and bounds validation for whole layouts.
+
+validate_layout runs a sweep-and-prune over the rotated footprints of a
+Layout instead of testing every pair. Footprints are binned into horizontal
+strips about twice the typical module height (a footprint crossing a strip
+boundary is entered in each strip it touches) and sorted by strip, then x.
+The candidates of each entry are the entries of its strip that start before
+it ends on x, found with one searchsorted for the whole layout, and a pair
+is kept if the footprints also overlap on y. A pair sharing several strips
+is only reported from the strip its overlap starts in. Candidates are
+expanded in bounded chunks so densely stacked layouts do not blow up memory.
+
+Overlap is strict, as in the placement checks and the designer: modules
+that only share an edge do not collide.
+"""
+from typing import List, Literal, Optional, Tuple
+import numpy as np
+from app.services.layout import Layout, append_placed_module
+
+ValidationMode = Literal["report", "strict"]
+
+# Candidate pairs expanded at once
+CHUNK_CANDIDATES = 1 << 22
+
+# Issues listed in a report; the counts always cover all of them
+MAX_REPORTED = 1000
+
+class LayoutReport:
+    """
+    Every overlapping pair and out-of-bounds record of a layout
+
+    `overlaps` is an (n, 2) array of record index pairs (lower index first)
+    and `out_of_bounds` an array of record indexes, both sorted. `labels`
+    names each record in to_dict; it defaults to the record's position in
+    the input the layout was built from.
+    """
+
+    __slots__ = ("overlaps", "out_of_bounds", "labels")
+
+    def __init__(self, overlaps: np.ndarray, out_of_bounds: np.ndarray, labels: Optional[list] = None):
+        self.overlaps = overlaps
+        self.out_of_bounds = out_of_bounds
+        self.labels = labels
+
+    @property
+    def valid(self) -> bool:
+        return not len(self.overlaps) and not len(self.out_of_bounds)
+
+    def describe(self) -> str:
+        return f"Layout has {len(self.overlaps)} overlapping module pairs and {len(self.out_of_bounds)} modules outside the datacenter floor"
+
+    def to_dict(self, limit: int = MAX_REPORTED) -> dict:
+        overlaps = self.overlaps[:limit].tolist()
+        out_of_bounds = self.out_of_bounds[:limit].tolist()
+        if self.labels is not None:
+            labels = self.labels
+            overlaps = [[labels[first], labels[second]] for first, second in overlaps]
+            out_of_bounds = [labels[index] for index in out_of_bounds]
+
+        return {
+            "valid": self.valid,
+            "overlap_count": len(self.overlaps),
+            "out_of_bounds_count": len(self.out_of_bounds),
+            "overlaps": overlaps,
+            "out_of_bounds": out_of_bounds,
+            "truncated": len(self.overlaps) > limit or len(self.out_of_bounds) > limit
+        }
+
+def _strip_height(top: np.ndarray, bottom: np.ndarray) -> int:
+    """Strip height that keeps most rectangles within one or two strips"""
+    return max(2 * int(np.median(bottom - top)), 1)
+
+def overlapping_pairs(left: np.ndarray, top: np.ndarray, right: np.ndarray, bottom: np.ndarray,
+                      chunk_candidates: int = CHUNK_CANDIDATES) -> np.ndarray:
+    """Every pair of strictly overlapping rectangles as an (n, 2) array of indexes, sorted"""
+    left, top, right, bottom = (np.asarray(edge, dtype=np.int64) for edge in (left, top, right, bottom))
+    # Empty rectangles overlap nothing
+    indexes = np.flatnonzero((right > left) & (bottom > top))
+    if len(indexes) < 2:
+        return np.empty((0, 2), dtype=np.int64)
+    left, top, right, bottom = left[indexes], top[indexes], right[indexes], bottom[indexes]
+
+    # One entry per horizontal strip a rectangle touches
+    height = _strip_height(top, bottom)
+    first_strip = (top - top.min()) // height
+    strip_counts = (bottom - 1 - top.min()) // height - first_strip + 1
+    entries = np.repeat(np.arange(len(left)), strip_counts)
+    strips = np.repeat(first_strip, strip_counts) + (
+        np.arange(len(entries)) - np.repeat(np.cumsum(strip_counts) - strip_counts, strip_counts)
+    )
+
+    # Sweep along x within each strip: a (strip, x) key keeps strips apart
+    span = int(right.max() - left.min()) + 1
+    starts = strips * span + (left[entries] - left.min())
+    order = np.argsort(starts, kind="stable")
+    entries, strips, starts = entries[order], strips[order], starts[order]
+    ends = strips * span + (right[entries] - left.min())
+    counts = np.searchsorted(starts, ends, side="left") - np.arange(1, len(entries) + 1)
+
+    totals = np.cumsum(counts)
+    pairs = []
+    begin = 0
+    while begin < len(entries):
+        # Widen the chunk until it holds chunk_candidates pairs (at least one entry)
+        base = totals[begin - 1] if begin else 0
+        end = max(int(np.searchsorted(totals, base + chunk_candidates, side="right")), begin + 1)
+        chunk_counts = counts[begin:end]
+        total = int(chunk_counts.sum())
+        if total:
+            firsts = np.repeat(np.arange(begin, end), chunk_counts)
+            seconds = firsts + 1 + np.arange(total) - np.repeat(np.cumsum(chunk_counts) - chunk_counts, chunk_counts)
+            first, second = entries[firsts], entries[seconds]
+            overlap_top = np.maximum(top[first], top[second])
+            # Candidates overlap on x; keep y overlaps, once, in the strip where the overlap starts
+            keep = (overlap_top < np.minimum(bottom[first], bottom[second])) & (
+                (overlap_top - top.min()) // height == strips[firsts]
+            )
+            pairs.append(np.stack((indexes[first[keep]], indexes[second[keep]]), axis=1))
+        begin = end
+
+    pairs = np.sort(np.concatenate(pairs), axis=1) if pairs else np.empty((0, 2), dtype=np.int64)
+    return pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+
+def validate_layout(layout: Layout, dim: Tuple[int, int], labels: Optional[list] = None) -> LayoutReport:
+    """Find every overlapping pair and every module outside a floor of `dim` meters"""
+    left, top, right, bottom = layout.left, layout.top, layout.right, layout.bottom
+    out_of_bounds = np.flatnonzero((left < 0) | (top < 0) | (right > dim[0]) | (bottom > dim[1]))
+    if labels is None:
+        labels = layout.sources.tolist()
+    return LayoutReport(overlapping_pairs(left, top, right, bottom), out_of_bounds, labels)
+
+async def validate_additions(existing_cursor, placed_modules: List[dict], dim: Tuple[int, int], catalog) -> LayoutReport:
+    """
+    Validate placed modules added to a datacenter
+
+    The additions are checked against each other and against the placed
+    modules the cursor yields; only issues involving an addition are
+    reported. Records are labeled with their placed module IDs.
+    """
+    module_ids, xs, ys, rotations, placed_ids = [], [], [], [], []
+    async for placed_module in existing_cursor:
+        append_placed_module(placed_module, module_ids, xs, ys, rotations, placed_ids)
+    existing = len(module_ids)
+    for placed_module in placed_modules:
+        append_placed_module(placed_module, module_ids, xs, ys, rotations, placed_ids)
+
+    modules, footprints = await catalog.resolve_footprints(dict.fromkeys(filter(None, module_ids)))
+    layout = Layout.from_references(module_ids, xs, ys, rotations, modules, footprints, placed_ids)
+    report = validate_layout(layout, dim, layout.placed_module_ids)
+
+    added = layout.sources >= existing
+    report.overlaps = report.overlaps[added[report.overlaps].any(axis=1)] if len(report.overlaps) else report.overlaps
+    report.out_of_bounds = report.out_of_bounds[added[report.out_of_bounds]]
+    return report
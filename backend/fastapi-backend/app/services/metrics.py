@@ -0,0 +1,294 @@
+"""
+Server-side resource totals, balances and style-constraint slack.
+
+Every catalog module becomes a row of an attribute matrix with its supply
+(positive values) and demand (magnitudes of negative values) of each
+resource side by side, and the magnitude of every other attribute, aligned
+with the catalog FootprintTable. A
+datacenter is reduced to a vector of module counts, so all of its totals
+come from one vector-matrix product, and adding or removing a module only
+adds or subtracts one matrix row.
+
+Counts and sums are cached per datacenter and keyed by layout_version, like
+the placement grids: writes that report their change through apply() update
+the cached sums in place, any other write makes the next read rebuild them
+from the placed modules.
+"""
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import numpy as np
+from DB.esquemas.esquema_datacenter_specs import unit_field_name
+from DB.esquemas.esquema_datacenter_styles import datacenter_style_esquema
+from DB.esquemas.esquema_modules import module_esquema
+from app.repositories.placed_module_repository import AsyncPlacedModuleRepository
+from app.services.layout import FootprintTable, Layout, module_reference
+from app.services.module_catalog import module_catalog
+from app.services.placement import CACHE_SIZE, LAYOUT_PROJECTION, floor_dim
+
+# Module attributes summed per datacenter; area is the footprint in m²
+ATTRIBUTES = (
+    "price", "usable_power",
+    "fresh_water", "distilled_water", "chilled_water", "supplied_water", "water_usage",
+    "processing", "data_storage", "storage_capacity",
+    "network_capacity", "internal_network", "external_network",
+    "grid_connection", "water_connection", "area"
+)
+
+# Resources modules produce (positive values) and consume (negative values)
+RESOURCES = (
+    "usable_power", "fresh_water", "distilled_water", "chilled_water",
+    "internal_network", "external_network"
+)
+
+# Style constraints: (name, attribute, kind); "max" caps the total, "min" is a target
+STYLE_CONSTRAINTS = (
+    ("grid_connection", "grid_connection", "max"),
+    ("water_connection", "water_connection", "max"),
+    ("price", "price", "max"),
+    ("processing", "processing", "min"),
+    ("data_storage", "data_storage", "min"),
+    ("area", "area", "max"),
+)
+
+ATTRIBUTE_INDEX = {attribute: index for index, attribute in enumerate(ATTRIBUTES)}
+
+# Legacy units giving a module's dimensions
+SPACE_UNITS = ("space_x", "space_y")
+
+def module_attributes(module: dict) -> Dict[str, float]:
+    """
+    Signed attribute values of one catalog module
+
+    Legacy unit rows (one Unit/Amount per document) count their Amount as
+    produced when Is_Output is set and as consumed when Is_Input is set.
+    """
+    module = module_esquema(module)
+    values = {}
+    for attribute in ATTRIBUTES:
+        value = module.get(attribute)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[attribute] = float(value)
+
+    field = unit_field_name(module.get("Unit"))
+    if field in ATTRIBUTE_INDEX and isinstance(module.get("Amount"), (int, float)):
+        values[field] = -float(module["Amount"]) if module.get("Is_Input") and not module.get("Is_Output") else float(module["Amount"])
+
+    dim = module.get("dim")
+    if dim and len(dim) == 2:
+        values["area"] = float(dim[0]) * float(dim[1])
+    return values
+
+def catalog_variables(modules: List[dict]):
+    """
+    One (id, name, attributes, dim) entry per catalog module
+
+    Legacy unit rows sharing an ID are one module; their Space_X/Space_Y rows
+    give its dimensions.
+    """
+    variables = OrderedDict()
+    for module in modules:
+        key = module_reference(module)
+        entry = variables.setdefault(key, {"name": module.get("Name") or key, "attributes": {}, "dim": [None, None]})
+        for attribute, value in module_attributes(module).items():
+            entry["attributes"][attribute] = entry["attributes"].get(attribute, 0.0) + value
+
+        dim = module.get("dim")
+        if dim and len(dim) == 2:
+            entry["dim"] = [float(dim[0]), float(dim[1])]
+        field = unit_field_name(module.get("Unit"))
+        if field in SPACE_UNITS and isinstance(module.get("Amount"), (int, float)):
+            entry["dim"][SPACE_UNITS.index(field)] = float(module["Amount"])
+
+    result = []
+    for key, entry in variables.items():
+        width, height = entry["dim"]
+        dim = (width, height) if width is not None and height is not None else None
+        if dim and "area" not in entry["attributes"]:
+            entry["attributes"]["area"] = width * height
+        result.append((key, entry["name"], entry["attributes"], dim))
+    return result
+
+def attribute_matrix(footprints: FootprintTable) -> np.ndarray:
+    """
+    (modules, 2 * attributes) matrix: supply columns, then demand columns
+
+    Every document of a legacy module carries the attributes of all its unit
+    rows, whichever row a placed module resolves to. Only RESOURCES split
+    into supply and demand by sign; every other attribute (price, area,
+    connections, targets) counts its magnitude, as in the module-mix solver.
+    """
+    attributes = {key: values for key, _, values, _ in catalog_variables(footprints.modules)}
+    signed = np.zeros((len(footprints), len(ATTRIBUTES)), dtype=np.float64)
+    for row, module in enumerate(footprints.modules):
+        for attribute, value in attributes[module_reference(module)].items():
+            signed[row, ATTRIBUTE_INDEX[attribute]] = value
+
+    flows = np.array([attribute in RESOURCES for attribute in ATTRIBUTES])
+    supply = np.where(flows, np.maximum(signed, 0), np.abs(signed))
+    demand = np.where(flows, np.maximum(-signed, 0), 0.0)
+    return np.hstack((supply, demand))
+
+def _first_set(*values):
+    return next((value for value in values if value is not None), None)
+
+def _number(value: float):
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+def style_limits(style: Optional[dict], datacenter: Optional[dict] = None) -> dict:
+    """
+    Limit of every STYLE_CONSTRAINTS entry
+
+    A datacenter's own connections and floor take precedence over its
+    style's; without a datacenter the style's floor is used.
+    """
+    style = datacenter_style_esquema(style) if style else {}
+    datacenter = datacenter if datacenter is not None else {}
+    width, height = floor_dim(datacenter if datacenter else style)
+    return {
+        "grid_connection": _first_set(datacenter.get("grid_connection"), style.get("grid_connection")),
+        "water_connection": _first_set(datacenter.get("water_connection"), style.get("water_connection")),
+        "price": style.get("price"),
+        "processing": style.get("processing"),
+        "data_storage": style.get("data_storage"),
+        "area": width * height,
+    }
+
+class DatacenterMetrics:
+    """Module counts of one datacenter and their summed supply and demand"""
+
+    __slots__ = ("layout_version", "footprints", "counts", "sums", "missing")
+
+    def __init__(self, layout_version: int, footprints: FootprintTable, counts: np.ndarray, sums: np.ndarray, missing=None):
+        self.layout_version = layout_version
+        self.footprints = footprints
+        self.counts = counts
+        self.sums = sums
+        self.missing = missing or []
+
+    @property
+    def supply(self) -> np.ndarray:
+        return self.sums[:len(ATTRIBUTES)]
+
+    @property
+    def demand(self) -> np.ndarray:
+        return self.sums[len(ATTRIBUTES):]
+
+    def constraints(self, datacenter: dict, style: Optional[dict]) -> dict:
+        """Slack of each style constraint; limits that are unset or negative are unconstrained"""
+        limits = style_limits(style, datacenter)
+        totals = self.supply - self.demand
+        constraints = {}
+        for name, attribute, kind in STYLE_CONSTRAINTS:
+            limit = limits[name]
+            value = totals[ATTRIBUTE_INDEX[attribute]]
+            if not isinstance(limit, (int, float)) or limit < 0:
+                constraints[name] = {"kind": kind, "limit": None, "value": _number(value), "slack": None, "satisfied": True}
+                continue
+            slack = limit - value if kind == "max" else value - limit
+            constraints[name] = {"kind": kind, "limit": limit, "value": _number(value), "slack": _number(slack), "satisfied": bool(slack >= 0)}
+        return constraints
+
+    def to_dict(self, datacenter: dict, style: Optional[dict]) -> dict:
+        supply, demand = self.supply.tolist(), self.demand.tolist()
+        balances = {}
+        for resource in RESOURCES:
+            index = ATTRIBUTE_INDEX[resource]
+            balances[resource] = {
+                "supply": _number(supply[index]),
+                "demand": _number(demand[index]),
+                "balance": _number(supply[index] - demand[index])
+            }
+        constraints = self.constraints(datacenter, style)
+
+        return {
+            "layout_version": self.layout_version,
+            "module_count": int(self.counts.sum()),
+            "totals": {attribute: _number(supply[index] - demand[index]) for index, attribute in enumerate(ATTRIBUTES)},
+            "balances": balances,
+            "balanced": all(balance["balance"] >= 0 for balance in balances.values()),
+            "constraints": constraints,
+            "satisfied": all(constraint["satisfied"] for constraint in constraints.values()),
+            "missing_modules": self.missing
+        }
+
+class MetricsEngine:
+    """Keeps per-datacenter module counts and resource sums up to date"""
+
+    def __init__(self, catalog, placed_module_repository, cache_size: int = CACHE_SIZE):
+        self._catalog = catalog
+        self._placed_module_repository = placed_module_repository
+        self._cache_size = cache_size
+        self._entries = OrderedDict()
+        self._matrix = (None, None)
+
+    def matrix(self, footprints: FootprintTable) -> np.ndarray:
+        """Attribute matrix of a catalog snapshot, built once per loaded catalog"""
+        if self._matrix[0] is not footprints:
+            self._matrix = (footprints, attribute_matrix(footprints))
+        return self._matrix[1]
+
+    async def get(self, datacenter_id: str, datacenter: dict) -> DatacenterMetrics:
+        """Metrics of a datacenter at its current layout version"""
+        version = datacenter.get("layout_version", 0)
+        footprints = await self._catalog.footprints()
+
+        cached = self._entries.get(datacenter_id)
+        if cached is not None and cached.layout_version == version and cached.footprints is footprints:
+            self._entries.move_to_end(datacenter_id)
+            return cached
+
+        layout = await Layout.from_cursor(
+            self._placed_module_repository.iter_by_datacenter_id(datacenter_id, LAYOUT_PROJECTION), self._catalog
+        )
+        counts = np.bincount(layout.module_index, minlength=len(layout.footprints)).astype(np.int64)
+        metrics = DatacenterMetrics(version, layout.footprints, counts, counts @ self.matrix(layout.footprints), layout.missing)
+
+        self._entries[datacenter_id] = metrics
+        self._entries.move_to_end(datacenter_id)
+        while len(self._entries) > self._cache_size:
+            self._entries.popitem(last=False)
+        return metrics
+
+    async def apply(self, datacenter_id: str, changes: Dict[str, int], expected_version: int, layout_version: Optional[int]):
+        """
+        Apply a layout write to the cached metrics
+
+        `changes` maps catalog module IDs to how many were added (or removed,
+        when negative); moves change nothing but the version. The write must
+        have taken the layout from expected_version to the next version,
+        otherwise the cached metrics are dropped.
+        """
+        cached = self._entries.get(datacenter_id)
+        if cached is None:
+            return
+        if layout_version is None or cached.layout_version != expected_version or layout_version != expected_version + 1:
+            self._entries.pop(datacenter_id, None)
+            return
+
+        modules, footprints = await self._catalog.resolve_footprints(changes)
+        # The entry may have been evicted or rebuilt while the catalog was read
+        if self._entries.get(datacenter_id) is not cached:
+            return
+        if footprints is not cached.footprints:
+            self._entries.pop(datacenter_id, None)
+            return
+
+        matrix = self.matrix(footprints)
+        for module_id, delta in changes.items():
+            index = footprints.index_of(modules.get(module_id))
+            if index < 0 or not delta:
+                continue
+            if cached.counts[index] + delta < 0:
+                # Removing more than the cache knows of; rebuild instead
+                self._entries.pop(datacenter_id, None)
+                return
+            cached.counts[index] += delta
+            cached.sums += delta * matrix[index]
+        cached.layout_version = layout_version
+
+    def forget(self, datacenter_id: str):
+        """Drop the cached metrics of a datacenter"""
+        self._entries.pop(datacenter_id, None)
+
+metrics_engine = MetricsEngine(module_catalog, AsyncPlacedModuleRepository())
@@ -0,0 +1,201 @@
+import asyncio
+import hashlib
+import logging
+import orjson
+from bson import ObjectId
+from typing import Dict, Iterable, List, Optional, Tuple
+from app.repositories.module_repository import AsyncModuleRepository, normalize_module_id
+from app.services.layout import FootprintTable
+
+logger = logging.getLogger(__name__)
+
+# Delay before reopening a failed change stream, doubled per failure up to the max
+WATCH_INITIAL_BACKOFF = 1.0  # seconds
+WATCH_MAX_BACKOFF = 60.0
+
+class ModuleCatalog:
+    """
+    In-process cache of the whole module catalog
+
+    The catalog is small and changes rarely, so it is loaded in one query and
+    indexed by every accepted ID form (exact id, case-insensitive id, _id and
+    legacy ID). Each invalidation bumps a monotonically increasing version,
+    which callers can use to key derived caches or ETags.
+    """
+
+    def __init__(self, repository: AsyncModuleRepository):
+        self._repository = repository
+        self._lock = asyncio.Lock()
+        self._version = 0
+        self._loaded_version = None
+        self._modules = []
+        self._by_id = {}
+        self._by_normalized_id = {}
+        self._by_object_id = {}
+        self._by_legacy_id = {}
+        self._fingerprint = None
+        self._fingerprint_source = None
+        self._footprints = None
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def version(self) -> int:
+        """Current catalog version; changes whenever the catalog is invalidated"""
+        return self._version
+
+    def invalidate(self):
+        """Drop the cached catalog after a write"""
+        self._version += 1
+
+    async def _ensure_loaded(self):
+        if self._loaded_version == self._version:
+            self.hits += 1
+            return
+
+        async with self._lock:
+            # Another request may have reloaded while we waited for the lock
+            if self._loaded_version == self._version:
+                self.hits += 1
+                return
+
+            self.misses += 1
+            version = self._version
+            modules = await self._repository.get_all()
+            self._index(modules)
+
+            # Only publish if no write invalidated the catalog mid-load
+            if version == self._version:
+                self._loaded_version = version
+
+    def _index(self, modules: List[dict]):
+        by_id = {}
+        by_normalized_id = {}
+        by_object_id = {}
+        by_legacy_id = {}
+
+        for module in modules:
+            by_object_id[str(module["_id"])] = module
+            if module.get("id") is not None:
+                by_id.setdefault(module["id"], module)
+                by_normalized_id.setdefault(normalize_module_id(module["id"]), module)
+            if module.get("ID") is not None:
+                by_legacy_id.setdefault(module["ID"], module)
+
+        self._modules = modules
+        self._by_id = by_id
+        self._by_normalized_id = by_normalized_id
+        self._by_object_id = by_object_id
+        self._by_legacy_id = by_legacy_id
+
+    def _resolve(self, id: str) -> Optional[dict]:
+        # Same precedence as ModuleRepository.get_by_id
+        module = self._by_id.get(id) or self._by_normalized_id.get(normalize_module_id(id))
+        if not module and ObjectId.is_valid(id):
+            module = self._by_object_id.get(str(id))
+        return module or self._by_legacy_id.get(id)
+
+    async def all(self) -> List[dict]:
+        """Get every module document (shared; do not mutate)"""
+        await self._ensure_loaded()
+        return self._modules
+
+    async def get(self, id: str, copy: bool = True) -> Optional[dict]:
+        """
+        Get a module by any accepted ID form
+
+        Returns a copy by default; pass copy=False for read-only access to the
+        cached document.
+        """
+        await self._ensure_loaded()
+        module = self._resolve(id)
+        if module is not None and copy:
+            return dict(module)
+        return module
+
+    async def get_many(self, ids: Iterable[str], copy: bool = True) -> Dict[str, Optional[dict]]:
+        """Resolve many module IDs against one catalog snapshot"""
+        await self._ensure_loaded()
+        resolved = {}
+        for id in ids:
+            module = self._resolve(id)
+            resolved[id] = dict(module) if module is not None and copy else module
+        return resolved
+
+    async def fingerprint(self) -> str:
+        """
+        Content hash of the catalog
+
+        Unlike version, this is the same in every process serving the same
+        data, so it can back ETags behind a load balancer. It is computed once
+        per loaded catalog.
+        """
+        await self._ensure_loaded()
+        if self._fingerprint_source is not self._modules:
+            encoded = orjson.dumps(self._modules, default=str, option=orjson.OPT_SORT_KEYS)
+            self._fingerprint = hashlib.sha1(encoded).hexdigest()
+            self._fingerprint_source = self._modules
+        return self._fingerprint
+
+    def _footprint_table(self) -> FootprintTable:
+        if self._footprints is None or self._footprints.modules is not self._modules:
+            self._footprints = FootprintTable(self._modules)
+        return self._footprints
+
+    async def footprints(self) -> FootprintTable:
+        """Footprint table of the loaded catalog, built once per loaded catalog"""
+        await self._ensure_loaded()
+        return self._footprint_table()
+
+    async def resolve_footprints(self, ids: Iterable[str]) -> Tuple[Dict[str, Optional[dict]], FootprintTable]:
+        """
+        Resolve module IDs together with the footprint table of the same snapshot
+
+        Footprint tables match modules by identity, so both must come from one
+        loaded catalog; the returned documents are shared (do not mutate).
+        """
+        await self._ensure_loaded()
+        return {id: self._resolve(id) for id in ids}, self._footprint_table()
+
+    def stats(self) -> dict:
+        """Cache counters for monitoring"""
+        return {
+            "version": self._version,
+            "loaded": self._loaded_version == self._version,
+            "size": len(self._modules),
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+    async def watch(self, collection, initial_backoff: float = WATCH_INITIAL_BACKOFF, max_backoff: float = WATCH_MAX_BACKOFF):
+        """
+        Invalidate on every change to the modules collection
+
+        Requires a replica set or sharded cluster; intended to run as a
+        background task so writes from other processes are picked up too.
+        Stream errors (a standalone server, a resume point that fell off the
+        oplog, a dropped connection) are logged and the stream is reopened
+        with exponential backoff. Changes missed in between are covered by
+        invalidating when the stream stops and again once the stream is back.
+        """
+        backoff = initial_backoff
+        reopened = False
+        while True:
+            try:
+                async with await collection.watch() as stream:
+                    if reopened:
+                        self.invalidate()
+                    async for _ in stream:
+                        self.invalidate()
+                        backoff = initial_backoff
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("Module catalog change stream failed; reopening in %.1fs", backoff, exc_info=True)
+            # The stream failed or was closed (e.g. the collection was dropped)
+            self.invalidate()
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, max_backoff)
+            reopened = True
+
+module_catalog = ModuleCatalog(AsyncModuleRepository())
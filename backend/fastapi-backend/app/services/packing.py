@@ -0,0 +1,166 @@
+"""
+Deterministic layout generation: pack module counts onto a style's floor.
+
+Modules are packed bottom-left on a skyline over the 10 m position grid: the
+floor is split into GRID_CELL_SIZE columns, each holding the height of the
+lowest free cell above the modules packed so far, and every module goes
+where its top edge ends lowest (leftmost on ties), in whichever of its 0°
+and 90° orientations does better. Modules are packed largest side first,
+which keeps the space a skyline cannot reuse (under overhangs) small.
+
+Footprints are padded before being rounded up to whole cells: `clearance`
+meters on the right and bottom of every module keeps that much space
+between any two modules, and `aisle` meters more below each module keeps
+walkways running along the floor's x axis. The padding may run past the
+floor edge, the module itself never does.
+"""
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from app.services.layout import GRID_CELL_SIZE, FootprintTable, Layout
+
+# Most modules one generate request may ask for
+MAX_MODULES = 100000
+
+class Skyline:
+    """
+    Lowest free cell of every column of a floor, in cells
+
+    The resting height of a rectangle at every x (the maximum over the
+    columns it spans) is kept per rectangle width, and a placement only
+    raises the windows it touches, so packing many modules of a few sizes
+    costs a handful of small array operations per module.
+    """
+
+    __slots__ = ("width", "height", "heights", "_rests")
+
+    # Rectangle widths whose resting heights are kept up to date
+    MAX_CACHED_WIDTHS = 4
+
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        self.heights = np.zeros(width, dtype=np.int64)
+        self._rests = {}
+
+    def rests(self, width: int) -> np.ndarray:
+        """Resting height of a rectangle `width` cells wide at every x"""
+        rests = self._rests.get(width)
+        if rests is None:
+            if len(self._rests) >= self.MAX_CACHED_WIDTHS:
+                self._rests.clear()
+            rests = self._rests[width] = sliding_window_view(self.heights, width).max(axis=1)
+        return rests
+
+    def best_fit(self, width: int, height: int):
+        """(top edge after placing, y, x) of the bottom-left spot for a rectangle, or None"""
+        if width > self.width or height > self.height:
+            return None
+        rests = self.rests(width)
+        x = int(np.argmin(rests))
+        y = int(rests[x])
+        if y + height > self.height:
+            return None
+        return y + height, y, x
+
+    def place(self, x: int, y: int, width: int, height: int):
+        """Place a rectangle at a spot best_fit returned"""
+        top = y + height
+        # y is the highest column under the rectangle, so every column it
+        # covers rises to top and each window overlapping them rests at least there
+        self.heights[x:x + width] = top
+        for span, rests in self._rests.items():
+            start, stop = max(x - span + 1, 0), min(x + width, len(rests))
+            np.maximum(rests[start:stop], top, out=rests[start:stop])
+
+class PackingResult:
+    """Packed layout plus the modules that did not fit, by footprint table index"""
+
+    __slots__ = ("layout", "unplaced", "dim")
+
+    def __init__(self, layout: Layout, unplaced: Dict[int, int], dim):
+        self.layout = layout
+        self.unplaced = unplaced
+        self.dim = dim
+
+    @property
+    def fill_ratio(self) -> float:
+        """Share of the floor covered by the packed modules (without padding)"""
+        area = float((self.layout.width.astype(np.int64) * self.layout.height).sum())
+        return area / (self.dim[0] * self.dim[1]) if self.dim[0] and self.dim[1] else 0.0
+
+    def to_dict(self) -> dict:
+        ids = self.layout.footprints.ids
+        return {
+            "placed": len(self.layout),
+            "unplaced": {ids[index]: count for index, count in self.unplaced.items()},
+            "fill_ratio": round(self.fill_ratio, 4)
+        }
+
+def padded_cells(meters: int, padding: int) -> int:
+    """Cells a footprint side takes once padded"""
+    return max(-(-(meters + padding) // GRID_CELL_SIZE), 1)
+
+def footprint_counts(counts: Dict[str, int], modules: Dict[str, Optional[dict]],
+                     footprints: FootprintTable) -> Tuple[Dict[int, int], List[str]]:
+    """Module counts by footprint table index, and the requested IDs the catalog does not have"""
+    by_index = {}
+    missing = []
+    for module_id, count in counts.items():
+        index = footprints.index_of(modules.get(module_id))
+        if index < 0:
+            missing.append(module_id)
+        elif count:
+            # IDs in different forms may name the same module
+            by_index[index] = by_index.get(index, 0) + count
+    return by_index, missing
+
+def pack_modules(counts: Dict[int, int], footprints: FootprintTable, dim, clearance: int = 0, aisle: int = 0) -> PackingResult:
+    """
+    Pack `counts` (footprint table index -> module count) onto a floor of `dim` meters
+
+    The result is deterministic for a given catalog, floor and counts.
+    """
+    floor_width, floor_height = int(dim[0]), int(dim[1])
+    # A padded footprint of k cells fits if k * GRID_CELL_SIZE - padding <= floor side
+    skyline = Skyline((floor_width + clearance) // GRID_CELL_SIZE, (floor_height + clearance + aisle) // GRID_CELL_SIZE)
+
+    # Largest side first, then the other side; catalog order breaks ties
+    order = sorted(
+        (index for index, count in counts.items() if count > 0),
+        key=lambda index: (-int(footprints.dims[index].max()), -int(footprints.dims[index].min()), index)
+    )
+
+    modules: List[int] = []
+    xs: List[int] = []
+    ys: List[int] = []
+    rotations: List[int] = []
+    unplaced = {}
+    for index in order:
+        width, height = footprints.dims[index].tolist()
+        orientations = [(0, padded_cells(width, clearance), padded_cells(height, clearance + aisle))]
+        if width != height:
+            orientations.append((90, padded_cells(height, clearance), padded_cells(width, clearance + aisle)))
+
+        for placed in range(counts[index]):
+            best = None
+            for rotation, cells_x, cells_y in orientations:
+                fit = skyline.best_fit(cells_x, cells_y)
+                if fit is not None and (best is None or fit < best[0]):
+                    best = (fit, rotation, cells_x, cells_y)
+            if best is None:
+                # The skyline only rises, so none of the rest fit either
+                unplaced[index] = counts[index] - placed
+                break
+
+            (_, y, x), rotation, cells_x, cells_y = best
+            skyline.place(x, y, cells_x, cells_y)
+            modules.append(index)
+            xs.append(x)
+            ys.append(y)
+            rotations.append(rotation)
+
+    layout = Layout.from_columns(
+        np.array(modules, dtype=np.int64), xs, ys, np.array(rotations, dtype=np.int64), footprints
+    )
+    return PackingResult(layout, unplaced, (floor_width, floor_height))
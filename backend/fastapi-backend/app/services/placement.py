@@ -0,0 +1,289 @@
+"""
+Server-side placement checks against a per-datacenter occupancy grid.
+
+The grid covers the datacenter floor (its `dim`, in meters) at the coarsest
+resolution that the 10 m position grid and every catalog footprint align to,
+split into square tiles that are only allocated where modules are placed, so
+a sparsely used 1000x1000 m floor costs a handful of tiles. Each cell counts
+the modules covering it, which lets moves update the grid in place and keeps
+layouts that already overlap representable.
+
+Checking a placement reads only the cells under the candidate footprint.
+Grids are cached per datacenter and keyed by layout_version: writes made
+through the engine update the cached grid, any other write makes the next
+check rebuild it from the placed modules.
+"""
+import asyncio
+import math
+import weakref
+from collections import OrderedDict
+from typing import Optional, Tuple
+import numpy as np
+from app.repositories.placed_module_repository import AsyncPlacedModuleRepository
+from app.services.layout import GRID_CELL_SIZE, FootprintTable, Layout, referenced_module_id
+from app.services.module_catalog import module_catalog
+
+TILE_CELLS = 64
+CACHE_SIZE = 256
+
+# Floor used by datacenters created without a style dim, as in create_datacenter_simple
+DEFAULT_DIM = (1000, 1000)
+
+# Placed-module fields a layout is built from
+LAYOUT_PROJECTION = {"_id": 1, "module_id": 1, "module.id": 1, "position": 1, "rotation": 1}
+
+Rect = Tuple[int, int, int, int]
+
+# HTTP status the write endpoints answer each rejection reason with
+PLACEMENT_ERROR_STATUS = {"unknown_module": 404, "out_of_bounds": 422, "overlap": 409}
+
+def grid_unit(footprints: FootprintTable) -> int:
+    """Largest cell size in meters that positions and every catalog footprint align to"""
+    return math.gcd(GRID_CELL_SIZE, *np.unique(footprints.dims).tolist()) or 1
+
+def floor_dim(datacenter: dict) -> Tuple[int, int]:
+    """Floor size of a datacenter in meters"""
+    dim = datacenter.get("dim") or DEFAULT_DIM
+    return int(dim[0]), int(dim[1])
+
+class OccupancyGrid:
+    """
+    Tiled per-cell module counts over a datacenter floor
+
+    Rectangles are given in meters as (left, top, width, height); they are
+    clipped to the floor and widened to whole cells, so a check never misses
+    an overlap even for footprints that do not align to the cell size.
+    """
+
+    __slots__ = ("width", "height", "unit", "tiles")
+
+    def __init__(self, width: int, height: int, unit: int = 1):
+        self.width = width
+        self.height = height
+        self.unit = unit
+        self.tiles = {}
+
+    def in_bounds(self, rect: Rect) -> bool:
+        left, top, width, height = rect
+        return left >= 0 and top >= 0 and left + width <= self.width and top + height <= self.height
+
+    def _regions(self, rect: Rect):
+        """Yield (tile key, slices) pairs covering a rectangle"""
+        left, top, width, height = rect
+        unit = self.unit
+        x0, y0 = max(left, 0) // unit, max(top, 0) // unit
+        x1 = -(-min(left + width, self.width) // unit)
+        y1 = -(-min(top + height, self.height) // unit)
+
+        for tile_y in range(y0 // TILE_CELLS, (y1 - 1) // TILE_CELLS + 1 if y1 > y0 else 0):
+            origin_y = tile_y * TILE_CELLS
+            rows = slice(max(y0, origin_y) - origin_y, min(y1, origin_y + TILE_CELLS) - origin_y)
+            for tile_x in range(x0 // TILE_CELLS, (x1 - 1) // TILE_CELLS + 1 if x1 > x0 else 0):
+                origin_x = tile_x * TILE_CELLS
+                columns = slice(max(x0, origin_x) - origin_x, min(x1, origin_x + TILE_CELLS) - origin_x)
+                yield (tile_y, tile_x), (rows, columns)
+
+    def is_free(self, rect: Rect) -> bool:
+        """Whether no module covers any cell under the rectangle"""
+        for key, region in self._regions(rect):
+            tile = self.tiles.get(key)
+            if tile is not None and tile[region].any():
+                return False
+        return True
+
+    def add(self, rect: Rect):
+        for key, region in self._regions(rect):
+            tile = self.tiles.get(key)
+            if tile is None:
+                tile = self.tiles[key] = np.zeros((TILE_CELLS, TILE_CELLS), dtype=np.uint16)
+            tile[region] += 1
+
+    def remove(self, rect: Rect):
+        """Undo an earlier add of the same rectangle (cells never drop below zero)"""
+        for key, region in self._regions(rect):
+            tile = self.tiles.get(key)
+            if tile is None:
+                continue
+            tile[region] -= tile[region] > 0
+            if not tile.any():
+                del self.tiles[key]
+
+    @classmethod
+    def from_layout(cls, layout: Layout, dim: Tuple[int, int]) -> "OccupancyGrid":
+        grid = cls(dim[0], dim[1], grid_unit(layout.footprints))
+        for rect in zip(layout.left.tolist(), layout.top.tolist(), layout.width.tolist(), layout.height.tolist()):
+            grid.add(rect)
+        return grid
+
+class PlacementCheck:
+    """
+    Outcome of checking one placement
+
+    `reason` is None for valid placements, otherwise "unknown_module",
+    "out_of_bounds" or "overlap". `rect` is the candidate footprint and
+    `replaces` the footprint of the placed module being moved, in meters.
+    """
+
+    __slots__ = ("module_id", "x", "y", "rotation", "reason", "rect", "replaces", "layout_version")
+
+    def __init__(self, module_id: str, x: int, y: int, rotation: int, reason: Optional[str] = None,
+                 rect: Optional[Rect] = None, replaces: Optional[Rect] = None, layout_version: int = 0):
+        self.module_id = module_id
+        self.x = x
+        self.y = y
+        self.rotation = rotation
+        self.reason = reason
+        self.rect = rect
+        self.replaces = replaces
+        self.layout_version = layout_version
+
+    @property
+    def valid(self) -> bool:
+        return self.reason is None
+
+    def describe(self) -> str:
+        """Human-readable reason a placement was rejected"""
+        placement = f"Module {self.module_id} at ({self.x}, {self.y}) rotated {self.rotation}"
+        if self.reason == "unknown_module":
+            return f"Module {self.module_id} not found in the catalog"
+        if self.reason == "out_of_bounds":
+            return f"{placement} extends outside the datacenter floor"
+        if self.reason == "overlap":
+            return f"{placement} overlaps a placed module"
+        return f"{placement} is a valid placement"
+
+    def to_dict(self) -> dict:
+        result = {
+            "valid": self.valid,
+            "reason": self.reason,
+            "module_id": self.module_id,
+            "position": {"x": self.x, "y": self.y},
+            "rotation": self.rotation,
+            "layout_version": self.layout_version
+        }
+        if self.rect is not None:
+            result["footprint"] = {"width": self.rect[2], "height": self.rect[3]}
+        return result
+
+class PlacementEngine:
+    """Validates placements against cached occupancy grids"""
+
+    def __init__(self, catalog, placed_module_repository, cache_size: int = CACHE_SIZE):
+        self._catalog = catalog
+        self._placed_module_repository = placed_module_repository
+        self._cache_size = cache_size
+        self._grids = OrderedDict()
+        self._locks = weakref.WeakValueDictionary()
+
+    def lock(self, datacenter_id: str) -> asyncio.Lock:
+        """
+        Lock serializing check-then-write sequences on one datacenter
+
+        Only guards writers in this process; a concurrent writer elsewhere
+        bumps layout_version, which at worst makes the next check rebuild.
+        """
+        lock = self._locks.get(datacenter_id)
+        if lock is None:
+            lock = self._locks[datacenter_id] = asyncio.Lock()
+        return lock
+
+    async def grid(self, datacenter_id: str, datacenter: dict) -> OccupancyGrid:
+        """Occupancy grid of a datacenter at its current layout version"""
+        version = datacenter.get("layout_version", 0)
+        footprints = await self._catalog.footprints()
+
+        cached = self._grids.get(datacenter_id)
+        if (cached is not None and cached[0] == version and cached[1] is footprints
+                and (cached[2].width, cached[2].height) == floor_dim(datacenter)):
+            self._grids.move_to_end(datacenter_id)
+            return cached[2]
+
+        layout = await Layout.from_cursor(
+            self._placed_module_repository.iter_by_datacenter_id(datacenter_id, LAYOUT_PROJECTION), self._catalog
+        )
+        grid = OccupancyGrid.from_layout(layout, floor_dim(datacenter))
+
+        self._grids[datacenter_id] = (version, layout.footprints, grid)
+        self._grids.move_to_end(datacenter_id)
+        while len(self._grids) > self._cache_size:
+            self._grids.popitem(last=False)
+        return grid
+
+    async def check(self, datacenter_id: str, datacenter: dict, module_id: str, x: int, y: int,
+                    rotation: int = 0, moving: Optional[dict] = None) -> PlacementCheck:
+        """
+        Check whether a catalog module fits at a grid position and rotation
+
+        `moving` is the stored placed module being moved, whose own footprint
+        is not counted as an obstacle.
+        """
+        version = datacenter.get("layout_version", 0)
+        result = PlacementCheck(module_id, x, y, rotation, layout_version=version)
+
+        grid = await self.grid(datacenter_id, datacenter)
+        moving_module_id = referenced_module_id(moving) if moving else None
+        modules, footprints = await self._catalog.resolve_footprints([module_id, moving_module_id] if moving_module_id else [module_id])
+
+        index = footprints.index_of(modules.get(module_id))
+        if index < 0:
+            result.reason = "unknown_module"
+            return result
+
+        result.rect = (x * GRID_CELL_SIZE, y * GRID_CELL_SIZE) + footprints.footprint(index, rotation)
+        if moving is not None:
+            result.replaces = placed_rect(moving, modules, footprints)
+
+        if not grid.in_bounds(result.rect):
+            result.reason = "out_of_bounds"
+            return result
+
+        # The moved module's own cells are released for the duration of the check
+        if result.replaces is not None:
+            grid.remove(result.replaces)
+        try:
+            if not grid.is_free(result.rect):
+                result.reason = "overlap"
+        finally:
+            if result.replaces is not None:
+                grid.add(result.replaces)
+
+        return result
+
+    def commit(self, datacenter_id: str, check: PlacementCheck, layout_version: Optional[int]):
+        """
+        Apply a placement that was written to the database
+
+        `layout_version` is the version the write produced; unless it directly
+        follows the cached grid's version, another write got in between and
+        the grid is dropped instead.
+        """
+        cached = self._grids.get(datacenter_id)
+        if cached is None:
+            return
+
+        version, footprints, grid = cached
+        if layout_version is None or layout_version != version + 1 or version != check.layout_version:
+            del self._grids[datacenter_id]
+            return
+
+        if check.replaces is not None:
+            grid.remove(check.replaces)
+        grid.add(check.rect)
+        self._grids[datacenter_id] = (layout_version, footprints, grid)
+
+    def forget(self, datacenter_id: str):
+        """Drop the cached grid of a datacenter"""
+        self._grids.pop(datacenter_id, None)
+
+def placed_rect(placed_module: dict, modules: dict, footprints: FootprintTable) -> Optional[Rect]:
+    """Footprint of a stored placed module in meters, or None if its module is unknown"""
+    index = footprints.index_of(modules.get(referenced_module_id(placed_module)))
+    if index < 0:
+        return None
+
+    position = placed_module.get("position") or {}
+    left = int(position.get("x", 0)) * GRID_CELL_SIZE
+    top = int(position.get("y", 0)) * GRID_CELL_SIZE
+    return (left, top) + footprints.footprint(index, int(placed_module.get("rotation", 0) or 0))
+
+placement_engine = PlacementEngine(module_catalog, AsyncPlacedModuleRepository())
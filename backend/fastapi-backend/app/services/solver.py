@@ -0,0 +1,349 @@
+"""
+Module-mix optimizer for datacenter specs.
+
+A complete datacenter spec (see merge_datacenter_specs) carries, per unit,
+an Amount and Below/Above/Minimize/Maximize/Unconstrained flags. Together
+with the module catalog that is a small integer program: one variable per
+catalog module (its count), one row per Below/Above unit and an objective
+from the Minimize/Maximize units. It is solved in process by depth-first
+branch and bound over LP relaxations, each solved with a dense two-phase
+simplex, which is plenty for catalogs of tens of modules.
+
+Units are read as in the metrics engine: power, water and network are
+flows, so their constraints apply to supply minus demand and, unless the
+spec constrains them, a mix may not consume more than it produces. Every
+other unit (price, processing, storage, connections) is an amount each
+module has, whatever sign the catalog stores it with. Space_X and Space_Y
+cap the total module area and exclude modules that do not fit the floor.
+Several objectives are added up, each scaled by its largest per-module
+value; with none, the cheapest mix is chosen. Modules the objective is
+indifferent to are then trimmed while the mix stays feasible.
+"""
+import hashlib
+import math
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+import anyio.to_thread
+import numpy as np
+import orjson
+from app.services.metrics import ATTRIBUTE_INDEX, RESOURCES, SPACE_UNITS, catalog_variables
+from app.services.module_catalog import module_catalog
+
+EPS = 1e-9
+
+# Count bound for modules no constraint caps
+MAX_COUNT = 1000
+MAX_NODES = 20000
+TIME_LIMIT = 2.0  # seconds
+CACHE_SIZE = 128
+
+def _pivot(tableau: np.ndarray, basis: np.ndarray, row: int, column: int):
+    tableau[row] /= tableau[row, column]
+    pivot_row = tableau[row]
+    factors = tableau[:, column].copy()
+    factors[row] = 0
+    tableau -= np.outer(factors, pivot_row)
+    basis[row] = column
+
+def _simplex(tableau: np.ndarray, basis: np.ndarray) -> bool:
+    """
+    Pivot to optimality; False if the LP is unbounded
+
+    Uses the most negative reduced cost, switching to Bland's rule (which
+    cannot cycle) if the LP takes suspiciously many pivots.
+    """
+    bland_after = 10 * sum(tableau.shape)
+    pivots = 0
+    while True:
+        entering = np.flatnonzero(tableau[-1, :-1] < -EPS)
+        if not len(entering):
+            return True
+        column = entering[0] if pivots > bland_after else entering[np.argmin(tableau[-1, entering])]
+        pivots += 1
+        entries = tableau[:-1, column]
+        positive = entries > EPS
+        if not positive.any():
+            return False
+        ratios = np.full(len(entries), np.inf)
+        ratios[positive] = tableau[:-1, -1][positive] / entries[positive]
+        ties = np.flatnonzero(ratios <= ratios.min() + EPS)
+        _pivot(tableau, basis, ties[np.argmin(basis[ties])], column)
+
+def solve_lp(c: np.ndarray, A: np.ndarray, b: np.ndarray, lower: np.ndarray, upper: np.ndarray) -> Optional[Tuple[np.ndarray, float]]:
+    """
+    Maximize c·x subject to A x <= b and lower <= x <= upper
+
+    Returns (x, c·x), or None when the LP is infeasible.
+    """
+    n = len(c)
+    rows = np.vstack((A, np.eye(n)))
+    rhs = np.concatenate((b - A @ lower, upper - lower))
+    m = len(rhs)
+
+    # Rows with a negative right-hand side start from an artificial variable
+    negative = np.flatnonzero(rhs < 0)
+    k = len(negative)
+    tableau = np.zeros((m + 1, n + m + k + 1))
+    tableau[:m, :n] = rows
+    tableau[:m, n:n + m] = np.eye(m)
+    tableau[:m, -1] = rhs
+    tableau[negative, :-1] *= -1
+    tableau[negative, -1] *= -1
+    tableau[negative, n + m + np.arange(k)] = 1
+    basis = np.arange(n, n + m)
+    basis[negative] = n + m + np.arange(k)
+
+    if k:
+        # Phase 1: drive the artificial variables to zero
+        tableau[-1, n + m:n + m + k] = 1
+        tableau[-1] -= tableau[negative].sum(axis=0)
+        _simplex(tableau, basis)
+        if tableau[-1, -1] < -1e-7:
+            return None
+
+        keep = np.ones(m + 1, dtype=bool)
+        for row in np.flatnonzero(basis >= n + m):
+            columns = np.flatnonzero(np.abs(tableau[row, :n + m]) > EPS)
+            if len(columns):
+                _pivot(tableau, basis, row, columns[0])
+            else:
+                keep[row] = False  # redundant row
+        tableau = np.delete(tableau[keep], np.s_[n + m:n + m + k], axis=1)
+        basis = basis[keep[:-1]]
+
+    # Phase 2: the objective row holds -c, made zero on the basic columns
+    tableau[-1] = 0
+    tableau[-1, :n] = -c
+    basic_costs = np.where(basis < n, c[np.minimum(basis, n - 1)], 0.0)
+    tableau[-1] += basic_costs @ tableau[:-1]
+    if not _simplex(tableau, basis):
+        raise ValueError("LP relaxation is unbounded")
+
+    y = np.zeros(n + m)
+    y[basis] = tableau[:-1, -1]
+    x = lower + y[:n]
+    return x, float(c @ x)
+
+def branch_and_bound(c: np.ndarray, A: np.ndarray, b: np.ndarray, upper: np.ndarray,
+                     max_nodes: int = MAX_NODES, time_limit: float = TIME_LIMIT):
+    """
+    Maximize c·x over non-negative integer x <= upper with A x <= b
+
+    Returns (x, value, nodes, complete); x is None when no integer point was
+    found and complete is False when the node or time limit cut the search.
+    With integer objective coefficients every integer point scores a
+    multiple of their gcd, so LP bounds are rounded down to one; this prunes
+    the many ties such objectives have.
+    """
+    step = 0
+    if np.all(c == np.round(c)) and np.any(c):
+        step = int(np.gcd.reduce(np.abs(c).astype(np.int64)))
+    deadline = time.perf_counter() + time_limit
+    best_x, best_value = None, -math.inf
+    stack = [(np.zeros(len(c)), upper.astype(np.float64))]
+    nodes = 0
+
+    while stack:
+        if nodes >= max_nodes or time.perf_counter() > deadline:
+            return best_x, best_value, nodes, False
+        lower, node_upper = stack.pop()
+        nodes += 1
+
+        relaxed = solve_lp(c, A, b, lower, node_upper)
+        if relaxed is None:
+            continue
+        x, value = relaxed
+        bound = math.floor(value / step + 1e-6) * step if step else value
+        if bound <= best_value + EPS * (1 + abs(best_value)):
+            continue
+
+        # Rounding the relaxation down often gives a good incumbent early
+        rounded = np.clip(np.floor(x + 1e-6), lower, node_upper)
+        if np.all(A @ rounded <= b + 1e-7) and c @ rounded > best_value:
+            best_x, best_value = rounded, float(c @ rounded)
+
+        fractional = np.abs(x - np.round(x))
+        if fractional.max() <= 1e-6:
+            x = np.round(x)
+            if c @ x > best_value:
+                best_x, best_value = x, float(c @ x)
+            continue
+
+        # Branch on the most fractional count; the nearer side is explored first
+        index = int(np.argmax(fractional))
+        down_upper = node_upper.copy()
+        down_upper[index] = math.floor(x[index])
+        up_lower = lower.copy()
+        up_lower[index] = math.floor(x[index]) + 1
+        down, up = (lower, down_upper), (up_lower, node_upper)
+        stack.extend((down, up) if x[index] - math.floor(x[index]) >= 0.5 else (up, down))
+
+    return best_x, best_value, nodes, True
+
+class ModuleMixProblem:
+    """Integer program of one spec over one catalog"""
+
+    def __init__(self, spec: dict, modules: List[dict]):
+        constraints = spec.get("constraints") or {}
+        self.variables = catalog_variables(modules)
+        self.module_ids = [variable[0] for variable in self.variables]
+        n = len(self.variables)
+        upper = np.full(n, float(MAX_COUNT))
+
+        self.rows = []  # (field, kind, amount, coefficients)
+        self.objectives = []  # (field, sense)
+        self.ignored_units = []
+        objective = np.zeros(n)
+
+        space = [constraints.get(field, {}).get("amount") for field in SPACE_UNITS]
+        if all(isinstance(side, (int, float)) and side > 0 for side in space):
+            # Modules that fit the floor in neither orientation are left out
+            for index, (_, _, _, dim) in enumerate(self.variables):
+                if dim and not ((dim[0] <= space[0] and dim[1] <= space[1]) or (dim[1] <= space[0] and dim[0] <= space[1])):
+                    upper[index] = 0
+            self.rows.append(("area", "below", float(space[0] * space[1]), self.coefficients("area")))
+
+        for field, flags in constraints.items():
+            if field in SPACE_UNITS:
+                continue
+            if field not in ATTRIBUTE_INDEX:
+                self.ignored_units.append(field)
+                continue
+
+            values = self.coefficients(field)
+            amount = flags.get("amount")
+            usable = isinstance(amount, (int, float)) and (field in RESOURCES or amount >= 0)
+            if flags.get("below") and usable:
+                self.rows.append((field, "below", float(amount), values))
+            if flags.get("above") and usable:
+                self.rows.append((field, "above", float(amount), values))
+
+            if flags.get("maximize"):
+                self.objectives.append((field, "maximize"))
+            if flags.get("minimize"):
+                self.objectives.append((field, "minimize"))
+
+        # Flows the spec leaves alone still have to balance
+        constrained = {row[0] for row in self.rows}
+        for field in RESOURCES:
+            values = self.coefficients(field)
+            if field not in constrained and (values < 0).any():
+                self.rows.append((field, "above", 0.0, values))
+
+        if not self.objectives:
+            self.objectives.append(("price", "minimize"))
+        for field, sense in self.objectives:
+            values = self.coefficients(field)
+            # A lone objective keeps its own units (and integrality)
+            scale = (np.abs(values).max() or 1.0) if len(self.objectives) > 1 else 1.0
+            objective += values / scale if sense == "maximize" else -values / scale
+
+        self.c = objective
+        self.A = np.array([values if kind == "below" else -values for _, kind, _, values in self.rows]).reshape(len(self.rows), n)
+        self.b = np.array([amount if kind == "below" else -amount for _, kind, amount, _ in self.rows], dtype=np.float64)
+
+        # Non-negative cap rows bound every count they involve
+        for row, bound in zip(self.A, self.b):
+            if bound >= 0 and (row >= 0).all():
+                capped = row > EPS
+                upper[capped] = np.minimum(upper[capped], np.floor(bound / row[capped] + 1e-9))
+        # Modules that help no objective and appear in no row are never worth placing
+        upper[(np.abs(self.A) <= EPS).all(axis=0) & (self.c <= 0)] = 0
+        self.upper = upper
+
+    def coefficients(self, field: str) -> np.ndarray:
+        """Per-module value of a unit: signed for flows, a magnitude otherwise"""
+        values = np.array([attributes.get(field, 0.0) for _, _, attributes, _ in self.variables], dtype=np.float64)
+        return values if field in RESOURCES else np.abs(values)
+
+    def solve(self, max_nodes: int = MAX_NODES, time_limit: float = TIME_LIMIT) -> dict:
+        started = time.perf_counter()
+        # Only modules that may be placed enter the search
+        active = np.flatnonzero(self.upper > 0)
+        x, _, nodes, complete = branch_and_bound(
+            self.c[active], self.A[:, active], self.b, self.upper[active], max_nodes, time_limit
+        )
+        result = {
+            "status": "optimal" if complete else "feasible",
+            "optimal": complete,
+            "modules": [],
+            "constraints": [],
+            "objectives": [{"field": field, "sense": sense, "value": None} for field, sense in self.objectives],
+            "ignored_units": self.ignored_units,
+            "nodes": nodes
+        }
+
+        if x is None:
+            result["status"] = "infeasible" if complete else "no_solution_found"
+            result["optimal"] = False
+        else:
+            counts = np.zeros(len(self.module_ids), dtype=np.int64)
+            counts[active] = self._trim(np.round(x), active).astype(np.int64)
+            result["modules"] = [
+                {"id": variable[0], "name": variable[1], "count": count}
+                for variable, count in zip(self.variables, counts.tolist()) if count
+            ]
+            for field, kind, amount, values in self.rows:
+                value = float(values @ counts)
+                result["constraints"].append({
+                    "field": field, "kind": kind, "amount": _number(amount), "value": _number(value),
+                    "slack": _number(amount - value if kind == "below" else value - amount)
+                })
+            for objective in result["objectives"]:
+                objective["value"] = _number(self.coefficients(objective["field"]) @ counts)
+
+        result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        return result
+
+    def _trim(self, x: np.ndarray, active: np.ndarray) -> np.ndarray:
+        """Drop modules that do not change the objective while the mix stays feasible"""
+        A, c = self.A[:, active], self.c[active]
+        for index in np.flatnonzero((c == 0) & (x > 0)):
+            while x[index] > 0:
+                x[index] -= 1
+                if not np.all(A @ x <= self.b + 1e-7):
+                    x[index] += 1
+                    break
+        return x
+
+def _number(value: float):
+    value = float(value)
+    return int(value) if value.is_integer() else round(value, 6)
+
+def spec_key(spec: dict) -> str:
+    """Hash of the parts of a complete spec the solution depends on"""
+    return hashlib.sha1(orjson.dumps(spec.get("constraints") or {}, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+class ModuleMixSolver:
+    """
+    Solves specs against the module catalog, caching solutions
+
+    Solutions are keyed by the spec's constraints and the catalog version,
+    so any catalog write or spec change solves again.
+    """
+
+    def __init__(self, catalog, cache_size: int = CACHE_SIZE):
+        self._catalog = catalog
+        self._cache_size = cache_size
+        self._solutions = OrderedDict()
+
+    async def solve(self, spec: dict) -> Tuple[dict, bool]:
+        """Solution of a complete spec and whether it came from the cache"""
+        # The version is read first so a write during the load cannot be cached under it
+        key = (spec_key(spec), self._catalog.version)
+        modules = await self._catalog.all()
+
+        cached = self._solutions.get(key)
+        if cached is not None:
+            self._solutions.move_to_end(key)
+            return cached, True
+
+        # Branch and bound is CPU-bound; keep it off the event loop
+        solution = await anyio.to_thread.run_sync(lambda: ModuleMixProblem(spec, modules).solve())
+        self._solutions[key] = solution
+        while len(self._solutions) > self._cache_size:
+            self._solutions.popitem(last=False)
+        return solution, False
+
+module_mix_solver = ModuleMixSolver(module_catalog)
@@ -0,0 +1,146 @@
+"""
+Latency benchmark: blocking repositories versus the asyncio repositories.
+
+Simulates concurrent mixed API traffic against a real MongoDB deployment and
+reports p50/p99 request latency for both layers. The old layer is driven the
+way the routers used to call it - blocking pymongo calls made directly from
+coroutines - so one slow query stalls every other in-flight request.
+
+Usage (seeds and drops its own database):
+    MONGODB_URI=mongodb://localhost:27017 python -m benchmarks.bench_async_repositories
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+
+os.environ.setdefault("MONGODB_DB_NAME", "datacenter_designer_bench")
+
+from DB.cliente import mongo_manager
+from app.repositories.datacenter_repository import DatacenterRepository, AsyncDatacenterRepository
+from app.repositories.placed_module_repository import PlacedModuleRepository, AsyncPlacedModuleRepository
+from app.repositories.module_repository import ModuleRepository, AsyncModuleRepository
+from app.repositories.datacenter_style_repository import DatacenterStyleRepository, AsyncDatacenterStyleRepository
+
+
+def seed(datacenters: int, modules_per_datacenter: int) -> list:
+    """Populate the bench database and return the datacenter IDs"""
+    db = mongo_manager.database
+    for name in ("modules", "datacenter_styles", "datacenters", "placed_modules"):
+        db[name].drop()
+
+    catalog = [{"id": f"module_{i}", "type": "server", "dim": [10, 20], "price": 100 + i} for i in range(50)]
+    db["modules"].insert_many(catalog)
+    db["datacenter_styles"].insert_many([{"id": f"style_{i}", "name": f"Style {i}", "dim": [1000, 1000]} for i in range(10)])
+
+    datacenter_ids = []
+    for i in range(datacenters):
+        datacenter_id = str(db["datacenters"].insert_one({"name": f"DC {i}", "style_id": "style_0"}).inserted_id)
+        db["placed_modules"].insert_many([
+            {
+                "module_id": f"module_{j % len(catalog)}",
+                "position": {"x": j * 10, "y": 0},
+                "rotation": 0,
+                "datacenter_id": datacenter_id
+            }
+            for j in range(modules_per_datacenter)
+        ])
+        datacenter_ids.append(datacenter_id)
+
+    return datacenter_ids
+
+
+def sync_operations(datacenter_ids: list) -> list:
+    datacenter_repo = DatacenterRepository()
+    placed_module_repo = PlacedModuleRepository()
+    module_repo = ModuleRepository()
+    style_repo = DatacenterStyleRepository()
+
+    async def get_datacenter():
+        datacenter_repo.get_by_id(random.choice(datacenter_ids))
+
+    async def get_placed_modules():
+        placed_module_repo.get_by_datacenter_id(random.choice(datacenter_ids))
+
+    async def get_module():
+        module_repo.get_by_id(f"module_{random.randrange(50)}")
+
+    async def get_styles():
+        style_repo.get_all()
+
+    return [get_datacenter, get_placed_modules, get_module, get_styles]
+
+
+def async_operations(datacenter_ids: list) -> list:
+    datacenter_repo = AsyncDatacenterRepository()
+    placed_module_repo = AsyncPlacedModuleRepository()
+    module_repo = AsyncModuleRepository()
+    style_repo = AsyncDatacenterStyleRepository()
+
+    async def get_datacenter():
+        await datacenter_repo.get_by_id(random.choice(datacenter_ids))
+
+    async def get_placed_modules():
+        await placed_module_repo.get_by_datacenter_id(random.choice(datacenter_ids))
+
+    async def get_module():
+        await module_repo.get_by_id(f"module_{random.randrange(50)}")
+
+    async def get_styles():
+        await style_repo.get_all()
+
+    return [get_datacenter, get_placed_modules, get_module, get_styles]
+
+
+async def run_traffic(operations: list, clients: int, requests_per_client: int) -> list:
+    """Run concurrent clients issuing a random mix of operations, returning latencies in ms"""
+    latencies = []
+
+    async def client(seed_value: int):
+        rng = random.Random(seed_value)
+        for _ in range(requests_per_client):
+            operation = rng.choice(operations)
+            start = time.perf_counter()
+            # Yield to the loop the way a server does when a request arrives,
+            # so time spent stalled behind other requests counts as latency
+            await asyncio.sleep(0)
+            await operation()
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*(client(i) for i in range(clients)))
+    return latencies
+
+
+def summarize(label: str, latencies: list, elapsed: float):
+    latencies = sorted(latencies)
+    p50 = statistics.median(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{label:<8} requests={len(latencies):<6} p50={p50:8.2f}ms p99={p99:8.2f}ms throughput={len(latencies) / elapsed:8.1f} req/s")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=40, help="requests per client")
+    parser.add_argument("--datacenters", type=int, default=20)
+    parser.add_argument("--modules-per-datacenter", type=int, default=200)
+    args = parser.parse_args()
+
+    datacenter_ids = seed(args.datacenters, args.modules_per_datacenter)
+    await mongo_manager.connect_async()
+
+    try:
+        for label, operations in (("blocking", sync_operations(datacenter_ids)), ("async", async_operations(datacenter_ids))):
+            start = time.perf_counter()
+            latencies = await run_traffic(operations, args.clients, args.requests)
+            summarize(label, latencies, time.perf_counter() - start)
+    finally:
+        mongo_manager.database.client.drop_database(mongo_manager.database.name)
+        await mongo_manager.close_async()
+        mongo_manager.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,77 @@
+"""
+Throughput benchmark: the original esquema converters versus the precompiled ones.
+
+Converts synthetic module documents (a mix of modern, legacy capitalized and
+ObjectId-keyed shapes) and reports rows per second for module_esquema, for
+module_esquema over the same documents after the schema migration and for
+placed_modules_esquema over a layout that places catalog modules repeatedly.
+Needs no database:
+    python -m benchmarks.bench_esquemas --rows 100000
+"""
+import argparse
+import time
+from bson import ObjectId
+from DB.esquemas.esquema_modules import module_esquema
+from DB.esquemas.esquema_placed_modules import placed_modules_esquema
+from DB.migrations.schema_versions import upgrade_document
+from tests.esquema_reference import legacy_module_esquema, synthetic_modules
+
+
+def legacy_placed_modules_esquema(placed_modules) -> list:
+    """placed_modules_esquema as it was, converting every embedded module"""
+    result = []
+    for placed_module in placed_modules:
+        row = {
+            "id": str(placed_module["_id"]) if "_id" in placed_module else placed_module.get("id", ""),
+            "position": {
+                "x": placed_module.get("position", {}).get("x", 0),
+                "y": placed_module.get("position", {}).get("y", 0)
+            },
+            "rotation": placed_module.get("rotation", 0),
+            "datacenter_id": placed_module.get("datacenter_id", None)
+        }
+        if isinstance(placed_module.get("module"), dict):
+            row["module"] = legacy_module_esquema(placed_module["module"])
+        result.append(row)
+    return result
+
+
+def rows_per_second(convert, rows, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        convert(rows)
+        best = min(best, time.perf_counter() - start)
+    return len(rows) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--catalog", type=int, default=50, help="distinct modules placed in the layout")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per converter; the best is reported")
+    args = parser.parse_args()
+
+    modules = synthetic_modules(args.rows)
+    catalog = synthetic_modules(args.catalog, seed=1)
+    layout = [
+        {"_id": ObjectId(), "module_id": catalog[i % len(catalog)].get("id"), "module": catalog[i % len(catalog)],
+         "position": {"x": i, "y": i}, "rotation": 0, "datacenter_id": "bench"}
+        for i in range(args.rows)
+    ]
+
+    migrated = [upgrade_document("modules", module) for module in modules]
+
+    cases = (
+        ("module_esquema", lambda rows: [legacy_module_esquema(m) for m in rows], lambda rows: [module_esquema(m) for m in rows], modules, modules),
+        ("module_esquema migrated", lambda rows: [legacy_module_esquema(m) for m in rows], lambda rows: [module_esquema(m) for m in rows], modules, migrated),
+        ("placed_modules_esquema", legacy_placed_modules_esquema, placed_modules_esquema, layout, layout),
+    )
+    for label, old, new, rows, new_rows in cases:
+        old_rate = rows_per_second(old, rows, args.repeat)
+        new_rate = rows_per_second(new, new_rows, args.repeat)
+        print(f"{label:<24} rows={len(rows):<7} old={old_rate:12,.0f} rows/s new={new_rate:12,.0f} rows/s speedup={new_rate / old_rate:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
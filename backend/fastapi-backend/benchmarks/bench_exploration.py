@@ -0,0 +1,68 @@
+"""
+Scaling benchmark: design-space exploration from 1 to N worker processes.
+
+Samples a fixed number of module mixes (2M by default) from a catalog shaped
+like the designer's (transformers, water supply and treatment, chillers,
+network, server and data racks) against one style, with the DesignExplorer
+that POST /datacenter-styles/{id}/explore runs, once per worker count.
+Workers are started before timing, so each run measures evaluation only.
+Reports time, mixes per second, the speedup over one worker and the size of
+the Pareto front found. Needs no database:
+    python -m benchmarks.bench_exploration --mixes 2000000 --workers-max 8
+"""
+import argparse
+import os
+import time
+from app.services.exploration import DesignExplorer, ExplorationProblem
+
+CATALOG = [
+    {"id": "transformer_100", "grid_connection": 1, "dim": [40, 40], "price": 1000, "usable_power": 100},
+    {"id": "transformer_1000", "grid_connection": 1, "dim": [100, 100], "price": 50000, "usable_power": 1000},
+    {"id": "water_supply_100", "water_connection": 1, "dim": [50, 50], "price": 200, "fresh_water": 100},
+    {"id": "water_supply_500", "water_connection": 1, "dim": [150, 100], "price": 400, "fresh_water": 500},
+    {"id": "water_treatment_50", "fresh_water": -50, "usable_power": -50, "distilled_water": 50, "dim": [50, 50], "price": 10000},
+    {"id": "water_treatment_250", "fresh_water": -250, "usable_power": -90, "distilled_water": 250, "dim": [200, 200], "price": 40000},
+    {"id": "water_chiller_100", "distilled_water": -100, "usable_power": -500, "chilled_water": 95, "dim": [100, 100], "price": 40000},
+    {"id": "network_rack_50", "usable_power": -50, "chilled_water": -5, "internal_network": 50, "fresh_water": -5, "dim": [40, 40], "price": 2000},
+    {"id": "network_rack_200", "usable_power": -95, "chilled_water": -10, "internal_network": 200, "fresh_water": -40, "dim": [40, 40], "price": 20000},
+    {"id": "server_rack_100", "usable_power": -75, "chilled_water": -15, "internal_network": -10, "distilled_water": 15,
+     "processing": 100, "external_network": 100, "dim": [40, 40], "price": 8000},
+    {"id": "server_rack_500", "usable_power": -240, "chilled_water": -50, "internal_network": -32, "distilled_water": -50,
+     "processing": 1000, "external_network": 400, "dim": [40, 40], "price": 50000},
+    {"id": "data_rack_100", "usable_power": -15, "chilled_water": -3, "internal_network": -5, "distilled_water": -3,
+     "data_storage": 100, "dim": [40, 40], "price": 2000},
+    {"id": "data_rack_500", "usable_power": -40, "chilled_water": -6, "internal_network": -20, "distilled_water": -6,
+     "data_storage": 500, "dim": [40, 40], "price": 20500},
+]
+
+STYLE = {"name": "Bench", "grid_connection": 3, "water_connection": 1, "price": 1000000,
+         "processing": 1000, "data_storage": 1000, "dim": [1000, 500]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mixes", type=int, default=2_000_000, help="mixes evaluated per run")
+    parser.add_argument("--workers-max", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--max-count", type=int, default=20, help="count bound per module")
+    args = parser.parse_args()
+
+    problem = ExplorationProblem(CATALOG, STYLE, args.max_count)
+    print(f"modules={len(problem.module_ids)} space={problem.space:.3g} mixes={args.mixes:,}")
+
+    explorer = DesignExplorer(None, workers=args.workers_max)
+    explorer.executor()
+    baseline = None
+    try:
+        for workers in range(1, args.workers_max + 1):
+            start = time.perf_counter()
+            result = explorer.run(problem, workers=workers, max_mixes=args.mixes, time_budget=3600)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print(f"workers={workers:>3} time={elapsed * 1000:9.1f}ms mixes/s={result['evaluated'] / elapsed:12,.0f} "
+                  f"speedup={baseline / elapsed:5.2f}x feasible={result['feasible']:>9,} front={result['front_size']:>5}")
+    finally:
+        explorer.shutdown()
+
+
+if __name__ == "__main__":
+    main()
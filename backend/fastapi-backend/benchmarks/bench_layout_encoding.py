@@ -0,0 +1,76 @@
+"""
+Size and latency benchmark: the JSON simple view versus the binary layout.
+
+Builds N placed modules (100k by default) in the shape the simple view reads
+them and compares encoding time, client-side decoding time and bytes on the
+wire (raw and gzipped) for the `/datacenters/{id}/simple` JSON body and the
+`/datacenters/{id}/layout` binary body. Needs no database:
+    python -m benchmarks.bench_layout_encoding --modules 100000
+"""
+import argparse
+import gzip
+import random
+import time
+import orjson
+from bson import ObjectId
+from app.services.layout_encoding import encode_layout, decode_layout
+
+
+def placed_modules(count: int, catalog_size: int = 50) -> list:
+    rng = random.Random(0)
+    return [
+        {
+            "_id": ObjectId(),
+            "module_id": f"module_{rng.randrange(catalog_size)}",
+            "position": {"x": (i % 300) * 40, "y": (i // 300) * 40},
+            "rotation": rng.choice((0, 90, 180, 270))
+        }
+        for i in range(count)
+    ]
+
+
+def simple_view(modules: list) -> bytes:
+    """The body /datacenters/{id}/simple renders for these modules"""
+    return orjson.dumps({"datacenter": {
+        "id": "bench",
+        "modules": [
+            {"id": module["module_id"], "position": module["position"], "rotation": module["rotation"]}
+            for module in modules
+        ]
+    }})
+
+
+def best_time(function, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case; the best is reported")
+    args = parser.parse_args()
+
+    modules = placed_modules(args.modules)
+    json_body = simple_view(modules)
+    binary_body = encode_layout(modules)
+
+    cases = (
+        ("json", lambda: simple_view(modules), lambda: orjson.loads(json_body), json_body),
+        ("binary", lambda: encode_layout(modules), lambda: decode_layout(binary_body), binary_body),
+    )
+    for label, encode, decode, body in cases:
+        encode_ms = best_time(encode, args.repeat)
+        decode_ms = best_time(decode, args.repeat)
+        print(
+            f"{label:<7} bytes={len(body):>11,} gzipped={len(gzip.compress(body, compresslevel=6)):>10,} "
+            f"encode={encode_ms:8.1f}ms decode={decode_ms:8.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Latency benchmark: bulk layout validation versus an all-pairs check.
+
+Builds N random modules (100k by default) with rotated catalog footprints on
+a floor sized for the requested density and times validate_layout, which the
+import, create and layout endpoints run, against the naive O(n²) pairwise
+rectangle test (timed on a sample and extrapolated). Needs no database:
+    python -m benchmarks.bench_layout_validation --modules 100000
+"""
+import argparse
+import math
+import time
+import numpy as np
+from app.services.layout import FootprintTable, Layout
+from app.services.layout_validation import validate_layout
+
+CATALOG = [{"id": f"module_{i}", "dim": [width, height]} for i, (width, height) in enumerate(
+    [(20, 20), (40, 20), (40, 40), (30, 50), (60, 20), (10, 10)]
+)]
+
+
+def random_layout(count: int, density: float, seed: int = 0):
+    """Layout whose footprints cover about `density` of a square floor, and that floor's dim"""
+    rng = np.random.default_rng(seed)
+    footprints = FootprintTable(CATALOG)
+    modules = rng.integers(0, len(CATALOG), count)
+    area = float((footprints.dims[modules, 0] * footprints.dims[modules, 1]).sum())
+    cells = max(int(math.sqrt(area / density) / 10), 1)
+    layout = Layout.from_columns(
+        modules, rng.integers(0, cells, count), rng.integers(0, cells, count),
+        rng.choice((0, 90, 180, 270), count), footprints
+    )
+    return layout, (cells * 10, cells * 10)
+
+
+def all_pairs(layout: Layout, dim) -> int:
+    """Overlap count of the naive pairwise check, one module against all later ones"""
+    left, top, right, bottom = (edge.tolist() for edge in (layout.left, layout.top, layout.right, layout.bottom))
+    overlaps = 0
+    for i in range(len(left)):
+        for j in range(i + 1, len(left)):
+            if left[i] < right[j] and left[j] < right[i] and top[i] < bottom[j] and top[j] < bottom[i]:
+                overlaps += 1
+    return overlaps
+
+
+def best_time(function, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", type=int, default=100000)
+    parser.add_argument("--density", type=float, default=0.3, help="share of the floor covered by footprints")
+    parser.add_argument("--sample", type=int, default=2000, help="modules the all-pairs check is timed on")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case; the best is reported")
+    args = parser.parse_args()
+
+    layout, dim = random_layout(args.modules, args.density)
+    report = validate_layout(layout, dim)
+    sweep_ms = best_time(lambda: validate_layout(layout, dim), args.repeat)
+    print(f"sweep     modules={args.modules:>9,} overlaps={len(report.overlaps):>9,} "
+          f"out_of_bounds={len(report.out_of_bounds):>7,} time={sweep_ms:10.1f}ms")
+
+    sample, sample_dim = random_layout(min(args.sample, args.modules), args.density)
+    pairs_ms = best_time(lambda: all_pairs(sample, sample_dim), 1)
+    scale = (args.modules / len(sample)) ** 2
+    print(f"all-pairs modules={len(sample):>9,} time={pairs_ms:10.1f}ms  extrapolated to {args.modules:,}: {pairs_ms * scale / 1000:,.0f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Latency benchmark: layout generation across fill ratios.
+
+Draws N modules (10k by default) from a mixed catalog of footprints and packs
+them with pack_modules, which POST /datacenters/generate runs, onto square
+floors sized so the modules would cover each requested share of the floor.
+Reports how many modules fit, the fill ratio reached and the packing time,
+and checks every layout with validate_layout. Needs no database:
+    python -m benchmarks.bench_packing --modules 10000 --fill 0.5 0.7 0.85 0.95
+"""
+import argparse
+import math
+import time
+import numpy as np
+from app.services.layout import FootprintTable
+from app.services.layout_validation import validate_layout
+from app.services.packing import pack_modules
+
+CATALOG = [{"id": f"module_{i}", "dim": [width, height]} for i, (width, height) in enumerate(
+    [(40, 40), (50, 50), (100, 100), (150, 100), (300, 100), (20, 40), (35, 15)]
+)]
+
+
+def random_counts(count: int, seed: int = 0):
+    """Module counts by footprint table index for `count` modules drawn uniformly from the catalog"""
+    rng = np.random.default_rng(seed)
+    indexes, counts = np.unique(rng.integers(0, len(CATALOG), count), return_counts=True)
+    return dict(zip(indexes.tolist(), counts.tolist()))
+
+
+def best_time(function, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", type=int, default=10000)
+    parser.add_argument("--fill", type=float, nargs="+", default=[0.3, 0.5, 0.7, 0.85, 0.95],
+                        help="module area as a share of the floor")
+    parser.add_argument("--clearance", type=int, default=0, help="meters kept free between modules")
+    parser.add_argument("--aisle", type=int, default=0, help="extra meters kept free below every module")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case; the best is reported")
+    args = parser.parse_args()
+
+    footprints = FootprintTable(CATALOG)
+    counts = random_counts(args.modules)
+    area = sum(int(footprints.dims[index].prod()) * count for index, count in counts.items())
+
+    for fill in args.fill:
+        side = max(int(math.sqrt(area / fill)), 10)
+        dim = (side, side)
+        result = pack_modules(counts, footprints, dim, args.clearance, args.aisle)
+        elapsed_ms = best_time(lambda: pack_modules(counts, footprints, dim, args.clearance, args.aisle), args.repeat)
+        valid = validate_layout(result.layout, dim).valid
+        print(f"target fill={fill:5.2f} floor={side:>6}m placed={len(result.layout):>7,}/{args.modules:,} "
+              f"fill={result.fill_ratio:6.3f} valid={valid} time={elapsed_ms:8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Serialization benchmark for a large datacenter layout response.
+
+Builds a datacenter with N hydrated placed modules (50k by default) and
+compares FastAPI's default path - jsonable_encoder plus stdlib json, which is
+what returning a dict through JSONResponse costs - with FastJSONResponse, then
+reports bytes on the wire for identity, gzip and (when installed) brotli at the
+levels CompressionMiddleware uses. Needs no database:
+    python -m benchmarks.bench_responses --modules 50000
+"""
+import argparse
+import gzip
+import time
+from datetime import datetime
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from app.core.compression import brotli
+from app.core.responses import FastJSONResponse
+from DB.esquemas.esquema_datacenters import datacenter_esquema
+from tests.esquema_reference import synthetic_modules
+
+
+def large_datacenter(module_count: int, catalog_size: int = 50) -> dict:
+    catalog = synthetic_modules(catalog_size)
+    datacenter_id = ObjectId()
+    return {
+        "_id": datacenter_id,
+        "name": "Bench datacenter",
+        "style_id": "style_0",
+        "dim": [10000, 10000],
+        "created_at": datetime.utcnow().isoformat(),
+        "updated_at": datetime.utcnow().isoformat(),
+        "modules": [
+            {
+                "_id": ObjectId(),
+                "datacenter_id": str(datacenter_id),
+                "module_id": catalog[i % catalog_size].get("id") or str(catalog[i % catalog_size]["_id"]),
+                "module": catalog[i % catalog_size],
+                "position": {"x": (i % 250) * 40, "y": (i // 250) * 40},
+                "rotation": (i % 4) * 90
+            }
+            for i in range(module_count)
+        ]
+    }
+
+
+def best_time(function, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case; the best is reported")
+    args = parser.parse_args()
+
+    content = datacenter_esquema(large_datacenter(args.modules))
+
+    default_ms = best_time(lambda: JSONResponse(jsonable_encoder(content)), args.repeat)
+    fast_ms = best_time(lambda: FastJSONResponse(content), args.repeat)
+    print(f"serialize  default={default_ms:9.1f}ms fast={fast_ms:9.1f}ms speedup={default_ms / fast_ms:5.2f}x")
+
+    body = FastJSONResponse(content).body
+    print(f"identity   {len(body):>12,} bytes")
+
+    gzip_ms = best_time(lambda: gzip.compress(body, compresslevel=6), args.repeat)
+    print(f"gzip -6    {len(gzip.compress(body, compresslevel=6)):>12,} bytes {gzip_ms:9.1f}ms")
+
+    if brotli is not None:
+        brotli_ms = best_time(lambda: brotli.compress(body, quality=4), args.repeat)
+        print(f"brotli q4  {len(brotli.compress(body, quality=4)):>12,} bytes {brotli_ms:9.1f}ms")
+    else:
+        print("brotli     not installed (pip install brotli)")
+
+
+if __name__ == "__main__":
+    main()
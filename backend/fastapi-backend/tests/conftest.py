@@ -0,0 +1,57 @@
+import pytest
+from bson import ObjectId
+from app.services.module_catalog import ModuleCatalog
+
+class StaticModuleRepository:
+    def __init__(self, modules):
+        self.modules = modules
+
+    async def get_all(self):
+        return list(self.modules)
+
+class AsyncRows:
+    """Async iterable standing in for an AsyncCursor"""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def __aiter__(self):
+        self._iterator = iter(self.rows)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iterator)
+        except StopIteration:
+            raise StopAsyncIteration
+
+class FakePlacedModuleRepository:
+    def __init__(self, placed_modules):
+        self.placed_modules = placed_modules
+        self.reads = 0
+
+    def iter_by_datacenter_id(self, datacenter_id, projection=None, batch_size=1000):
+        self.reads += 1
+        return AsyncRows([placed for placed in self.placed_modules if placed["datacenter_id"] == datacenter_id])
+
+def placed_module(module_id, x, y, rotation=0):
+    return {"_id": ObjectId(), "datacenter_id": "dc", "module_id": module_id, "position": {"x": x, "y": y}, "rotation": rotation}
+
+@pytest.fixture
+def static_catalog():
+    """Builds a ModuleCatalog over a fixed list of module documents"""
+    return lambda modules: ModuleCatalog(StaticModuleRepository(modules))
+
+@pytest.fixture
+def async_rows():
+    return AsyncRows
+
+@pytest.fixture
+def placed_repository():
+    """Builds a placed-module repository over a list of placed modules"""
+    return FakePlacedModuleRepository
+
+@pytest.fixture
+def placed():
+    """Builds a placed module of datacenter "dc" at a grid position"""
+    return placed_module
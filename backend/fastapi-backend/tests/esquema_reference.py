@@ -0,0 +1,97 @@
+"""
+Reference data for the esquema tests and benchmarks: synthetic module
+documents in every stored shape and the original module converter.
+"""
+import random
+from bson import ObjectId
+
+def legacy_module_esquema(module) -> dict:
+    """module_esquema as it was before the conversion tables were precompiled"""
+    if module is None:
+        return None
+
+    result = {
+        "id": str(module["_id"]) if "_id" in module else module.get("id", "")
+    }
+
+    if "_id" in module and "ID" not in module:
+        result["ID"] = str(module["_id"])
+    elif "ID" in module:
+        result["ID"] = module["ID"]
+
+    legacy_fields = ["Name", "Is_Input", "Is_Output", "Unit", "Amount"]
+    for field in legacy_fields:
+        if field in module:
+            result[field] = module[field]
+
+    if "type" not in module and "Name" in module:
+        name_parts = module["Name"].split("_")
+        if name_parts:
+            result["type"] = name_parts[0].lower()
+
+    if "dim" in module:
+        result["dim"] = module["dim"]
+    elif "Space_X" in module and "Space_Y" in module:
+        result["dim"] = [module["Space_X"], module["Space_Y"]]
+
+    modern_fields = [
+        "price", "description",
+        "supplied_water", "water_usage", "chilled_water", "distilled_water", "fresh_water",
+        "usable_power", "processing", "storage_capacity", "network_capacity",
+        "internal_network", "external_network", "data_storage",
+        "grid_connection", "water_connection"
+    ]
+
+    for field in modern_fields:
+        if field in module:
+            result[field] = module[field]
+
+        legacy_style = field.title().replace("_", " ").replace(" ", "_")
+        if legacy_style in module:
+            result[field] = module[legacy_style]
+
+    field_mappings = {
+        "Usable_Power": "usable_power",
+        "Grid_Connection": "grid_connection",
+        "Water_Connection": "water_connection",
+        "Fresh_Water": "fresh_water",
+        "Distilled_Water": "distilled_water",
+        "Chilled_Water": "chilled_water",
+        "Internal_Network": "internal_network",
+        "External_Network": "external_network",
+        "Data_Storage": "data_storage",
+        "Processing": "processing",
+        "Price": "price",
+        "Description": "description"
+    }
+
+    for db_field, api_field in field_mappings.items():
+        if db_field in module and api_field not in result:
+            result[api_field] = module[db_field]
+
+    return result
+
+def synthetic_modules(count: int, seed: int = 0) -> list:
+    """Module documents in every shape the collection holds"""
+    rng = random.Random(seed)
+    modules = []
+    for i in range(count):
+        shape = i % 3
+        if shape == 0:
+            modules.append({
+                "_id": ObjectId(), "id": f"server_rack_{i}", "type": "server", "dim": [40, 40],
+                "price": rng.randint(100, 5000), "usable_power": -rng.randint(10, 500),
+                "processing": rng.randint(100, 2000), "water_connection": 0
+            })
+        elif shape == 1:
+            modules.append({
+                "_id": ObjectId(), "ID": i, "Name": f"Transformer_{i}", "Is_Input": 1, "Is_Output": 0,
+                "Unit": "Usable_Power", "Amount": rng.randint(100, 5000), "Space_X": 40, "Space_Y": 45,
+                "Price": rng.randint(100, 5000), "Grid_Connection": 1, "Usable_Power": rng.randint(100, 5000)
+            })
+        else:
+            modules.append({
+                "id": f"water_{i}", "dim": [20, 20], "price": 500, "Price": 550,
+                "fresh_water": 10, "chilled_water": -5, "description": "water module"
+            })
+    return modules
@@ -0,0 +1,90 @@
+import asyncio
+from bson import ObjectId
+from app.repositories.placed_module_repository import (
+    AsyncPlacedModuleRepository, compact_placed_module, compact_placed_module_update, placed_module_update
+)
+from app.repositories.datacenter_repository import stored_placed_modules
+
+def test_compact_drops_embedded_module_and_casts_coordinates():
+    placed_module = {
+        "id": "placed_1",
+        "datacenter_id": "dc",
+        "module": {"_id": ObjectId(), "id": "server_rack_100", "price": 100},
+        "position": {"x": 10.0, "y": "20"},
+        "rotation": 90.0
+    }
+
+    assert compact_placed_module(placed_module) == {
+        "id": "placed_1",
+        "datacenter_id": "dc",
+        "module_id": "server_rack_100",
+        "position": {"x": 10, "y": 20},
+        "rotation": 90
+    }
+
+def test_compact_falls_back_to_embedded_object_id():
+    object_id = ObjectId()
+    compacted = compact_placed_module({"module": {"_id": object_id}, "position": {"x": 1, "y": 2}})
+
+    assert compacted["module_id"] == str(object_id)
+    assert compacted["rotation"] == 0
+
+def test_compact_is_idempotent():
+    compacted = compact_placed_module({"_id": ObjectId(), "module_id": "a", "position": {"x": 1, "y": 2}, "rotation": 0})
+
+    assert compact_placed_module(compacted) == compacted
+
+def test_compact_update_only_touches_given_fields():
+    assert compact_placed_module_update({"position": {"x": 1.0, "y": 2.0}}) == {"position": {"x": 1, "y": 2}}
+    assert compact_placed_module_update({"module": {"id": "a"}, "rotation": "180"}) == {"module_id": "a", "rotation": 180}
+
+def test_update_keeps_legacy_embedded_module_until_a_module_id_is_stored():
+    legacy = {"_id": ObjectId(), "module": {"_id": ObjectId(), "id": "server_rack_100"}, "position": {"x": 0, "y": 0}}
+
+    assert placed_module_update({"position": {"x": 1, "y": 2}}) == {"$set": {"position": {"x": 1, "y": 2}}}
+    assert placed_module_update({"position": {"x": 1, "y": 2}}, legacy) == {
+        "$set": {"position": {"x": 1, "y": 2}, "module_id": "server_rack_100"},
+        "$unset": {"module": ""}
+    }
+    assert placed_module_update({"module_id": "a"}, legacy) == {"$set": {"module_id": "a"}, "$unset": {"module": ""}}
+
+class FakeCollection:
+    def __init__(self, document):
+        self.document = document
+
+    async def find_one(self, query, projection=None):
+        return dict(self.document) if query["_id"] == self.document["_id"] else None
+
+    async def update_one(self, query, update):
+        self.document.update(update["$set"])
+        for field in update.get("$unset", {}):
+            self.document.pop(field, None)
+
+class FakePlacedModuleRepository(AsyncPlacedModuleRepository):
+    def __init__(self, document):
+        self.fake_collection = FakeCollection(document)
+
+    @property
+    def collection(self):
+        return self.fake_collection
+
+def test_position_patch_migrates_a_legacy_embedded_module():
+    legacy = {"_id": ObjectId(), "datacenter_id": "dc", "module": {"_id": ObjectId(), "id": "server_rack_100", "price": 100},
+              "position": {"x": 0, "y": 0}, "rotation": 0}
+    repository = FakePlacedModuleRepository(legacy)
+
+    asyncio.run(repository.update(str(legacy["_id"]), {"position": {"x": 40, "y": 80}}))
+
+    assert legacy["module_id"] == "server_rack_100" and "module" not in legacy
+    assert legacy["position"] == {"x": 40, "y": 80}
+
+def test_stored_placed_modules_keeps_module_on_caller_documents():
+    module = {"id": "server_rack_100", "price": 100}
+    placed_modules = [{"module": module, "module_id": "server_rack_100", "position": {"x": 0, "y": 0}, "rotation": 0}]
+
+    stored = stored_placed_modules("dc", placed_modules)
+
+    assert "module" not in stored[0]
+    assert placed_modules[0]["module"] is module
+    assert stored[0]["_id"] == placed_modules[0]["_id"]
+    assert stored[0]["datacenter_id"] == "dc"
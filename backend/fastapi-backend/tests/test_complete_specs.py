@@ -0,0 +1,253 @@
+import asyncio
+import random
+from bson import ObjectId
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pymongo import UpdateOne
+from app.routers import datacenter_spec
+from app.repositories.datacenter_spec_repository import (
+    AsyncDatacenterSpecRepository, complete_spec_operations, merge_datacenter_specs, revision_claims
+)
+
+def matches(document, query):
+    for field, condition in query.items():
+        if field == "$or":
+            if not any(matches(document, branch) for branch in condition):
+                return False
+        elif isinstance(condition, dict) and "$in" in condition:
+            if document.get(field) not in condition["$in"]:
+                return False
+        elif isinstance(condition, dict) and "$not" in condition:
+            if document.get(field) is not None and document[field] >= condition["$not"]["$gte"]:
+                return False
+        elif document.get(field) != condition:
+            return False
+    return True
+
+def update_parts(operation):
+    """(filter, update, upsert) of an UpdateOne; pymongo keeps them private, so only read them here"""
+    return operation._filter, operation._doc, operation._upsert
+
+class Result:
+    def __init__(self, **counts):
+        self.inserted_id = counts.get("inserted_id")
+        self.inserted_ids = counts.get("inserted_ids", [])
+        self.matched_count = counts.get("matched_count", 0)
+        self.modified_count = counts.get("modified_count", 0)
+        self.deleted_count = counts.get("deleted_count", 0)
+
+class FakeCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def sort(self, keys):
+        for field, direction in reversed(keys):
+            self.documents.sort(key=lambda document: document[field], reverse=direction < 0)
+        return self
+
+    async def to_list(self, length):
+        return self.documents
+
+class FakeCollection:
+    """In-memory stand-in for the few AsyncCollection calls the repository makes"""
+
+    def __init__(self):
+        self.documents = []
+
+    def find(self, query=None, projection=None):
+        return FakeCursor([dict(document) for document in self.documents if matches(document, query or {})], )
+
+    async def find_one(self, query, projection=None):
+        found = await self.find(query).to_list(None)
+        return found[0] if found else None
+
+    async def insert_one(self, document):
+        document = dict(document, _id=document.get("_id", ObjectId()))
+        self.documents.append(document)
+        return Result(inserted_id=document["_id"])
+
+    async def insert_many(self, documents):
+        return Result(inserted_ids=[(await self.insert_one(document)).inserted_id for document in documents])
+
+    async def update_one(self, query, update, upsert=False):
+        for document in self.documents:
+            if matches(document, query):
+                document.update(update.get("$set", {}))
+                for field, amount in update.get("$inc", {}).items():
+                    document[field] = document.get(field, 0) + amount
+                return Result(matched_count=1, modified_count=1)
+        if upsert:
+            document = {field: value for field, value in query.items() if not isinstance(value, dict)}
+            self.documents.append(document)
+            return await self.update_one(query, update)
+        return Result()
+
+    async def delete_one(self, query):
+        for document in self.documents:
+            if matches(document, query):
+                self.documents.remove(document)
+                return Result(deleted_count=1)
+        return Result()
+
+    async def delete_many(self, query):
+        deleted = [document for document in self.documents if matches(document, query)]
+        self.documents = [document for document in self.documents if document not in deleted]
+        return Result(deleted_count=len(deleted))
+
+    async def bulk_write(self, operations, ordered=True):
+        for operation in operations:
+            await self.update_one(*update_parts(operation))
+
+class FakeSpecRepository(AsyncDatacenterSpecRepository):
+    def __init__(self):
+        self.rows = FakeCollection()
+        self.complete = FakeCollection()
+
+    @property
+    def collection(self):
+        return self.rows
+
+    @property
+    def complete_collection(self):
+        return self.complete
+
+def spec_row(component_id, unit, amount):
+    return {"ID": component_id, "Name": f"{component_id}_name", "Below_Amount": 0, "Above_Amount": 0,
+            "Minimize": 0, "Maximize": 0, "Unconstrained": 0, "Unit": unit, "Amount": amount}
+
+def assert_consistent(repository):
+    component_ids = {row["ID"] for row in repository.rows.documents}
+    # Components whose rows were all deleted keep their revision with no spec
+    materialized = {document["_id"]: document["spec"] for document in repository.complete.documents if document["spec"]}
+
+    assert set(materialized) == component_ids
+    for component_id in component_ids:
+        live_rows = [row for row in repository.rows.documents if row["ID"] == component_id]
+        assert materialized[component_id] == merge_datacenter_specs(live_rows)
+
+def test_complete_specs_follow_every_write():
+    async def scenario():
+        rng = random.Random(0)
+        repository = FakeSpecRepository()
+        units = ["Space_X", "Space_Y", "Data storage", "Processing", "Price", "Grid_Connection"]
+
+        await repository.bulk_create([spec_row(f"spec_{i % 3}", unit, rng.randint(0, 50)) for i, unit in enumerate(units * 2)])
+        assert_consistent(repository)
+
+        for step in range(60):
+            action = rng.choice(("create", "update", "delete"))
+            row_ids = [str(row["_id"]) for row in repository.rows.documents]
+            if action == "create" or not row_ids:
+                await repository.create(spec_row(f"spec_{rng.randrange(4)}", rng.choice(units), rng.randint(0, 50)))
+            elif action == "update":
+                await repository.update(rng.choice(row_ids), spec_row(f"spec_{rng.randrange(4)}", rng.choice(units), rng.randint(0, 50)))
+            else:
+                await repository.delete(rng.choice(row_ids))
+            assert_consistent(repository)
+
+        await repository.delete_all()
+        assert repository.complete.documents == []
+
+    asyncio.run(scenario())
+
+def test_complete_spec_is_served_from_the_materialized_document():
+    async def scenario():
+        repository = FakeSpecRepository()
+        await repository.bulk_create([spec_row("Server_Square", "Space_X", 100), spec_row("Server_Square", "Processing", 7)])
+
+        complete_spec = await repository.get_complete_datacenter_spec("Server_Square")
+        # Served without touching the rows collection
+        repository.rows.documents = []
+
+        assert await repository.get_complete_datacenter_spec("Server_Square") == complete_spec
+        assert complete_spec["processing"] == 7
+        assert complete_spec["constraints"]["space_x"] == {
+            "amount": 100, "below": False, "above": False, "minimize": False, "maximize": False, "unconstrained": False
+        }
+        assert await repository.get_complete_datacenter_spec("missing") is None
+
+    asyncio.run(scenario())
+
+def test_the_oldest_row_is_the_base_record_whatever_order_rows_are_stored_in():
+    async def scenario():
+        repository = FakeSpecRepository()
+        first, second = ObjectId(), ObjectId()
+        # Stored newest first, as an index in Unit order could return them
+        await repository.bulk_create([dict(spec_row("spec", "Processing", 7), _id=second), dict(spec_row("spec", "Space_X", 100), _id=first)])
+
+        materialized = await repository.get_complete_datacenter_spec("spec")
+        from_rows = await repository.get_complete_datacenter_spec(str(first))
+
+        assert materialized["id"] == from_rows["id"] == str(first)
+        assert materialized["processing"] == 7 and "space_x" not in materialized
+
+    asyncio.run(scenario())
+
+def test_an_older_refresh_landing_last_does_not_win():
+    async def scenario():
+        repository = FakeSpecRepository()
+        await repository.bulk_create([spec_row("spec", "Space_X", 100)])
+
+        # Hold the first write's refresh after it read the rows, until a second write is done
+        held, waiting = asyncio.Event(), []
+        bulk_write = repository.complete.bulk_write
+
+        async def held_bulk_write(operations, ordered=True):
+            if "$set" in update_parts(operations[0])[1] and not waiting:
+                waiting.append(operations)
+                await held.wait()
+            await bulk_write(operations, ordered)
+
+        repository.complete.bulk_write = held_bulk_write
+        first = asyncio.create_task(repository.create(spec_row("spec", "Processing", 1)))
+        while not waiting:
+            await asyncio.sleep(0)
+        await repository.create(spec_row("spec", "Processing", 2))
+        held.set()
+        await first
+
+        assert_consistent(repository)
+        assert (await repository.get_complete_datacenter_spec("spec"))["processing"] == 2
+
+    asyncio.run(scenario())
+
+def test_complete_spec_operations_only_replace_older_revisions():
+    revisions = {"kept": 3, "gone": 5}
+    operations = complete_spec_operations(["kept", "gone", "unclaimed"], [{"_id": ObjectId(), "ID": "kept", "Unit": "Price", "Amount": 1}], revisions)
+
+    assert operations[1] == UpdateOne({"_id": "gone", "spec_revision": {"$not": {"$gte": 5}}}, {"$set": {"spec": None, "spec_revision": 5}})
+    assert len(operations) == 2
+    assert revision_claims(["kept"]) == [UpdateOne({"_id": "kept"}, {"$inc": {"revision": 1}}, upsert=True)]
+
+    async def scenario():
+        collection = FakeCollection()
+        collection.documents.append({"_id": "kept", "revision": 4, "spec_revision": 4, "spec": {"price": 2}})
+        await collection.bulk_write(operations[:1])
+        # A refresh of an older revision does not overwrite a newer one
+        assert collection.documents[0]["spec"] == {"price": 2}
+
+    asyncio.run(scenario())
+
+def test_solve_rebuilds_complete_specs_materialized_without_constraints(monkeypatch):
+    repository = FakeSpecRepository()
+    asyncio.run(repository.bulk_create([spec_row("Server_Square", "Space_X", 100), spec_row("Server_Square", "Processing", 7)]))
+    # Materialized by an older version, without the constraints map (nor, here, the ID)
+    spec = dict(repository.complete.documents[0]["spec"])
+    del spec["constraints"], spec["ID"]
+    repository.complete.documents[0]["spec"] = spec
+
+    class FakeSolver:
+        async def solve(self, complete_spec):
+            return {"constraints": sorted(complete_spec["constraints"])}, False
+
+    monkeypatch.setattr(datacenter_spec, "datacenter_spec_repo", repository)
+    monkeypatch.setattr(datacenter_spec, "module_mix_solver", FakeSolver())
+    app = FastAPI()
+    app.include_router(datacenter_spec.router)
+
+    response = TestClient(app).post("/datacenter-specs/Server_Square/solve")
+
+    assert response.status_code == 200
+    assert response.json()["constraints"] == ["processing", "space_x"]
+    assert response.json()["component_id"] == "Server_Square"
+    assert "constraints" in repository.complete.documents[0]["spec"]
@@ -0,0 +1,213 @@
+import asyncio
+import pytest
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+from app.repositories.datacenter_repository import AsyncDatacenterRepository, LayoutConflict, page_pipeline
+
+class FakeCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    async def to_list(self, length):
+        return self.documents
+
+class FakeCollection:
+    """Runs the page stages of a datacenter page pipeline over in-memory documents"""
+
+    def __init__(self, documents):
+        self.documents = documents
+        self.pipelines = []
+        self.writes = []
+        self.bulk_result = WriteResult()
+
+    async def aggregate(self, pipeline):
+        self.pipelines.append(pipeline)
+        documents = list(self.documents)
+        for stage in pipeline:
+            if "$match" in stage:
+                documents = [document for document in documents if document["_id"] > stage["$match"]["_id"]["$gt"]]
+            elif "$sort" in stage:
+                documents.sort(key=lambda document: document["_id"])
+            elif "$skip" in stage:
+                documents = documents[stage["$skip"]:]
+            elif "$limit" in stage:
+                documents = documents[:stage["$limit"]]
+        return FakeCursor(documents)
+
+    async def estimated_document_count(self):
+        return len(self.documents)
+
+    async def insert_one(self, document, session=None):
+        document.setdefault("_id", ObjectId())
+        self.documents.append(dict(document))
+        return InsertResult(document["_id"])
+
+    async def insert_many(self, documents, ordered=True, session=None):
+        self.documents.extend(documents)
+
+    async def update_one(self, query, update, session=None):
+        matched = [document for document in self.documents if matches(document, query)][:1]
+        for document in matched:
+            for key, step in update.get("$inc", {}).items():
+                document[key] = document.get(key, 0) + step
+            document.update(update.get("$set", {}))
+        return WriteResult(matched_count=len(matched))
+
+    async def count_documents(self, query, session=None):
+        return sum(1 for document in self.documents if matches(document, query))
+
+    async def bulk_write(self, writes, ordered=True, session=None):
+        """Records the writes and answers with the preset result or error"""
+        self.writes.append(writes)
+        if isinstance(self.bulk_result, Exception):
+            raise self.bulk_result
+        return self.bulk_result
+
+def matches(document, query):
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(matches(document, option) for option in condition):
+                return False
+        elif isinstance(condition, dict) and "$in" in condition:
+            if document.get(key) not in condition["$in"]:
+                return False
+        elif isinstance(condition, dict) and "$exists" in condition:
+            if (key in document) != condition["$exists"]:
+                return False
+        elif document.get(key) != condition:
+            return False
+    return True
+
+class InsertResult:
+    def __init__(self, inserted_id):
+        self.inserted_id = inserted_id
+
+class WriteResult:
+    def __init__(self, matched_count=0, modified_count=0, deleted_count=0):
+        self.matched_count = matched_count
+        self.modified_count = modified_count
+        self.deleted_count = deleted_count
+
+class FakeDatacenterRepository(AsyncDatacenterRepository):
+    def __init__(self, documents):
+        self.datacenters = FakeCollection(documents)
+        self.placed_modules = FakeCollection([])
+
+    @property
+    def collection(self):
+        return self.datacenters
+
+    @property
+    def placed_modules_collection(self):
+        return self.placed_modules
+
+    async def _run_write(self, operation):
+        return await operation(None)
+
+def test_page_stages_lead_the_pipeline_and_modules_are_looked_up_after_the_limit():
+    after = str(ObjectId())
+    pipeline = page_pipeline(5, 10, after, {"name": 1}, include_modules=True)
+
+    assert pipeline[:4] == [{"$match": {"_id": {"$gt": ObjectId(after)}}}, {"$sort": {"_id": 1}}, {"$skip": 5}, {"$limit": 10}]
+    assert pipeline[4] == {"$project": {"name": 1}}
+    assert [next(iter(stage)) for stage in pipeline[5:]] == ["$addFields", "$lookup", "$project"]
+    assert page_pipeline(0, 10) == [{"$sort": {"_id": 1}}, {"$limit": 10}]
+
+def test_cursor_pages_walk_the_collection_in_id_order():
+    async def scenario():
+        documents = [{"_id": ObjectId(), "name": f"dc_{i}"} for i in range(7)]
+        repository = FakeDatacenterRepository(list(reversed(documents)))
+
+        names, cursor = [], None
+        while True:
+            page = await repository.list_page(limit=3, after=cursor)
+            assert page["total"] == 7
+            names.extend(datacenter["name"] for datacenter in page["datacenters"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+            assert cursor == str(page["datacenters"][-1]["_id"])
+
+        assert names == [f"dc_{i}" for i in range(7)]
+        # A short page ends the walk; a full last page is followed by an empty one
+        exact = await repository.list_page(limit=7)
+        assert exact["next_cursor"] == str(documents[-1]["_id"])
+        assert await repository.list_page(limit=7, after=exact["next_cursor"]) == {"total": 7, "datacenters": [], "next_cursor": None}
+
+        # skip applies after the cursor
+        page = await repository.list_page(skip=1, limit=2, after=str(documents[2]["_id"]))
+        assert [datacenter["name"] for datacenter in page["datacenters"]] == ["dc_4", "dc_5"]
+        assert all("$facet" not in stage for pipeline in repository.datacenters.pipelines for stage in pipeline)
+
+    asyncio.run(scenario())
+
+def test_create_stores_modules_separately_and_hands_them_back():
+    async def scenario():
+        repository = FakeDatacenterRepository([])
+        module = {"module_id": "server_rack", "module": {"id": "server_rack", "dim": [40, 40]}, "position": {"x": 1, "y": 2}, "rotation": 0}
+        datacenter = {"name": "dc", "modules": [module]}
+
+        datacenter_id = await repository.create(datacenter)
+
+        assert "modules" not in repository.datacenters.documents[0]
+        assert datacenter["modules"] == [module] and str(datacenter["_id"]) == datacenter_id
+        assert module["datacenter_id"] == datacenter_id
+        assert [stored["_id"] for stored in repository.placed_modules.documents] == [module["_id"]]
+
+    asyncio.run(scenario())
+
+def layout_fixture(version):
+    datacenter = {"_id": ObjectId(), "name": "dc", "layout_version": version}
+    repository = FakeDatacenterRepository([datacenter])
+    placed_id = ObjectId()
+    repository.placed_modules.documents.append({"_id": placed_id, "datacenter_id": str(datacenter["_id"])})
+    return repository, datacenter, str(placed_id)
+
+def test_layout_delta_bumps_the_version_once_the_writes_succeed():
+    async def scenario():
+        repository, datacenter, placed_id = layout_fixture(3)
+        repository.placed_modules.bulk_result = WriteResult(matched_count=1, modified_count=1)
+
+        summary = await repository.apply_layout_delta(str(datacenter["_id"]), 3, [
+            {"op": "rotate", "placed_module_id": placed_id, "rotation": 90}
+        ])
+
+        assert summary == {"version": 4, "inserted_ids": [], "modified": 1, "deleted": 0}
+        assert datacenter["layout_version"] == 4
+        # A stale version writes nothing
+        assert await repository.apply_layout_delta(str(datacenter["_id"]), 3, []) is None
+        assert len(repository.placed_modules.writes) == 1
+
+    asyncio.run(scenario())
+
+def test_layout_delta_on_missing_placed_modules_conflicts_without_writing():
+    async def scenario():
+        repository, datacenter, placed_id = layout_fixture(3)
+
+        with pytest.raises(LayoutConflict):
+            await repository.apply_layout_delta(str(datacenter["_id"]), 3, [
+                {"op": "remove", "placed_module_id": placed_id},
+                {"op": "remove", "placed_module_id": str(ObjectId())}
+            ])
+
+        assert repository.placed_modules.writes == []
+        assert datacenter["layout_version"] == 3
+
+    asyncio.run(scenario())
+
+def test_layout_delta_releases_the_version_when_the_bulk_write_fails():
+    async def scenario():
+        repository, datacenter, placed_id = layout_fixture(0)
+        del datacenter["layout_version"]
+        repository.placed_modules.bulk_result = BulkWriteError({"writeErrors": [{"index": 0, "code": 121}], "nInserted": 0, "nMatched": 0, "nRemoved": 0})
+        operations = [{"op": "move", "placed_module_id": placed_id, "position": {"x": 1, "y": 1}}]
+
+        with pytest.raises(BulkWriteError):
+            await repository.apply_layout_delta(str(datacenter["_id"]), 0, operations)
+        assert datacenter["layout_version"] == 0
+
+        # The same version can be retried
+        repository.placed_modules.bulk_result = WriteResult(matched_count=1, modified_count=1)
+        assert (await repository.apply_layout_delta(str(datacenter["_id"]), 0, operations))["version"] == 1
+
+    asyncio.run(scenario())
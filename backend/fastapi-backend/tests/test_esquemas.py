@@ -0,0 +1,30 @@
+from bson import ObjectId
+from DB.esquemas.esquema_modules import module_esquema
+from DB.esquemas.esquema_placed_modules import placed_module_esquema, placed_modules_esquema
+from tests.esquema_reference import legacy_module_esquema, synthetic_modules
+
+def test_module_esquema_matches_original_converter():
+    modules = synthetic_modules(300) + [
+        {"_id": ObjectId(), "ID": "legacy", "Name": "Server_Rack", "type": "server"},
+        {"id": "only_modern", "Processing": 5, "processing": 3, "Space_X": 1},
+        {"_id": ObjectId(), "Description": "x", "description": "y", "Data_Storage": 7},
+        {}
+    ]
+
+    for module in modules:
+        expected = legacy_module_esquema(module)
+        actual = module_esquema(module)
+        assert actual == expected
+        assert list(actual) == list(expected)
+
+def test_module_esquema_handles_none():
+    assert module_esquema(None) is None
+
+def test_placed_modules_esquema_converts_shared_modules_once():
+    module = {"_id": ObjectId(), "id": "server_rack_100", "price": 100}
+    placed_modules = [{"_id": ObjectId(), "module_id": "server_rack_100", "module": module, "position": {"x": i, "y": 0}} for i in range(3)]
+
+    result = placed_modules_esquema(placed_modules)
+
+    assert result[0]["module"] is result[2]["module"]
+    assert result == [placed_module_esquema(pm) for pm in placed_modules]
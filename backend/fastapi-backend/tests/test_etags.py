@@ -0,0 +1,65 @@
+from bson import ObjectId
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from app.core.etags import make_etag, etag_matches
+from app.routers import datacenters
+
+class FakeDatacenterRepository:
+    def __init__(self, datacenter):
+        self.datacenter = datacenter
+        self.module_loads = 0
+
+    async def get_by_id(self, id, include_modules=True, projection=None, module_projection=None, hydrate=True):
+        datacenter = dict(self.datacenter)
+        if include_modules:
+            self.module_loads += 1
+            datacenter["modules"] = [{"_id": ObjectId(), "module_id": "server_rack_100", "position": {"x": 0, "y": 0}, "rotation": 0}]
+        return datacenter
+
+    async def attach_modules(self, datacenter, module_projection=None, hydrate=True):
+        return await self.get_by_id(datacenter["_id"])
+
+def request_with(if_none_match=None):
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "headers": headers})
+
+def test_make_etag_is_quoted_and_deterministic():
+    etag = make_etag("datacenter", "abc", 3)
+
+    assert etag.startswith('"') and etag.endswith('"')
+    assert etag == make_etag("datacenter", "abc", 3)
+    assert etag != make_etag("datacenter", "abc", 4)
+
+def test_etag_matches_lists_wildcards_and_weak_prefixes():
+    etag = make_etag("x")
+
+    assert etag_matches(request_with(etag), etag)
+    assert etag_matches(request_with(f'"other", W/{etag}'), etag)
+    assert etag_matches(request_with("*"), etag)
+    assert not etag_matches(request_with('"other"'), etag)
+    assert not etag_matches(request_with(), etag)
+
+def test_simple_view_revalidates_without_loading_placed_modules(monkeypatch):
+    repository = FakeDatacenterRepository({"_id": ObjectId(), "name": "DC", "updated_at": "2025-05-03T12:00:00", "layout_version": 2})
+    monkeypatch.setattr(datacenters, "datacenter_repo", repository)
+
+    app = FastAPI()
+    app.include_router(datacenters.router)
+    client = TestClient(app)
+    url = f"/datacenters/{repository.datacenter['_id']}/simple"
+
+    response = client.get(url)
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    assert repository.module_loads == 1
+
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert repository.module_loads == 1
+
+    repository.datacenter["layout_version"] = 3
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert repository.module_loads == 2
@@ -0,0 +1,87 @@
+import itertools
+import numpy as np
+from app.services.exploration import DesignExplorer, ExplorationProblem
+from app.services.exploration_worker import SharedArrays, attached_arrays, pareto_front
+
+CATALOG = [
+    {"id": "transformer", "grid_connection": 1, "dim": [20, 20], "price": 1000, "usable_power": 100},
+    {"id": "server_rack", "dim": [10, 10], "price": 3000, "usable_power": -50, "processing": 100},
+    {"id": "data_rack", "dim": [10, 10], "price": 1000, "usable_power": -20, "data_storage": 100},
+    # Larger than the floor
+    {"id": "server_hall", "dim": [500, 500], "price": 1, "processing": 10000},
+]
+
+STYLE = {"name": "Small Squares", "grid_connection": 2, "water_connection": 1, "price": 20000,
+         "processing": 100, "data_storage": -1, "dim": [100, 100]}
+
+def dominated(values, other):
+    return np.all(other <= values) and np.any(other < values)
+
+def test_pareto_front_matches_pairwise_dominance():
+    rng = np.random.default_rng(4)
+    for count in (0, 1, 30, 300):
+        values = rng.integers(0, 6, (count, 3)).astype(float)
+        front = pareto_front(values)
+
+        expected = {tuple(row) for row in values if not any(dominated(row, other) for other in values)}
+        assert sorted(tuple(row) for row in values[front]) == sorted(expected)
+
+def test_problem_bounds_and_shared_arrays():
+    problem = ExplorationProblem(CATALOG, STYLE, max_count=4)
+
+    # Two grid connections cap the transformers; the hall does not fit the floor
+    assert problem.module_ids == ["transformer", "server_rack", "data_rack"]
+    assert problem.upper.tolist() == [2, 4, 4]
+    assert problem.space == 3 * 5 * 5
+
+    shared = SharedArrays(problem.arrays())
+    try:
+        arrays = attached_arrays(shared.spec)
+        for key, array in problem.arrays().items():
+            assert np.array_equal(arrays[key], array)
+    finally:
+        shared.close()
+
+def test_small_spaces_are_enumerated_across_workers():
+    problem = ExplorationProblem(CATALOG, STYLE, max_count=4)
+    explorer = DesignExplorer(None, workers=2)
+    try:
+        result = explorer.run(problem, time_budget=30)
+    finally:
+        explorer.shutdown()
+
+    # Every mix within the bounds, by brute force
+    feasible = []
+    for transformers, servers, data in itertools.product(range(3), range(5), range(5)):
+        price = 1000 * transformers + 3000 * servers + 1000 * data
+        power = 100 * transformers - 50 * servers - 20 * data
+        area = 400 * transformers + 100 * (servers + data)
+        if transformers <= 2 and price <= 20000 and 100 * servers >= 100 and power >= 0 and area <= 10000:
+            feasible.append(np.array([price, -100 * servers, -100 * data, area], dtype=float))
+    expected = {tuple(values) for values in feasible if not any(dominated(values, other) for other in feasible)}
+
+    assert result["exhaustive"] and result["complete"] and result["stopped"] == "exhausted"
+    assert result["evaluated"] == 75 and result["feasible"] == len(feasible)
+    assert {
+        (entry["metrics"]["price"], -entry["metrics"]["processing"], -entry["metrics"]["data_storage"], entry["metrics"]["area"])
+        for entry in result["front"]
+    } == expected
+
+def test_sampling_stops_at_max_mixes_or_patience():
+    # Without a price cap on a large floor the space is too big to enumerate
+    problem = ExplorationProblem(CATALOG, {**STYLE, "price": -1, "dim": [1000, 1000]}, max_count=10000)
+    explorer = DesignExplorer(None, workers=2)
+    try:
+        sampled = explorer.run(problem, max_mixes=50000, time_budget=30, limit=3)
+        patient = explorer.run(problem, time_budget=30, patience=2)
+    finally:
+        explorer.shutdown()
+
+    assert not sampled["exhaustive"] and sampled["complete"] and sampled["stopped"] == "max_mixes"
+    assert sampled["evaluated"] == 50000 and len(sampled["front"]) <= 3
+    # Every mix on the front is feasible
+    for entry in sampled["front"]:
+        metrics = entry["metrics"]
+        assert metrics["usable_power"] >= 0 and metrics["grid_connection"] <= 2 and metrics["processing"] >= 100
+
+    assert patient["stopped"] == "patience" and not patient["complete"]
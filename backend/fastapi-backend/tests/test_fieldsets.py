@@ -0,0 +1,57 @@
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+from app.core.fieldsets import (
+    DATACENTER_STYLE_FIELDS, PLACED_MODULE_FIELDS, DatacenterFieldset, module_projection, parse_fields, projection, select_fields
+)
+from DB.esquemas.esquema_datacenters import datacenter_esquema
+
+def test_parse_fields_rejects_unknown_names():
+    assert parse_fields(None, PLACED_MODULE_FIELDS) is None
+    assert parse_fields(" position, rotation ,", PLACED_MODULE_FIELDS) == ["position", "rotation"]
+
+    with pytest.raises(HTTPException) as error:
+        parse_fields("position,colour", PLACED_MODULE_FIELDS)
+    assert error.value.status_code == 400
+
+    with pytest.raises(HTTPException):
+        parse_fields("position.x", PLACED_MODULE_FIELDS)
+
+def test_projection_reads_legacy_spellings():
+    assert projection(["name", "dim"], DATACENTER_STYLE_FIELDS) == {"_id": 1, "name": 1, "Name": 1, "dim": 1, "Space_X": 1, "Space_Y": 1}
+    assert projection(None, DATACENTER_STYLE_FIELDS) is None
+
+def test_module_projection_reads_legacy_spellings_and_any_other_field():
+    assert module_projection(None) is None
+    assert module_projection(["dim", "usable_power", "custom"]) == {
+        "_id": 1, "id": 1, "dim": 1, "Space_X": 1, "Space_Y": 1, "usable_power": 1, "Usable_Power": 1, "custom": 1
+    }
+
+def test_datacenter_fieldset_pushes_module_fields_down():
+    fieldset = DatacenterFieldset("name,modules.position,modules.module_id")
+
+    assert fieldset.projection == {"_id": 1, "name": 1}
+    assert fieldset.include_modules
+    assert fieldset.module_projection == {"_id": 1, "position": 1, "module_id": 1}
+    assert not fieldset.hydrate
+
+    datacenter = {
+        "_id": ObjectId(),
+        "name": "DC",
+        "modules": [{"_id": ObjectId(), "module_id": "server_rack_100", "position": {"x": 1, "y": 2}}]
+    }
+    row = fieldset.select(datacenter_esquema(datacenter))
+
+    assert set(row) == {"id", "name", "modules"}
+    assert row["modules"][0] == {"id": str(datacenter["modules"][0]["_id"]), "position": {"x": 1, "y": 2}, "module_id": "server_rack_100"}
+
+def test_datacenter_fieldset_without_modules_skips_placed_modules():
+    fieldset = DatacenterFieldset("name,style_id")
+
+    assert not fieldset.include_modules
+    assert set(fieldset.select(datacenter_esquema({"_id": ObjectId(), "name": "DC"}))) == {"id", "name", "style_id"}
+
+def test_select_fields_is_a_no_op_without_fieldset():
+    row = {"id": "a", "x": 1}
+
+    assert select_fields(row, None) is row
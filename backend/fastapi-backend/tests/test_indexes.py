@@ -0,0 +1,30 @@
+from DB.indexes import INDEXES, HOT_PATH_QUERIES, index_names, plan_stages, uses_collection_scan
+
+def test_plan_stages_walks_nested_plans():
+    plan = {
+        "stage": "FETCH",
+        "inputStage": {
+            "stage": "OR",
+            "inputStages": [
+                {"stage": "IXSCAN"},
+                {"stage": "COLLSCAN"}
+            ]
+        }
+    }
+    assert list(plan_stages(plan)) == ["FETCH", "OR", "IXSCAN", "COLLSCAN"]
+
+def test_uses_collection_scan():
+    indexed = {"queryPlanner": {"winningPlan": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN"}}}}
+    scanned = {"queryPlanner": {"winningPlan": {"queryPlan": {"stage": "COLLSCAN"}}}}
+
+    assert not uses_collection_scan(indexed)
+    assert uses_collection_scan(scanned)
+
+def test_every_hot_path_collection_declares_indexes():
+    for collection_name, query in HOT_PATH_QUERIES:
+        assert index_names(collection_name), collection_name
+
+def test_index_names_are_unique_per_collection():
+    for collection_name in INDEXES:
+        names = index_names(collection_name)
+        assert len(names) == len(set(names))
@@ -0,0 +1,72 @@
+import asyncio
+import numpy as np
+from bson import ObjectId
+from app.routers.datacenters import DatacenterCreateSimple
+from app.services.layout import GRID_CELL_SIZE, FootprintTable, Layout
+
+CATALOG = [
+    {"_id": ObjectId(), "id": "server_rack", "dim": [40, 20]},
+    {"_id": ObjectId(), "ID": "legacy", "Name": "Transformer_1", "Space_X": 30, "Space_Y": 50},
+    {"_id": ObjectId(), "id": "water_chiller", "dim": [20, 20]},
+]
+
+def test_footprint_table_rotates_like_the_designer():
+    table = FootprintTable(CATALOG)
+
+    widths, heights = table.rotated(np.array([0, 0, 0, 0, 1]), np.array([0, 90, 180, 270, 0]))
+
+    assert widths.tolist() == [40, 20, 40, 20, 30]
+    assert heights.tolist() == [20, 40, 20, 40, 50]
+    assert table.ids[1] == "legacy"
+
+def test_layout_from_cursor_resolves_each_module_once(static_catalog, async_rows):
+    async def scenario():
+        catalog = static_catalog(CATALOG)
+        rows = [
+            {"_id": ObjectId(), "module_id": "server_rack", "position": {"x": 1, "y": 2}, "rotation": 90},
+            {"_id": ObjectId(), "module_id": "SERVER_RACK", "position": {"x": 10, "y": 0}, "rotation": 0},
+            {"_id": ObjectId(), "module_id": "unknown", "position": {"x": 0, "y": 0}, "rotation": 0},
+            {"_id": ObjectId(), "module_id": "legacy", "position": {"x": 5.0, "y": 5}, "rotation": -90},
+        ]
+        layout = await Layout.from_cursor(async_rows(rows), catalog)
+
+        assert len(layout) == 3
+        assert layout.missing == ["unknown"]
+        assert layout.placed_module_ids == [str(rows[i]["_id"]) for i in (0, 1, 3)]
+        assert layout.module_index.tolist() == [0, 0, 1]
+        assert layout.rotation.tolist() == [90, 0, 270]
+        assert layout.width.tolist() == [20, 40, 50]
+        assert layout.height.tolist() == [40, 20, 30]
+        assert layout.left.tolist() == [GRID_CELL_SIZE, 10 * GRID_CELL_SIZE, 5 * GRID_CELL_SIZE]
+        assert layout.right.tolist() == [GRID_CELL_SIZE + 20, 10 * GRID_CELL_SIZE + 40, 5 * GRID_CELL_SIZE + 50]
+
+    asyncio.run(scenario())
+
+def test_layout_from_simple_payload_round_trips(static_catalog):
+    async def scenario():
+        catalog = static_catalog(CATALOG)
+        request = DatacenterCreateSimple(styleId="style", modules=[
+            {"id": "server_rack", "position": {"x": 0, "y": 0}, "rotation": 180},
+            {"id": "water_chiller", "position": {"x": 4, "y": 0}},
+        ])
+        layout = await Layout.from_simple(request.modules, catalog)
+
+        assert layout.missing == []
+        assert layout.placed_module_ids is None
+        assert layout.to_module_positions() == [
+            {"id": "server_rack", "position": {"x": 0, "y": 0}, "rotation": 180},
+            {"id": "water_chiller", "position": {"x": 4, "y": 0}, "rotation": 0},
+        ]
+
+    asyncio.run(scenario())
+
+def test_footprint_table_is_rebuilt_only_when_the_catalog_reloads(static_catalog):
+    async def scenario():
+        catalog = static_catalog(CATALOG)
+        table = await catalog.footprints()
+
+        assert await catalog.footprints() is table
+        catalog.invalidate()
+        assert await catalog.footprints() is not table
+
+    asyncio.run(scenario())
@@ -0,0 +1,34 @@
+from bson import ObjectId
+from pymongo import InsertOne, UpdateOne, DeleteOne
+from app.repositories.datacenter_repository import build_layout_delta_writes
+
+def test_move_and_rotate_fold_into_one_update():
+    target = str(ObjectId())
+    writes = build_layout_delta_writes("dc", [
+        {"op": "move", "placed_module_id": target, "position": {"x": 10, "y": 20}},
+        {"op": "rotate", "placed_module_id": target, "rotation": 90}
+    ])
+
+    assert writes == [
+        UpdateOne(
+            {"_id": ObjectId(target), "datacenter_id": "dc"},
+            {"$set": {"position": {"x": 10, "y": 20}, "rotation": 90}}
+        )
+    ]
+
+def test_remove_supersedes_earlier_edits():
+    target = str(ObjectId())
+    writes = build_layout_delta_writes("dc", [
+        {"op": "move", "placed_module_id": target, "position": {"x": 1, "y": 1}},
+        {"op": "remove", "placed_module_id": target}
+    ])
+
+    assert writes == [DeleteOne({"_id": ObjectId(target), "datacenter_id": "dc"})]
+
+def test_add_assigns_datacenter_and_id():
+    document = {"module_id": "server_rack_100", "position": {"x": 0, "y": 0}, "rotation": 0}
+    writes = build_layout_delta_writes("dc", [{"op": "add", "document": document}])
+
+    assert len(writes) == 1 and isinstance(writes[0], InsertOne)
+    assert document["datacenter_id"] == "dc"
+    assert isinstance(document["_id"], ObjectId)
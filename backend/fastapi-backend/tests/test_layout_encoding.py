@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+from bson import ObjectId
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.routers import datacenters
+from app.services.layout_encoding import HEADER, LAYOUT_MEDIA_TYPE, decode_layout, decode_layout_modules, encode_layout
+
+def placed(module_id, x, y, rotation=0):
+    return {"_id": ObjectId(), "module_id": module_id, "position": {"x": x, "y": y}, "rotation": rotation}
+
+def test_layout_round_trips_through_the_decoder():
+    placed_modules = [
+        placed("server_rack_100", 0, 0),
+        placed("transformer_100", -40, 120, 90),
+        placed("server_rack_100", 2_000_000, 7, 270),
+        {"_id": ObjectId(), "module": {"id": "water_supply_100"}, "position": {"x": 5, "y": 5}, "rotation": 180},
+        {"_id": ObjectId(), "position": {"x": 1, "y": 1}}
+    ]
+
+    data = encode_layout(placed_modules, layout_version=7)
+    layout = decode_layout(data)
+
+    assert layout["layout_version"] == 7
+    assert layout["dictionary"] == ["server_rack_100", "transformer_100", "water_supply_100"]
+    assert layout["module_index"].tolist() == [0, 1, 0, 2]
+    assert decode_layout_modules(data) == [
+        {"id": "server_rack_100", "position": {"x": 0, "y": 0}, "rotation": 0},
+        {"id": "transformer_100", "position": {"x": -40, "y": 120}, "rotation": 90},
+        {"id": "server_rack_100", "position": {"x": 2_000_000, "y": 7}, "rotation": 270},
+        {"id": "water_supply_100", "position": {"x": 5, "y": 5}, "rotation": 180}
+    ]
+
+def test_int32_columns_are_aligned_for_typed_arrays():
+    data = encode_layout([placed("a", 1, 2), placed("bcd", 3, 4), placed("a", 5, 6)])
+    layout = decode_layout(data)
+    start = np.frombuffer(data, dtype="u1").ctypes.data
+
+    for column in ("module_index", "x", "y"):
+        assert (layout[column].ctypes.data - start) % 4 == 0
+
+def test_empty_layout_encodes_to_the_header():
+    data = encode_layout([])
+
+    assert len(data) == HEADER.size
+    assert decode_layout_modules(data) == []
+
+def test_partial_rotations_and_foreign_bodies_are_rejected():
+    with pytest.raises(ValueError):
+        encode_layout([placed("a", 0, 0, 45)])
+
+    with pytest.raises(ValueError):
+        decode_layout(b"JSON" + bytes(HEADER.size))
+
+def test_module_ids_with_separators_round_trip():
+    ids = ["rack\nwith newline", "", "ünïcode ✓", "rack\nwith newline"]
+    data = encode_layout([placed(module_id, i, i) for i, module_id in enumerate(ids)] + [placed("plain", 9, 9)])
+
+    # Modules without an ID are skipped, so the empty one is not in the dictionary
+    assert decode_layout(data)["dictionary"] == ["rack\nwith newline", "ünïcode ✓", "plain"]
+    assert [row["id"] for row in decode_layout_modules(data)] == ["rack\nwith newline", "ünïcode ✓", "rack\nwith newline", "plain"]
+
+def test_positions_outside_int32_are_rejected():
+    for position in ((2 ** 31, 0), (0, -2 ** 31 - 1)):
+        with pytest.raises(ValueError):
+            encode_layout([placed("a", *position)])
+
+    data = encode_layout([placed("a", 2 ** 31 - 1, -2 ** 31)])
+    assert decode_layout_modules(data)[0]["position"] == {"x": 2 ** 31 - 1, "y": -2 ** 31}
+
+def test_binary_layout_endpoint(monkeypatch):
+    class FakeDatacenterRepository:
+        async def get_by_id(self, id, include_modules=True, projection=None, module_projection=None, hydrate=True):
+            datacenter = {"_id": ObjectId(id), "updated_at": "2025-05-03T12:00:00", "layout_version": 3}
+            if include_modules:
+                datacenter["modules"] = [placed("server_rack_100", 10, 20, 90)]
+            return datacenter
+
+    monkeypatch.setattr(datacenters, "datacenter_repo", FakeDatacenterRepository())
+    app = FastAPI()
+    app.include_router(datacenters.router)
+
+    response = TestClient(app).get(f"/datacenters/{ObjectId()}/layout")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == LAYOUT_MEDIA_TYPE
+    assert "etag" in response.headers
+    assert decode_layout(response.content)["layout_version"] == 3
+    assert decode_layout_modules(response.content) == [{"id": "server_rack_100", "position": {"x": 10, "y": 20}, "rotation": 90}]
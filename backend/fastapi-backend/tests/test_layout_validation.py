@@ -0,0 +1,75 @@
+import asyncio
+import numpy as np
+from bson import ObjectId
+from app.routers.datacenters import DatacenterCreateSimple
+from app.services.layout import Layout
+from app.services.layout_validation import overlapping_pairs, validate_additions, validate_layout
+
+CATALOG = [
+    {"_id": ObjectId(), "id": "server_rack", "dim": [40, 20]},
+    {"_id": ObjectId(), "id": "water_chiller", "dim": [20, 20]},
+]
+
+def all_pairs(left, top, right, bottom):
+    return [
+        [i, j] for i in range(len(left)) for j in range(i + 1, len(left))
+        if left[i] < right[j] and left[j] < right[i] and top[i] < bottom[j] and top[j] < bottom[i]
+        and right[i] > left[i] and bottom[i] > top[i] and right[j] > left[j] and bottom[j] > top[j]
+    ]
+
+def test_sweep_finds_the_same_pairs_as_an_all_pairs_check():
+    rng = np.random.default_rng(3)
+    for count in (0, 1, 2, 40, 400):
+        left = rng.integers(-5, 60, count) * 10
+        top = rng.integers(-5, 60, count) * 10
+        # Mixed sizes, empty footprints and a few tall ones spanning many strips
+        right = left + rng.choice((0, 10, 20, 40, 300), count)
+        bottom = top + rng.choice((0, 10, 30, 50, 400), count)
+
+        expected = all_pairs(left, top, right, bottom)
+        assert overlapping_pairs(left, top, right, bottom).tolist() == expected
+        assert overlapping_pairs(left, top, right, bottom, chunk_candidates=3).tolist() == expected
+
+def test_touching_modules_do_not_overlap():
+    left, top = np.array([0, 40, 0]), np.array([0, 0, 20])
+    assert overlapping_pairs(left, top, left + 40, top + 20).tolist() == []
+
+def test_report_labels_issues_by_request_index(static_catalog):
+    async def scenario():
+        catalog = static_catalog(CATALOG)
+        request = DatacenterCreateSimple(styleId="style", modules=[
+            {"id": "server_rack", "position": {"x": 0, "y": 0}},
+            {"id": "unknown", "position": {"x": 0, "y": 0}},
+            {"id": "water_chiller", "position": {"x": 3, "y": 1}},
+            {"id": "server_rack", "position": {"x": 9, "y": 0}, "rotation": 90},
+        ])
+        report = validate_layout(await Layout.from_simple(request.modules, catalog), (100, 100))
+
+        assert not report.valid
+        assert report.to_dict() == {
+            "valid": False, "overlap_count": 1, "out_of_bounds_count": 1,
+            "overlaps": [[0, 2]], "out_of_bounds": [3], "truncated": False
+        }
+        assert report.to_dict(limit=0)["truncated"]
+
+    asyncio.run(scenario())
+
+def test_additions_only_report_issues_they_cause(static_catalog, async_rows):
+    async def scenario():
+        catalog = static_catalog(CATALOG)
+        existing = [
+            {"_id": ObjectId(), "module_id": "server_rack", "position": {"x": 0, "y": 0}, "rotation": 0},
+            {"_id": ObjectId(), "module_id": "server_rack", "position": {"x": 1, "y": 0}, "rotation": 0},
+            {"_id": ObjectId(), "module_id": "server_rack", "position": {"x": 20, "y": 0}, "rotation": 0},
+        ]
+        imported = [
+            {"id": "new_1", "module": {"id": "water_chiller"}, "position": {"x": 4, "y": 0}, "rotation": 0},
+            {"id": "new_2", "module": {"id": "water_chiller"}, "position": {"x": 0, "y": 5}, "rotation": 0},
+        ]
+        report = await validate_additions(async_rows(existing), imported, (100, 100), catalog)
+
+        # The existing racks overlap each other and leave the floor, but that is not the import's doing
+        assert report.to_dict()["overlaps"] == [[str(existing[1]["_id"]), "new_1"]]
+        assert report.to_dict()["out_of_bounds"] == []
+
+    asyncio.run(scenario())
@@ -0,0 +1,127 @@
+import asyncio
+import random
+from bson import ObjectId
+from app.services.metrics import MetricsEngine, module_attributes
+
+CATALOG = [
+    {"_id": ObjectId(), "id": "transformer_100", "grid_connection": 1, "dim": [40, 40], "price": 1000, "usable_power": 100},
+    {"_id": ObjectId(), "id": "water_supply_100", "water_connection": 1, "dim": [50, 50], "price": 200, "fresh_water": 100},
+    {"_id": ObjectId(), "id": "server_rack_100", "dim": [40, 40], "price": 5000, "usable_power": -75,
+     "chilled_water": -15, "fresh_water": -10, "processing": 100, "data_storage": 10},
+    {"_id": ObjectId(), "ID": "legacy_rack", "Name": "Server_Rack", "Space_X": 20, "Space_Y": 10, "Usable_Power": -30, "Price": 700},
+]
+
+STYLE = {"_id": ObjectId(), "name": "Server Squares", "grid_connection": 2, "water_connection": 1,
+         "price": 20000, "processing": 250, "data_storage": -1, "dim": [1000, 500]}
+
+def datacenter(version=0):
+    return {"_id": "dc", "style_id": str(STYLE["_id"]), "dim": [200, 100], "grid_connection": 2,
+            "water_connection": 1, "layout_version": version}
+
+def test_module_attributes_read_modern_legacy_and_unit_rows():
+    assert module_attributes(CATALOG[0]) == {"price": 1000, "usable_power": 100, "grid_connection": 1, "area": 1600}
+    assert module_attributes(CATALOG[3]) == {"price": 700, "usable_power": -30, "area": 200}
+    assert module_attributes({"ID": "1", "Name": "Transformer_1", "Is_Input": 1, "Is_Output": 0, "Unit": "Grid_Connection", "Amount": 1}) == {"grid_connection": -1}
+    assert module_attributes({"ID": "1", "Name": "Transformer_1", "Is_Input": 0, "Is_Output": 1, "Unit": "Usable_Power", "Amount": 100}) == {"usable_power": 100}
+
+def test_metrics_total_balance_and_check_the_style(static_catalog, placed_repository, placed):
+    async def scenario():
+        modules = [placed("transformer_100", 0, 0), placed("water_supply_100", 5, 0), placed("server_rack_100", 0, 5),
+                   placed("server_rack_100", 4, 5), placed("legacy_rack", 10, 0), placed("missing", 0, 0)]
+        engine = MetricsEngine(static_catalog(CATALOG), placed_repository(modules))
+        metrics = (await engine.get("dc", datacenter())).to_dict(datacenter(), STYLE)
+
+        assert metrics["module_count"] == 5
+        assert metrics["missing_modules"] == ["missing"]
+        assert metrics["totals"]["price"] == 1000 + 200 + 2 * 5000 + 700
+        assert metrics["balances"]["usable_power"] == {"supply": 100, "demand": 180, "balance": -80}
+        assert metrics["balances"]["fresh_water"] == {"supply": 100, "demand": 20, "balance": 80}
+        assert not metrics["balanced"]
+
+        constraints = metrics["constraints"]
+        assert constraints["grid_connection"] == {"kind": "max", "limit": 2, "value": 1, "slack": 1, "satisfied": True}
+        assert constraints["processing"]["slack"] == -50 and not constraints["processing"]["satisfied"]
+        assert constraints["data_storage"]["limit"] is None
+        assert constraints["area"]["slack"] == 200 * 100 - (1600 + 2500 + 2 * 1600 + 200)
+        assert not metrics["satisfied"]
+
+    asyncio.run(scenario())
+
+def test_incremental_updates_match_a_rebuild(static_catalog, placed_repository, placed):
+    async def scenario():
+        rng = random.Random(5)
+        catalog = static_catalog(CATALOG)
+        repository = placed_repository([])
+        engine = MetricsEngine(catalog, repository)
+        module_ids = ["transformer_100", "water_supply_100", "server_rack_100", "legacy_rack"]
+
+        version = 0
+        await engine.get("dc", datacenter(version))
+        for _ in range(40):
+            if repository.placed_modules and rng.random() < 0.4:
+                removed = repository.placed_modules.pop(rng.randrange(len(repository.placed_modules)))
+                changes = {removed["module_id"]: -1}
+            else:
+                repository.placed_modules.append(placed(rng.choice(module_ids), 0, 0))
+                changes = {repository.placed_modules[-1]["module_id"]: 1}
+            await engine.apply("dc", changes, version, version + 1)
+            version += 1
+
+        reads = repository.reads
+        incremental = (await engine.get("dc", datacenter(version))).to_dict(datacenter(), STYLE)
+        assert repository.reads == reads
+
+        rebuilt = await MetricsEngine(catalog, repository).get("dc", datacenter(version))
+        assert incremental == rebuilt.to_dict(datacenter(), STYLE)
+
+        # A write the engine did not see makes the next read rebuild
+        await engine.apply("dc", {"transformer_100": 1}, version - 1, version + 1)
+        await engine.get("dc", datacenter(version + 1))
+        assert repository.reads == reads + 2
+
+    asyncio.run(scenario())
+
+def test_apply_tolerates_the_entry_being_dropped_during_the_catalog_read(static_catalog, placed_repository, placed):
+    async def scenario():
+        catalog = static_catalog(CATALOG)
+        repository = placed_repository([placed("server_rack_100", 0, 0)])
+        engine = MetricsEngine(catalog, repository)
+        await engine.get("dc", datacenter(0))
+        resolve_footprints = catalog.resolve_footprints
+
+        async def forgetting_resolve(changes):
+            engine.forget("dc")
+            return await resolve_footprints(changes)
+
+        catalog.resolve_footprints = forgetting_resolve
+        # Would otherwise drop the entry itself, since the change is not in the catalog
+        await engine.apply("dc", {"unknown": 1, "server_rack_100": -5}, 0, 1)
+
+        # Nothing cached is left, so the next read rebuilds
+        await engine.get("dc", datacenter(1))
+        assert repository.reads == 2
+
+    asyncio.run(scenario())
+
+def unit_row(unit, amount, is_input=0, is_output=0):
+    return {"_id": ObjectId(), "ID": "T100", "Name": "Transformer_100", "Is_Input": is_input, "Is_Output": is_output, "Unit": unit, "Amount": amount}
+
+def test_legacy_unit_rows_count_as_one_module_and_caps_use_magnitudes(static_catalog, placed_repository, placed):
+    # The transformer_100 of CATALOG stored as one row per unit; inputs are negative amounts
+    rows = [unit_row("Grid_Connection", 1, is_input=1), unit_row("Usable_Power", 100, is_output=1),
+            unit_row("Price", 1000, is_input=1), unit_row("Space_X", 40), unit_row("Space_Y", 40)]
+
+    async def scenario():
+        # Placed by legacy ID and by the ObjectId of a later row
+        legacy = [placed("T100", 0, 0) for _ in range(4)] + [placed(str(rows[2]["_id"]), 0, 0)]
+        modern = [placed("transformer_100", 0, 0) for _ in range(5)]
+        legacy_metrics = (await MetricsEngine(static_catalog(CATALOG + rows), placed_repository(legacy)).get("dc", datacenter())).to_dict(datacenter(), STYLE)
+        modern_metrics = (await MetricsEngine(static_catalog(CATALOG), placed_repository(modern)).get("dc", datacenter())).to_dict(datacenter(), STYLE)
+
+        assert legacy_metrics["totals"] == modern_metrics["totals"]
+        assert legacy_metrics["balances"] == modern_metrics["balances"]
+        assert legacy_metrics["constraints"] == modern_metrics["constraints"]
+        assert legacy_metrics["constraints"]["grid_connection"] == {"kind": "max", "limit": 2, "value": 5, "slack": -3, "satisfied": False}
+        assert legacy_metrics["totals"]["price"] == 5000 and legacy_metrics["totals"]["area"] == 5 * 1600
+
+    asyncio.run(scenario())
@@ -0,0 +1,129 @@
+import asyncio
+from bson import ObjectId
+from app.services.module_catalog import ModuleCatalog
+
+class StaticModuleRepository:
+    def __init__(self, modules):
+        self.modules = modules
+        self.loads = 0
+
+    async def get_all(self):
+        self.loads += 1
+        return list(self.modules)
+
+def test_catalog_resolves_every_id_form_from_one_load():
+    legacy = {"_id": ObjectId(), "ID": "42", "Name": "Legacy"}
+    modern = {"_id": ObjectId(), "id": "Server_Rack_100"}
+    repository = StaticModuleRepository([legacy, modern])
+    catalog = ModuleCatalog(repository)
+
+    async def scenario():
+        assert (await catalog.get("Server_Rack_100"))["id"] == "Server_Rack_100"
+        assert (await catalog.get("server_rack_100"))["id"] == "Server_Rack_100"
+        assert (await catalog.get(str(legacy["_id"])))["Name"] == "Legacy"
+        assert (await catalog.get("42"))["Name"] == "Legacy"
+        assert await catalog.get("missing") is None
+
+    asyncio.run(scenario())
+
+    assert repository.loads == 1
+    assert catalog.stats()["misses"] == 1
+    assert catalog.stats()["hits"] == 4
+
+def test_invalidate_bumps_version_and_reloads():
+    repository = StaticModuleRepository([{"_id": ObjectId(), "id": "a"}])
+    catalog = ModuleCatalog(repository)
+
+    async def scenario():
+        await catalog.all()
+        version = catalog.version
+        repository.modules.append({"_id": ObjectId(), "id": "b"})
+        catalog.invalidate()
+
+        assert catalog.version == version + 1
+        assert await catalog.get("b") is not None
+
+    asyncio.run(scenario())
+
+    assert repository.loads == 2
+
+def test_get_returns_copies_by_default():
+    repository = StaticModuleRepository([{"_id": ObjectId(), "id": "a"}])
+    catalog = ModuleCatalog(repository)
+
+    async def scenario():
+        module = await catalog.get("a")
+        module["_id"] = str(module["_id"])
+        return await catalog.get("a", copy=False)
+
+    assert isinstance(asyncio.run(scenario())["_id"], ObjectId)
+
+def test_fingerprint_follows_catalog_content():
+    module = {"_id": ObjectId(), "id": "server_rack_100", "price": 100}
+    repository = StaticModuleRepository([module])
+
+    async def fingerprints():
+        first = await ModuleCatalog(repository).fingerprint()
+        second = await ModuleCatalog(repository).fingerprint()
+        repository.modules = [{**module, "price": 200}]
+        changed = await ModuleCatalog(repository).fingerprint()
+        return first, second, changed
+
+    first, second, changed = asyncio.run(fingerprints())
+
+    assert first == second
+    assert first != changed
+
+class FailingStream:
+    """Change stream that yields `events` changes, then fails"""
+
+    def __init__(self, events):
+        self.events = events
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.events:
+            raise RuntimeError("resume point no longer in the oplog")
+        self.events -= 1
+        return {"operationType": "update"}
+
+class FlakyCollection:
+    def __init__(self, streams):
+        self.streams = streams
+        self.opened = 0
+
+    async def watch(self):
+        self.opened += 1
+        if not self.streams:
+            await asyncio.Event().wait()
+        events = self.streams.pop(0)
+        if events is None:
+            raise RuntimeError("not a replica set")
+        return FailingStream(events)
+
+def test_watch_survives_stream_errors_and_invalidates_on_recovery():
+    catalog = ModuleCatalog(StaticModuleRepository([]))
+    # Opening fails, then a stream delivers two changes and fails, then one more stream
+    collection = FlakyCollection([None, 2, 1])
+
+    async def scenario():
+        task = asyncio.create_task(catalog.watch(collection, initial_backoff=0.001, max_backoff=0.004))
+        while collection.streams:
+            await asyncio.sleep(0.001)
+        await asyncio.sleep(0.02)
+        assert not task.done()
+        task.cancel()
+
+    asyncio.run(scenario())
+
+    assert collection.opened == 4
+    # 3 changes, 3 stops and 2 reopened streams
+    assert catalog.version == 8
@@ -0,0 +1,72 @@
+from bson import ObjectId
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pymongo.errors import BulkWriteError
+from app.routers import modules
+
+class FakeCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    async def to_list(self, length=None):
+        return list(self.documents)
+
+class FakeCollection:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def find(self, query):
+        ids = set(query["_id"]["$in"])
+        # Unordered, like a find without a sort
+        return FakeCursor([document for document in reversed(self.documents) if document["_id"] in ids])
+
+class FakeModuleRepository:
+    def __init__(self):
+        self.collection = FakeCollection([])
+
+    async def bulk_create(self, documents):
+        for document in documents:
+            if any(stored["id"] == document["id"] for stored in self.collection.documents):
+                raise BulkWriteError({
+                    "writeErrors": [{"index": 0, "code": 11000, "errmsg": f"E11000 duplicate key error dup key: {{ id: \"{document['id']}\" }}"}],
+                    "nInserted": 0,
+                })
+            self.collection.documents.append({"_id": ObjectId(), **document})
+        return [str(document["_id"]) for document in self.collection.documents[-len(documents):]]
+
+def client_with(monkeypatch, repository):
+    monkeypatch.setattr(modules, "module_repo", repository)
+    app = FastAPI()
+    app.include_router(modules.router)
+    return TestClient(app)
+
+def test_json_import_returns_stored_documents_in_request_order(monkeypatch):
+    client = client_with(monkeypatch, FakeModuleRepository())
+
+    response = client.post("/modules/json-import", json={"modules": [
+        {"id": "transformer_100", "dim": [40, 40], "price": 1000},
+        {"id": "server_rack_100", "dim": [40, 40], "processing": 100},
+    ]})
+
+    assert response.status_code == 201
+    body = response.json()
+    assert body["imported_count"] == 2
+    assert [module["id"] for module in body["modules"]] == ["transformer_100", "server_rack_100"]
+    # Stored documents as written, with the _id as a string
+    assert ObjectId.is_valid(body["modules"][0]["_id"])
+    assert body["modules"][0]["price"] == 1000 and "processing" not in body["modules"][0]
+
+def test_json_import_rejects_duplicate_ids_with_409(monkeypatch):
+    client = client_with(monkeypatch, FakeModuleRepository())
+    payload = {"modules": [{"id": "transformer_100", "dim": [40, 40]}]}
+
+    assert client.post("/modules/json-import", json=payload).status_code == 201
+    response = client.post("/modules/json-import", json=payload)
+
+    assert response.status_code == 409
+    assert "transformer_100" in response.json()["detail"]
+
+def test_json_import_rejects_an_empty_list_with_400(monkeypatch):
+    client = client_with(monkeypatch, FakeModuleRepository())
+
+    assert client.post("/modules/json-import", json={"modules": []}).status_code == 400
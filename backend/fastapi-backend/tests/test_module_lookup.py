@@ -0,0 +1,32 @@
+from bson import ObjectId
+from app.repositories.module_repository import module_lookup_keys, module_id_query, pick_module_match
+
+def test_lookup_keys_fold_in_legacy_id():
+    assert module_lookup_keys({"id": "Server_Rack_100"}) == ["server_rack_100"]
+    assert module_lookup_keys({"ID": "42"}) == ["42"]
+    assert module_lookup_keys({"id": "a", "ID": "A"}) == ["a"]
+
+def test_query_is_a_single_indexed_lookup():
+    assert module_id_query("Transformer_100") == {"lookup_keys": "transformer_100"}
+
+    object_id = ObjectId()
+    assert module_id_query(str(object_id)) == {
+        "$or": [{"lookup_keys": str(object_id)}, {"_id": object_id}]
+    }
+
+def test_regex_metacharacters_are_not_special():
+    assert module_id_query("rack.*") == {"lookup_keys": "rack.*"}
+
+def test_pick_follows_historical_precedence():
+    exact = {"_id": ObjectId(), "id": "rack"}
+    case_insensitive = {"_id": ObjectId(), "id": "RACK"}
+    legacy = {"_id": ObjectId(), "ID": "rack"}
+
+    assert pick_module_match("rack", [legacy, case_insensitive, exact]) is exact
+    assert pick_module_match("rack", [legacy, case_insensitive]) is case_insensitive
+    assert pick_module_match("rack", [legacy]) is legacy
+    assert pick_module_match("Rack", [legacy]) is None
+
+def test_pick_by_object_id():
+    module = {"_id": ObjectId(), "ID": "7"}
+    assert pick_module_match(str(module["_id"]), [module]) is module
@@ -0,0 +1,73 @@
+import asyncio
+import json
+from bson import ObjectId
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from app.core.responses import ndjson_chunks, ndjson_response, wants_ndjson
+from DB.esquemas.esquema_positions import positions_esquema
+
+class FakeCursor:
+    """Async iterable standing in for an AsyncCursor"""
+
+    def __init__(self, documents):
+        self.documents = documents
+        self.closed = False
+
+    async def __aiter__(self):
+        for document in self.documents:
+            yield document
+
+    async def close(self):
+        self.closed = True
+
+def positions(count):
+    return [{"_id": ObjectId(), "x": i, "y": i, "datacenter_id": "dc"} for i in range(count)]
+
+def collect(cursor, convert, batch_size):
+    async def run():
+        return [chunk async for chunk in ndjson_chunks(cursor, convert, batch_size)]
+    return asyncio.run(run())
+
+def test_ndjson_chunks_convert_one_batch_at_a_time():
+    cursor = FakeCursor(positions(5))
+    batch_sizes = []
+
+    def convert(batch):
+        batch_sizes.append(len(batch))
+        return positions_esquema(batch)
+
+    chunks = collect(cursor, convert, batch_size=2)
+
+    assert batch_sizes == [2, 2, 1]
+    lines = b"".join(chunks).decode().splitlines()
+    assert [json.loads(line)["x"] for line in lines] == [0, 1, 2, 3, 4]
+    assert cursor.closed
+
+def test_ndjson_chunks_accept_coroutine_converters():
+    async def convert(batch):
+        return positions_esquema(batch)
+
+    chunks = collect(FakeCursor(positions(3)), convert, batch_size=10)
+
+    assert len(chunks) == 1
+    assert chunks[0].count(b"\n") == 3
+
+def test_streaming_is_opt_in():
+    app = FastAPI()
+
+    @app.get("/positions")
+    async def list_positions(request: Request, stream: bool = False):
+        if wants_ndjson(request, stream):
+            return ndjson_response(FakeCursor(positions(3)), positions_esquema)
+        return positions_esquema(positions(3))
+
+    client = TestClient(app)
+
+    assert client.get("/positions").headers["content-type"] == "application/json"
+
+    response = client.get("/positions", headers={"Accept": "application/x-ndjson"})
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert len(response.text.splitlines()) == 3
+
+    response = client.get("/positions?stream=true")
+    assert response.headers["content-type"] == "application/x-ndjson"
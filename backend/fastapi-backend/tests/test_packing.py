@@ -0,0 +1,58 @@
+import numpy as np
+from bson import ObjectId
+from app.services.layout import FootprintTable
+from app.services.layout_validation import overlapping_pairs, validate_layout
+from app.services.packing import footprint_counts, pack_modules
+
+CATALOG = [{"id": f"module_{i}", "dim": dim} for i, dim in enumerate(
+    [[40, 40], [50, 50], [100, 100], [150, 100], [300, 100], [20, 40], [35, 15]]
+)]
+
+def test_packed_layouts_are_valid_and_keep_their_clearance():
+    footprints = FootprintTable(CATALOG)
+    rng = np.random.default_rng(2)
+    for clearance, aisle in ((0, 0), (10, 0), (5, 20)):
+        counts = {index: int(rng.integers(0, 60)) for index in range(len(CATALOG))}
+        result = pack_modules(counts, footprints, (1000, 800), clearance, aisle)
+        layout = result.layout
+
+        assert validate_layout(layout, result.dim).valid
+        assert len(layout) + sum(result.unplaced.values()) == sum(counts.values())
+        # Modules widened by the padding still do not overlap
+        padded = overlapping_pairs(layout.left, layout.top, layout.right + clearance, layout.bottom + clearance + aisle)
+        assert len(padded) == 0
+
+def test_modules_are_rotated_to_fit():
+    footprints = FootprintTable([{"id": "tall", "dim": [10, 30]}])
+    result = pack_modules({0: 1}, footprints, (30, 10))
+
+    assert result.layout.to_module_positions() == [{"id": "tall", "position": {"x": 0, "y": 0}, "rotation": 90}]
+    assert result.fill_ratio == 1.0
+
+def test_modules_that_do_not_fit_are_reported_and_packing_is_deterministic():
+    footprints = FootprintTable(CATALOG)
+    result = pack_modules({0: 10, 2: 1}, footprints, (100, 140))
+
+    # The 100x100 module goes first and leaves a 100x40 strip, room for two 40x40 ones
+    assert result.to_dict() == {"placed": 3, "unplaced": {"module_0": 8}, "fill_ratio": round((10000 + 2 * 1600) / 14000, 4)}
+    again = pack_modules({2: 1, 0: 10}, footprints, (100, 140))
+    assert again.layout.to_module_positions() == result.layout.to_module_positions()
+
+def test_footprint_counts_merge_id_forms_and_report_missing_ids():
+    footprints = FootprintTable(CATALOG)
+    modules = {"module_0": CATALOG[0], "MODULE-0": CATALOG[0], "module_2": CATALOG[2], "unknown": None}
+
+    counts, missing = footprint_counts({"module_0": 2, "MODULE-0": 3, "module_2": 0, "unknown": 1}, modules, footprints)
+    assert counts == {0: 5}
+    assert missing == ["unknown"]
+
+def test_legacy_modules_keep_their_id_in_generated_layouts():
+    legacy = {"_id": ObjectId(), "ID": 7, "Name": "Transformer_7", "Space_X": 40, "Space_Y": 40}
+    footprints = FootprintTable(CATALOG + [legacy])
+
+    counts, missing = footprint_counts({"7": 3}, {"7": legacy}, footprints)
+    result = pack_modules(counts, footprints, (80, 40))
+
+    assert missing == []
+    assert [module["id"] for module in result.layout.to_module_positions()] == ["7", "7"]
+    assert result.to_dict()["unplaced"] == {"7": 1}
@@ -0,0 +1,35 @@
+from bson import ObjectId
+from app.repositories.placed_module_repository import _module_batch_query, _attach_modules
+
+def test_batch_query_collects_distinct_references():
+    object_id = ObjectId()
+    placed_modules = [
+        {"module_id": "server_rack_100"},
+        {"module_id": "server_rack_100"},
+        {"module_id": str(object_id)},
+        {"module_id": "transformer_100", "module": {"id": "transformer_100"}}
+    ]
+
+    query = _module_batch_query(placed_modules)
+
+    assert sorted(query["$or"][0]["id"]["$in"]) == sorted(["server_rack_100", str(object_id)])
+    assert query["$or"][1] == {"_id": {"$in": [object_id]}}
+
+def test_batch_query_skips_hydrated_modules():
+    assert _module_batch_query([{"module_id": "a", "module": {"id": "a"}}]) is None
+
+def test_attach_modules_prefers_string_id_then_object_id():
+    object_id = ObjectId()
+    by_string = {"_id": ObjectId(), "id": "server_rack_100"}
+    by_object_id = {"_id": object_id, "Name": "legacy"}
+    placed_modules = [
+        {"module_id": "server_rack_100"},
+        {"module_id": str(object_id)},
+        {"module_id": "missing"}
+    ]
+
+    _attach_modules(placed_modules, [by_string, by_object_id])
+
+    assert placed_modules[0]["module"] is by_string
+    assert placed_modules[1]["module"] is by_object_id
+    assert "module" not in placed_modules[2]
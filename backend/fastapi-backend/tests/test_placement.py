@@ -0,0 +1,110 @@
+import asyncio
+import random
+from bson import ObjectId
+from app.services.layout import GRID_CELL_SIZE
+from app.services.placement import TILE_CELLS, OccupancyGrid, PlacementEngine
+
+CATALOG = [
+    {"_id": ObjectId(), "id": "server_rack", "dim": [40, 20]},
+    {"_id": ObjectId(), "id": "water_chiller", "dim": [20, 20]},
+    {"_id": ObjectId(), "id": "transformer", "dim": [30, 50]},
+]
+
+def brute_force_fits(placed_modules, dims, module_id, x, y, rotation, floor, moving=None):
+    """Pairwise rectangle test with the designer's rotation rule"""
+    def rect(module_id, x, y, rotation):
+        width, height = dims[module_id]
+        if rotation % 180:
+            width, height = height, width
+        return x * GRID_CELL_SIZE, y * GRID_CELL_SIZE, width, height
+
+    left, top, width, height = rect(module_id, x, y, rotation)
+    if left < 0 or top < 0 or left + width > floor[0] or top + height > floor[1]:
+        return False
+    for other in placed_modules:
+        if other is moving:
+            continue
+        other_left, other_top, other_width, other_height = rect(other["module_id"], other["position"]["x"], other["position"]["y"], other["rotation"])
+        if left < other_left + other_width and other_left < left + width and top < other_top + other_height and other_top < top + height:
+            return False
+    return True
+
+def test_grid_counts_cells_across_tile_boundaries():
+    grid = OccupancyGrid(2000, 2000, 10)
+    edge = (TILE_CELLS - 1) * 10
+    grid.add((edge, edge, 30, 30))
+
+    assert len(grid.tiles) == 4
+    assert not grid.is_free((edge + 20, edge + 20, 10, 10))
+    assert grid.is_free((edge + 30, edge, 10, 10))
+
+    grid.add((edge, edge, 30, 30))
+    grid.remove((edge, edge, 30, 30))
+    assert not grid.is_free((edge, edge, 10, 10))
+    grid.remove((edge, edge, 30, 30))
+    assert grid.tiles == {}
+    # Removing again never underflows
+    grid.remove((edge, edge, 30, 30))
+    assert grid.is_free((edge, edge, 30, 30))
+
+def test_checks_report_each_rejection_reason(static_catalog, placed_repository, placed):
+    async def scenario():
+        rack = placed("server_rack", 0, 0)
+        engine = PlacementEngine(static_catalog(CATALOG), placed_repository([rack]))
+        datacenter = {"dim": [100, 100], "layout_version": 3}
+
+        assert (await engine.check("dc", datacenter, "water_chiller", 4, 0)).valid
+        assert (await engine.check("dc", datacenter, "water_chiller", 3, 1)).reason == "overlap"
+        assert (await engine.check("dc", datacenter, "server_rack", 7, 0)).reason == "out_of_bounds"
+        assert (await engine.check("dc", datacenter, "server_rack", 8, 0, rotation=90)).valid
+        assert (await engine.check("dc", datacenter, "missing", 0, 0)).reason == "unknown_module"
+        # A module moved onto its own footprint does not collide with itself
+        moved = await engine.check("dc", datacenter, "server_rack", 1, 0, moving=rack)
+        assert moved.valid and moved.replaces == (0, 0, 40, 20)
+        assert (await engine.check("dc", datacenter, "water_chiller", 1, 0)).reason == "overlap"
+
+        assert moved.to_dict()["footprint"] == {"width": 40, "height": 20}
+
+    asyncio.run(scenario())
+
+def test_commit_updates_the_cached_grid_only_for_the_next_version(static_catalog, placed_repository, placed):
+    async def scenario():
+        repository = placed_repository([])
+        engine = PlacementEngine(static_catalog(CATALOG), repository)
+
+        check = await engine.check("dc", {"layout_version": 0}, "water_chiller", 0, 0)
+        repository.placed_modules.append(placed("water_chiller", 0, 0))
+        engine.commit("dc", check, 1)
+
+        assert (await engine.check("dc", {"layout_version": 1}, "water_chiller", 1, 1)).reason == "overlap"
+        assert repository.reads == 1
+
+        # A version the engine did not produce forces a rebuild
+        stale = await engine.check("dc", {"layout_version": 1}, "water_chiller", 5, 5)
+        engine.commit("dc", stale, 3)
+        await engine.check("dc", {"layout_version": 3}, "water_chiller", 5, 5)
+        assert repository.reads == 2
+
+    asyncio.run(scenario())
+
+def test_checks_match_pairwise_rectangle_tests(static_catalog, placed_repository, placed):
+    async def scenario():
+        rng = random.Random(7)
+        dims = {module["id"]: tuple(module["dim"]) for module in CATALOG}
+        floor = (300, 200)
+        placed_modules = [
+            placed(rng.choice(list(dims)), rng.randrange(30), rng.randrange(20), rng.choice((0, 90, 180, 270)))
+            for _ in range(12)
+        ]
+        engine = PlacementEngine(static_catalog(CATALOG), placed_repository(placed_modules))
+        datacenter = {"dim": list(floor), "layout_version": 0}
+
+        for _ in range(500):
+            module_id = rng.choice(list(dims))
+            x, y, rotation = rng.randrange(-2, 32), rng.randrange(-2, 22), rng.choice((0, 90, 180, 270))
+            moving = rng.choice(placed_modules + [None])
+            check = await engine.check("dc", datacenter, module_id, x, y, rotation, moving)
+
+            assert check.valid == brute_force_fits(placed_modules, dims, module_id, x, y, rotation, floor, moving)
+
+    asyncio.run(scenario())
@@ -0,0 +1,74 @@
+import gzip
+import json
+from datetime import datetime
+from bson import ObjectId
+from fastapi import FastAPI, Response
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from app.core.compression import CompressionMiddleware, choose_encoding
+from app.core.responses import FastJSONResponse
+
+def test_fast_json_response_serializes_object_ids_and_datetimes():
+    object_id = ObjectId()
+    created_at = datetime(2025, 5, 3, 12, 30)
+
+    body = FastJSONResponse({"_id": object_id, "created_at": created_at, "tags": {"a"}}).body
+
+    assert json.loads(body) == {"_id": str(object_id), "created_at": "2025-05-03T12:30:00", "tags": ["a"]}
+
+def test_choose_encoding_honours_quality_values():
+    assert choose_encoding("gzip, deflate, br", brotli_available=True) == "br"
+    assert choose_encoding("gzip, deflate, br", brotli_available=False) == "gzip"
+    assert choose_encoding("br;q=0.5, gzip", brotli_available=True) == "gzip"
+    assert choose_encoding("gzip;q=0, *;q=0.1", brotli_available=False) == "identity"
+    assert choose_encoding("*", brotli_available=True) == "br"
+    assert choose_encoding("", brotli_available=True) == "identity"
+
+def test_compression_middleware_respects_minimum_size():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=1000, gzip_level=6, brotli_quality=4)
+
+    @app.get("/large")
+    async def large():
+        return FastJSONResponse([{"x": i, "y": i} for i in range(1000)])
+
+    @app.get("/small")
+    async def small():
+        return FastJSONResponse({"ok": True})
+
+    client = TestClient(app)
+
+    response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.json()[999] == {"x": 999, "y": 999}
+
+    response = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+
+    response = client.get("/large", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+
+def test_compression_middleware_streams_and_skips_encoded_responses():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=100)
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for i in range(50):
+                yield json.dumps({"i": i}).encode() + b"\n"
+        return StreamingResponse(chunks(), media_type="application/x-ndjson")
+
+    @app.get("/encoded")
+    async def encoded():
+        return Response(gzip.compress(b"x" * 1000), headers={"Content-Encoding": "gzip"})
+
+    client = TestClient(app)
+
+    response = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert [json.loads(line)["i"] for line in response.text.splitlines()] == list(range(50))
+
+    response = client.get("/encoded", headers={"Accept-Encoding": "gzip"})
+    assert response.content == b"x" * 1000
@@ -0,0 +1,106 @@
+from bson import ObjectId
+from pymongo import ReplaceOne
+from DB.esquemas.esquema_modules import module_esquema, modules_esquema
+from DB.esquemas.esquema_datacenter_styles import datacenter_style_esquema
+from DB.migrations.schema_versions import MIGRATIONS, SCHEMA_VERSIONS, migrate_collection, upgrade_document
+from app.repositories.datacenter_spec_repository import merge_datacenter_specs
+from tests.esquema_reference import synthetic_modules
+
+class FakeCollection:
+    def __init__(self, documents):
+        self.documents = {document["_id"]: document for document in documents}
+        self.operations = []
+
+    def find(self, query):
+        minimum = query["schema_version"]["$not"]["$gte"]
+        return [dict(document) for document in self.documents.values() if document.get("schema_version", 0) < minimum]
+
+    def bulk_write(self, operations, ordered=True):
+        self.operations.extend(operations)
+
+        class Result:
+            modified_count = len(operations)
+        return Result()
+
+def test_registry_matches_current_versions():
+    assert {name: len(steps) for name, steps in MIGRATIONS.items()} == SCHEMA_VERSIONS
+
+def test_migrated_modules_read_the_same():
+    modules = synthetic_modules(30) + [
+        {"_id": ObjectId(), "ID": "legacy", "Name": "Server_Rack", "Space_X": 10, "Space_Y": 20, "Processing": 5},
+        {"id": "only_modern", "Processing": 5, "processing": 3, "Space_X": 1},
+        {"_id": ObjectId(), "Description": "x", "description": "y", "Data_Storage": 7},
+        {}
+    ]
+
+    for module in modules:
+        upgraded = upgrade_document("modules", module)
+        expected = module_esquema(module)
+
+        assert upgraded["schema_version"] == 1
+        assert not {"Space_X", "Space_Y", "Processing", "Price", "Description"} & set(upgraded)
+        assert module_esquema(upgraded) == expected
+        assert modules_esquema([upgraded])[0].get("schema_version") is None
+
+def test_current_and_legacy_module_readers_emit_the_same_keys():
+    modules = [
+        {"_id": ObjectId(), "id": "typed", "type": "server", "dim": [40, 40]},
+        {"_id": ObjectId(), "ID": "named", "Name": "Water_Chiller"},
+        {"_id": ObjectId(), "ID": "both", "Name": "Server_Rack", "type": "compute", "Usable_Power": -5},
+        {"id": "bare"}
+    ]
+
+    for module in modules:
+        # Unstamped documents take the legacy path, stamped ones the current one
+        legacy = module_esquema(module)
+        current = module_esquema(upgrade_document("modules", module))
+
+        assert current == legacy
+
+def test_migrated_styles_read_the_same():
+    styles = [
+        {"_id": ObjectId(), "Name": "Legacy", "Description": "old", "Grid_Connection": 1, "Space_X": 100,
+         "Space_Y": 200, "Focus": "storage", "Processing": 10, "Data_storage": 5, "Recommended_Modules": ["a"]},
+        {"_id": ObjectId(), "name": "Modern", "dim": [10, 10], "price": 3, "Price": 4, "recommended_modules": ["b"]},
+        {"id": "bare", "name": "", "Name": "Fallback", "grid_connection": 0, "Grid_Connection": 2},
+        {}
+    ]
+
+    for style in styles:
+        upgraded = upgrade_document("datacenter_styles", style)
+
+        assert not [field for field in upgraded if field[0].isupper()]
+        assert datacenter_style_esquema(upgraded) == datacenter_style_esquema(style)
+
+def test_migrated_specs_merge_the_same():
+    rows = [
+        {"_id": ObjectId(), "ID": "spec", "Name": "Server_Square", "Unit": "Space_X", "Amount": 1000},
+        {"_id": ObjectId(), "ID": "spec", "Name": "Server_Square", "Unit": "Data storage", "Amount": 5},
+        {"_id": ObjectId(), "ID": "spec", "Name": "Server_Square", "Unit": "Processing", "Amount": 7},
+        {"_id": ObjectId(), "ID": "spec", "Name": "Server_Square", "Unit": "Price", "Amount": 0},
+    ]
+
+    upgraded = [upgrade_document("datacenter_specs", row) for row in rows]
+
+    assert upgraded[1]["unit_field"] == "data_storage"
+    assert merge_datacenter_specs(upgraded) == merge_datacenter_specs(rows)
+    # Mixed migrated and unmigrated rows merge the same way too
+    assert merge_datacenter_specs(upgraded[:2] + rows[2:]) == merge_datacenter_specs(rows)
+
+def test_upgrade_is_idempotent():
+    upgraded = upgrade_document("modules", {"_id": ObjectId(), "Name": "Server_Rack", "Price": 3})
+
+    assert upgrade_document("modules", upgraded) == upgraded
+
+def test_migrate_collection_rewrites_only_outdated_documents():
+    current = upgrade_document("modules", {"_id": ObjectId(), "id": "current", "dim": [1, 1]})
+    outdated = {"_id": ObjectId(), "ID": "old", "Space_X": 1, "Space_Y": 2}
+    collection = FakeCollection([current, outdated])
+
+    assert migrate_collection({"modules": collection}, "modules", dry_run=True) == {"outdated": 1, "rewritten": 0}
+    assert collection.operations == []
+
+    assert migrate_collection({"modules": collection}, "modules") == {"outdated": 1, "rewritten": 1}
+    upgraded = upgrade_document("modules", outdated)
+    assert upgraded["dim"] == [1, 2]
+    assert collection.operations == [ReplaceOne({"_id": outdated["_id"]}, upgraded)]
@@ -0,0 +1,95 @@
+import asyncio
+import itertools
+import numpy as np
+from bson import ObjectId
+from app.services.solver import ModuleMixProblem, ModuleMixSolver, branch_and_bound
+
+def unit_row(module_id, name, unit, amount, is_input=0, is_output=0):
+    return {"_id": ObjectId(), "ID": module_id, "Name": name, "Is_Input": is_input, "Is_Output": is_output, "Unit": unit, "Amount": amount}
+
+CATALOG = [
+    {"_id": ObjectId(), "id": "transformer_100", "grid_connection": 1, "dim": [40, 40], "price": 1000, "usable_power": 100},
+    {"_id": ObjectId(), "id": "server_rack_100", "dim": [20, 20], "price": 5000, "usable_power": -75, "processing": 100},
+    # Cheap and powerful, but larger than the floor
+    {"_id": ObjectId(), "id": "server_hall", "dim": [200, 200], "price": 1, "processing": 10000},
+    # A legacy module stored as one row per unit
+    unit_row("7", "Legacy_Rack", "Space_X", 10), unit_row("7", "Legacy_Rack", "Space_Y", 10),
+    unit_row("7", "Legacy_Rack", "Usable_Power", 50, is_input=1), unit_row("7", "Legacy_Rack", "Processing", 100, is_output=1),
+    unit_row("7", "Legacy_Rack", "Price", 10000),
+]
+
+def constraint(amount, below=False, above=False, minimize=False, maximize=False):
+    return {"amount": amount, "below": below, "above": above, "minimize": minimize, "maximize": maximize, "unconstrained": False}
+
+def spec(processing=200, **constraints):
+    return {"ID": "Test_Square", "constraints": {
+        "space_x": constraint(100, below=True), "space_y": constraint(100, below=True),
+        "grid_connection": constraint(1, below=True), "processing": constraint(processing, above=True),
+        "price": constraint(0, minimize=True), **constraints
+    }}
+
+def test_branch_and_bound_matches_enumeration():
+    rng = np.random.default_rng(1)
+    for _ in range(100):
+        n, m = rng.integers(1, 5), rng.integers(1, 4)
+        A = rng.integers(-5, 8, (m, n)).astype(float)
+        b = rng.integers(-5, 30, m).astype(float)
+        c = rng.integers(-5, 6, n) * rng.choice((1, 10, 1 / 3))
+        upper = rng.integers(0, 6, n).astype(float)
+
+        best = None
+        for point in itertools.product(*(range(int(bound) + 1) for bound in upper)):
+            point = np.array(point, dtype=float)
+            if np.all(A @ point <= b + 1e-9) and (best is None or c @ point > best):
+                best = c @ point
+
+        x, value, _, complete = branch_and_bound(c, A, b, upper)
+        assert complete
+        if best is None:
+            assert x is None
+        else:
+            assert abs(value - best) < 1e-6
+
+def test_cheapest_mix_meets_the_spec():
+    solution = ModuleMixProblem(spec(), CATALOG).solve()
+
+    # One grid connection powers one server rack (100 processing) or two legacy racks (200)
+    assert solution["status"] == "optimal"
+    assert solution["modules"] == [
+        {"id": "transformer_100", "name": "transformer_100", "count": 1},
+        {"id": "7", "name": "Legacy_Rack", "count": 2}
+    ]
+    assert solution["objectives"] == [{"field": "price", "sense": "minimize", "value": 21000}]
+    assert {row["field"]: row["slack"] for row in solution["constraints"]} == {
+        "area": 100 * 100 - 1600 - 2 * 100, "grid_connection": 0, "processing": 0, "usable_power": 0
+    }
+
+def test_maximizing_a_unit_and_infeasible_specs():
+    maximized = spec(price=constraint(7000, below=True), processing=0, unknown_unit=constraint(1, below=True))
+    maximized["constraints"]["processing"] = constraint(0, maximize=True)
+    solution = ModuleMixProblem(maximized, CATALOG).solve()
+
+    # The legacy rack is over budget, so a transformer and one server rack is the best mix
+    assert solution["status"] == "optimal"
+    assert solution["objectives"] == [{"field": "processing", "sense": "maximize", "value": 100}]
+    assert solution["ignored_units"] == ["unknown_unit"]
+
+    solution = ModuleMixProblem(spec(processing=10000), CATALOG).solve()
+    assert solution["status"] == "infeasible" and not solution["optimal"]
+    assert solution["modules"] == []
+
+def test_solutions_are_cached_per_catalog_version(static_catalog):
+    async def scenario():
+        catalog = static_catalog(CATALOG)
+        solver = ModuleMixSolver(catalog)
+
+        first, cached = await solver.solve(spec())
+        assert not cached
+        assert await solver.solve(spec()) == (first, True)
+        assert not (await solver.solve(spec(processing=100)))[1]
+
+        catalog.invalidate()
+        solution, cached = await solver.solve(spec())
+        assert not cached and solution["modules"] == first["modules"]
+
+    asyncio.run(scenario())